@@ -1,10 +1,18 @@
+import asyncio
+import contextlib
 import os
 
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
+from search import config
 from search import router as search
+from search.metrics import MetricsMiddleware, monitor_event_loop
+from search.retry import DeadlineExceeded
+from search.tracing import configure_tracing
 
 # Imports the Cloud Logging client library
 import google.cloud.logging
@@ -12,8 +20,30 @@ import google.cloud.logging
 # Instantiates a logging at INFO level and higher
 google.cloud.logging.Client().setup_logging()
 
+# Export spans of sampled requests when an OTLP collector is configured
+if config.OTLP_ENDPOINT:
+    configure_tracing(
+        service_name=os.environ.get("K_SERVICE", "semantic-search-be"),
+        endpoint=config.OTLP_ENDPOINT,
+        sample_rate=config.TRACE_SAMPLE_RATE,
+    )
 
-app = FastAPI()
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the search service in the background so the server binds right away,
+    `/ready` reports when it can take traffic."""
+    background_tasks = [
+        asyncio.create_task(search.run_search_service()),
+        asyncio.create_task(monitor_event_loop()),
+    ]
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await search.stop_search_service()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS middleware
 app.add_middleware(
@@ -24,10 +54,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Count and time every request, outermost so errors of other middleware count too
+app.add_middleware(MetricsMiddleware)
+
 # Include the search router
 app.include_router(search.router)
 
 
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceeded):
+    """Answer searches running out of their deadline with 504 Gateway Timeout."""
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+@app.get("/ready")
+def ready() -> JSONResponse:
+    """Readiness probe, 503 until the search service is connected and warmed up."""
+    is_ready, startup_error = search.readiness()
+    return JSONResponse(
+        status_code=200 if is_ready else 503,
+        content={"ready": is_ready, "error": startup_error},
+    )
+
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    """Get metrics in the Prometheus text format.
+
+    Collected inside the event loop, so thread pool usage of the loop is included.
+    """
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
 @app.get("/")
 async def root():
     """Get Cloud Run environment variables."""
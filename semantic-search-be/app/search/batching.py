@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """Coalesce concurrent calls into a single batched call.
+
+    Items submitted within `max_wait` seconds of the first pending item, or until
+    `max_batch_size` items are pending, are passed together to `batch_fn`. Each
+    caller gets the result at its own position of the batch result.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[list[Any]], Awaitable[list[Any]]],
+        max_batch_size: int,
+        max_wait: float,
+    ) -> None:
+        """Initialize an empty batcher.
+
+        Args:
+            batch_fn (Callable[[list[Any]], Awaitable[list[Any]]]): Coroutine function
+                                    returning one result per item, in item order.
+            max_batch_size (int): Maximum number of items sent in one batch.
+            max_wait (float): Seconds to wait for more items after the first pending one.
+        """
+        self._batch_fn = batch_fn
+        self._max_batch_size = max(max_batch_size, 1)
+        self._max_wait = max_wait
+        self._pending: list[tuple[Any, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # the loop only keeps weak references to tasks, in-flight batches are kept here
+        self._tasks: set[asyncio.Task] = set()
+        self.num_batches = 0
+        self.num_items = 0
+
+    async def submit(self, item: Any) -> Any:
+        """Add an item to the next batch and wait for its result.
+
+        Args:
+            item (Any): Item passed to `batch_fn` as part of a batch.
+
+        Returns:
+            Any: Result of `batch_fn` for this item.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Send every pending item as one batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Send the pending items and wait for the in-flight batches, cancelling
+        the ones still running after timeout.
+
+        Args:
+            timeout (float): Seconds to wait for in-flight batches.
+        """
+        self._flush()
+        if not self._tasks:
+            return
+
+        _, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"cancelled {len(pending)} batches still running")
+            await asyncio.wait(pending)
+
+    async def _run(self, batch: list[tuple[Any, asyncio.Future]]) -> None:
+        """Call `batch_fn` on a batch and hand each caller its result."""
+        self.num_batches += 1
+        self.num_items += len(batch)
+        logger.info(f"sending batch of {len(batch)} items")
+
+        try:
+            results = await self._batch_fn([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(
+                    f"batch of {len(batch)} items returned {len(results)} results"
+                )
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
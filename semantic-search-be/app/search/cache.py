@@ -0,0 +1,386 @@
+import hashlib
+import logging
+import struct
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Optional
+
+import redis
+import redis.asyncio
+
+from .cluster import mget_async
+
+
+logger = logging.getLogger(__name__)
+
+_FLOAT32_SIZE = 4
+
+
+def normalize_query(text: str) -> str:
+    """Normalize query text so equivalent queries share a cache entry.
+
+    Applies unicode compatibility folding, case folding and whitespace collapsing.
+
+    Args:
+        text (str): Raw query text.
+
+    Returns:
+        str: Normalized query text.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).casefold().split())
+
+
+def pack_embedding(embedding: list[float]) -> bytes:
+    """Pack an embedding as little-endian float32 bytes."""
+    return struct.pack(f"<{len(embedding)}f", *embedding)
+
+
+def unpack_embedding(data: bytes) -> list[float]:
+    """Unpack little-endian float32 bytes into an embedding."""
+    return list(struct.unpack(f"<{len(data) // _FLOAT32_SIZE}f", data))
+
+
+class LRUCache:
+    """Bounded thread-safe in-process LRU cache with per-entry TTL.
+
+    Attributes:
+        hits (int): Number of lookups answered by the cache.
+        misses (int): Number of lookups not found or expired.
+    """
+
+    def __init__(self, max_size: int, ttl: float) -> None:
+        """Initialize an empty cache.
+
+        Args:
+            max_size (int): Maximum number of entries, least recently used are evicted first.
+            ttl (float): Seconds an entry stays valid after it is set.
+        """
+        self._max_size = max_size
+        self._ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a value from the cache, or None when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Any) -> None:
+        """Set a value in the cache, evicting the least recently used entry if full."""
+        if self._max_size <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+
+
+class TieredCache:
+    """Two-tier cache with an in-process LRU and an optional shared Redis tier.
+
+    Values are held as is in process and encoded to bytes for the Redis tier,
+    subclasses override `_encode` and `_decode` to choose the byte format.
+
+    Attributes:
+        redis_hits (int): Number of in-process misses answered by Redis.
+        redis_misses (int): Number of in-process misses not found in Redis.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        redis_client: Optional[redis.Redis] = None,
+        async_redis_client: Optional[redis.asyncio.Redis] = None,
+        key_prefix: str = "cache:",
+    ) -> None:
+        """Initialize the cache tiers.
+
+        Args:
+            max_size (int): Maximum number of values held in process.
+            ttl (float): Seconds a value stays valid in both tiers.
+            redis_client (Optional[redis.Redis]): Binary safe client for the shared tier,
+                                                    used by the sync search path.
+            async_redis_client (Optional[redis.asyncio.Redis]): Binary safe client for the
+                                                    shared tier, used by the asyncio search path.
+            key_prefix (str): Prefix of the Redis keys holding cached values.
+        """
+        self._local = LRUCache(max_size=max_size, ttl=ttl)
+        # milliseconds, whole seconds would turn a sub-second ttl into an error
+        self._redis_ttl = max(int(ttl * 1000), 1)
+        self._redis_client = redis_client
+        self._async_redis_client = async_redis_client
+        self._key_prefix = key_prefix
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    def _encode(self, value: Any) -> bytes:
+        return value
+
+    def _decode(self, data: bytes) -> Any:
+        return data
+
+    def _redis_key(self, key: str) -> str:
+        return self._key_prefix + hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def stats(self) -> dict[str, int]:
+        """Get hit and miss counters of every tier.
+
+        Returns:
+            dict[str, int]: Counters keyed by tier and outcome.
+        """
+        return {
+            "size": len(self._local),
+            "hits": self._local.hits,
+            "misses": self._local.misses,
+            "redis_hits": self.redis_hits,
+            "redis_misses": self.redis_misses,
+        }
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached value from the first tier holding it.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            Optional[Any]: Cached value or None on miss.
+        """
+        value = self._local.get(key)
+        if value is not None or self._redis_client is None:
+            return value
+
+        try:
+            data = self._redis_client.get(self._redis_key(key))
+        except redis.RedisError as e:
+            logger.warning(f"cache redis get failed with {str(e)}")
+            data = None
+
+        return self._from_redis(key, data)
+
+    def set(self, key: str, value: Any) -> None:
+        """Cache a value in every tier.
+
+        Args:
+            key (str): Cache key.
+            value (Any): Value to be cached.
+        """
+        self._local.set(key, value)
+        if self._redis_client is None:
+            return
+
+        try:
+            self._redis_client.set(
+                self._redis_key(key), self._encode(value), px=self._redis_ttl
+            )
+        except redis.RedisError as e:
+            logger.warning(f"cache redis set failed with {str(e)}")
+
+    async def get_async(self, key: str) -> Optional[Any]:
+        """Asyncio variant of `get`."""
+        value = self._local.get(key)
+        if value is not None or self._async_redis_client is None:
+            return value
+
+        try:
+            data = await self._async_redis_client.get(self._redis_key(key))
+        except redis.RedisError as e:
+            logger.warning(f"cache redis get failed with {str(e)}")
+            data = None
+
+        return self._from_redis(key, data)
+
+    async def set_async(self, key: str, value: Any) -> None:
+        """Asyncio variant of `set`."""
+        self._local.set(key, value)
+        if self._async_redis_client is None:
+            return
+
+        try:
+            await self._async_redis_client.set(
+                self._redis_key(key), self._encode(value), px=self._redis_ttl
+            )
+        except redis.RedisError as e:
+            logger.warning(f"cache redis set failed with {str(e)}")
+
+    async def get_many_async(self, keys: list[str]) -> list[Optional[Any]]:
+        """Get cached values of many keys, with one MGET for the in-process misses.
+
+        Args:
+            keys (list[str]): Cache keys.
+
+        Returns:
+            list[Optional[Any]]: Cached value of each key, None on miss.
+        """
+        values = [self._local.get(key) for key in keys]
+        missing = [i for i, value in enumerate(values) if value is None]
+        if not missing or self._async_redis_client is None:
+            return values
+
+        try:
+            data = await mget_async(
+                self._async_redis_client, [self._redis_key(keys[i]) for i in missing]
+            )
+        except redis.RedisError as e:
+            logger.warning(f"cache redis mget failed with {str(e)}")
+            data = [None] * len(missing)
+
+        for i, value_data in zip(missing, data):
+            values[i] = self._from_redis(keys[i], value_data)
+        return values
+
+    async def set_many_async(self, values: dict[str, Any]) -> None:
+        """Cache many values in every tier, with one pipeline of SET for Redis.
+
+        Args:
+            values (dict[str, Any]): Values to be cached keyed by cache key.
+        """
+        for key, value in values.items():
+            self._local.set(key, value)
+        if self._async_redis_client is None or not values:
+            return
+
+        try:
+            async with self._async_redis_client.pipeline(
+                transaction=False
+            ) as redis_pipeline:
+                for key, value in values.items():
+                    redis_pipeline.set(
+                        self._redis_key(key), self._encode(value), px=self._redis_ttl
+                    )
+                await redis_pipeline.execute()
+        except redis.RedisError as e:
+            logger.warning(f"cache redis pipelined set failed with {str(e)}")
+
+    def _from_redis(self, key: str, data: Optional[bytes]) -> Optional[Any]:
+        """Count a Redis tier lookup and promote a hit to the in-process tier."""
+        if not data:
+            self.redis_misses += 1
+            return None
+
+        self.redis_hits += 1
+        value = self._decode(data)
+        self._local.set(key, value)
+        return value
+
+
+class EmbeddingCache(TieredCache):
+    """Query embedding cache keyed on the normalized query text.
+
+    The Redis tier stores each embedding as packed float32 bytes.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        redis_client: Optional[redis.Redis] = None,
+        async_redis_client: Optional[redis.asyncio.Redis] = None,
+        key_prefix: str = "embedding:",
+    ) -> None:
+        super().__init__(
+            max_size=max_size,
+            ttl=ttl,
+            redis_client=redis_client,
+            async_redis_client=async_redis_client,
+            key_prefix=key_prefix,
+        )
+
+    def _encode(self, value: list[float]) -> bytes:
+        return pack_embedding(value)
+
+    def _decode(self, data: bytes) -> list[float]:
+        return unpack_embedding(data)
+
+    def get(self, text: str) -> Optional[list[float]]:
+        """Get the cached embedding of a query text, normalized before lookup."""
+        return super().get(normalize_query(text))
+
+    def set(self, text: str, embedding: list[float]) -> None:
+        """Cache the embedding of a query text, normalized before caching."""
+        super().set(normalize_query(text), embedding)
+
+    async def get_async(self, text: str) -> Optional[list[float]]:
+        """Asyncio variant of `get`."""
+        return await super().get_async(normalize_query(text))
+
+    async def set_async(self, text: str, embedding: list[float]) -> None:
+        """Asyncio variant of `set`."""
+        await super().set_async(normalize_query(text), embedding)
+
+    async def get_many_async(self, texts: list[str]) -> list[Optional[list[float]]]:
+        """Get the cached embeddings of many query texts, normalized before lookup."""
+        return await super().get_many_async([normalize_query(text) for text in texts])
+
+    async def set_many_async(self, embeddings: dict[str, list[float]]) -> None:
+        """Cache the embeddings of many query texts, normalized before caching."""
+        await super().set_many_async(
+            {normalize_query(text): embedding for text, embedding in embeddings.items()}
+        )
+
+
+class ResultCache(TieredCache):
+    """Serialized search result cache.
+
+    Entries are keyed on the normalized query, the number of neighbors, the
+    deployed index and the index version, so entries written before an index
+    update are never served after it and simply age out.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        redis_client: Optional[redis.Redis] = None,
+        async_redis_client: Optional[redis.asyncio.Redis] = None,
+        key_prefix: str = "result:",
+    ) -> None:
+        super().__init__(
+            max_size=max_size,
+            ttl=ttl,
+            redis_client=redis_client,
+            async_redis_client=async_redis_client,
+            key_prefix=key_prefix,
+        )
+
+    @staticmethod
+    def result_key(
+        text: str, num_neighbors: int, deployed_index_id: str, index_version: str
+    ) -> str:
+        """Build the cache key of a search result.
+
+        Args:
+            text (str): Search term, normalized before building the key.
+            num_neighbors (int): Number of nearest neighbors.
+            deployed_index_id (str): ID of the deployed index searched.
+            index_version (str): Version of the index searched.
+
+        Returns:
+            str: Cache key of the search result.
+        """
+        return "\x00".join(
+            (
+                index_version,
+                deployed_index_id,
+                str(num_neighbors),
+                normalize_query(text),
+            )
+        )
@@ -0,0 +1,82 @@
+from typing import Optional, Union
+
+import redis
+import redis.asyncio
+
+
+RedisClient = Union[redis.Redis, redis.RedisCluster]
+AsyncRedisClient = Union[redis.asyncio.Redis, redis.asyncio.RedisCluster]
+
+
+def create_redis_client(
+    host: str, port: str, cluster: bool = False, **kwargs
+) -> RedisClient:
+    """Create a client of a single Redis instance or of a Redis Cluster.
+
+    Args:
+        host (str): Redis host, any node of a cluster.
+        port (str): Redis port.
+        cluster (bool): Discover the nodes of a cluster from host and route every
+                        key to the node serving its hash slot.
+        **kwargs: Client options, such as decode_responses.
+
+    Returns:
+        RedisClient: Redis client.
+    """
+    if cluster:
+        return redis.RedisCluster(host=host, port=int(port), **kwargs)
+    return redis.Redis(host=host, port=port, **kwargs)
+
+
+def create_async_redis_client(
+    host: str, port: str, cluster: bool = False, **kwargs
+) -> AsyncRedisClient:
+    """Asyncio variant of `create_redis_client`, connecting on the first command."""
+    if cluster:
+        return redis.asyncio.RedisCluster(host=host, port=int(port), **kwargs)
+    return redis.asyncio.Redis(host=host, port=port, **kwargs)
+
+
+def mget(client: RedisClient, keys: list[str]) -> list[Optional[bytes]]:
+    """Get the values of keys in about one round trip, on one node or a cluster.
+
+    A cluster only runs MGET on keys of one hash slot, so keys are grouped by slot
+    into one MGET each, and the MGETs of every node are pipelined to all nodes at
+    once before any reply is read.
+
+    Args:
+        client (RedisClient): Redis client.
+        keys (list[str]): Keys.
+
+    Returns:
+        list[Optional[bytes]]: Value of each key, None for missing keys.
+    """
+    if isinstance(client, redis.RedisCluster):
+        return client.mget_nonatomic(keys)
+    return client.mget(keys)
+
+
+async def mget_async(
+    client: AsyncRedisClient, keys: list[str]
+) -> list[Optional[bytes]]:
+    """Asyncio variant of `mget`, awaiting the pipelines of every node concurrently."""
+    if isinstance(client, redis.asyncio.RedisCluster):
+        return await client.mget_nonatomic(keys)
+    return await client.mget(keys)
+
+
+def num_mget_commands(
+    client: Union[RedisClient, AsyncRedisClient], keys: list[str]
+) -> int:
+    """Get the number of MGET commands `mget` and `mget_async` send for keys.
+
+    Args:
+        client (Union[RedisClient, AsyncRedisClient]): Redis client.
+        keys (list[str]): Keys.
+
+    Returns:
+        int: One per hash slot of the keys on a cluster, otherwise one.
+    """
+    if isinstance(client, (redis.RedisCluster, redis.asyncio.RedisCluster)):
+        return len({client.keyslot(key) for key in keys})
+    return 1
@@ -0,0 +1,132 @@
+import bisect
+import logging
+import mmap
+import struct
+from typing import Iterable
+
+import numpy as np
+
+from .cache import normalize_query
+
+
+logger = logging.getLogger(__name__)
+
+# Completion index layout, written offline by build_completions.py:
+#   header:  magic, format version, entry count
+#   offsets: uint64[count + 1] start of each entry in the entries section, then its end
+#   entries: UTF-8 normalized title, a NUL byte and the title, sorted bytewise
+COMPLETION_MAGIC = b"SCMP"
+COMPLETION_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sHQ")
+_SEPARATOR = b"\x00"
+# sorts after every UTF-8 byte, so prefix + _PREFIX_END bounds the entries of a prefix
+_PREFIX_END = b"\xff"
+
+
+def _completion_key(text: str) -> bytes:
+    """Normalize text like result cache keys, so completions ignore case and spacing."""
+    return normalize_query(text).replace("\x00", "").encode("utf-8")
+
+
+def write_completion_index(path: str, titles: Iterable[str]) -> int:
+    """Write titles to a completion index file, keeping the first of titles equal
+    after normalization.
+
+    Args:
+        path (str): Path of the index file.
+        titles (Iterable[str]): Post titles.
+
+    Returns:
+        int: Number of distinct titles written.
+    """
+    keys = {}
+    for title in titles:
+        if title and title.strip():
+            keys.setdefault(_completion_key(title), title)
+    entries = sorted(
+        key + _SEPARATOR + title.encode("utf-8") for key, title in keys.items()
+    )
+    offsets = np.zeros(len(entries) + 1, dtype="<u8")
+    np.cumsum([len(entry) for entry in entries], out=offsets[1:])
+
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(COMPLETION_MAGIC, COMPLETION_FORMAT_VERSION, len(entries)))
+        f.write(offsets.tobytes())
+        f.write(b"".join(entries))
+    return len(entries)
+
+
+class _Entries:
+    """Sequence view of the mapped entries, searched with `bisect`."""
+
+    def __init__(self, data: mmap.mmap, offsets: np.ndarray, start: int) -> None:
+        self._data = data
+        self._offsets = offsets
+        self._start = start
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, position: int) -> bytes:
+        start = self._start + int(self._offsets[position])
+        return self._data[start : self._start + int(self._offsets[position + 1])]
+
+
+class CompletionIndex:
+    """Read-only memory-mapped sorted array of post titles completing a prefix.
+
+    A lookup is two binary searches over the normalized titles, no Redis or model
+    call, and worker processes opening the same file share one page cache copy.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Map an index file written by `write_completion_index`.
+
+        Args:
+            path (str): Path of the index file.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = _HEADER.unpack_from(self._mmap, 0)
+        if magic != COMPLETION_MAGIC or version != COMPLETION_FORMAT_VERSION:
+            raise ValueError(
+                f"{path} is not a version {COMPLETION_FORMAT_VERSION} completion index"
+            )
+
+        offsets = np.frombuffer(
+            self._mmap, dtype="<u8", count=count + 1, offset=_HEADER.size
+        )
+        self._entries = _Entries(self._mmap, offsets, _HEADER.size + offsets.nbytes)
+
+        logger.info(f"mapped {count} completions from {path}")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def complete(self, prefix: str, limit: int = 10) -> list[str]:
+        """Get titles starting with a prefix, in lexicographic order.
+
+        Args:
+            prefix (str): Typed text, matched case and whitespace insensitively.
+            limit (int): Maximum number of titles.
+
+        Returns:
+            list[str]: Completed titles.
+        """
+        key = _completion_key(prefix)
+        if not key:
+            return []
+        if prefix[-1].isspace():
+            key += b" "  # a typed space ends the last word
+
+        start = bisect.bisect_left(self._entries, key)
+        stop = min(
+            bisect.bisect_left(self._entries, key + _PREFIX_END, lo=start),
+            start + limit,
+        )
+        return [
+            self._entries[position].split(_SEPARATOR, 1)[1].decode("utf-8")
+            for position in range(start, stop)
+        ]
@@ -1,8 +1,95 @@
 import os
 
 # Fetch environment variables for configuration
-VERTEX_AI_MODEL_ENDPOINT_RESOURCE = os.environ["VERTEX_AI_MODEL_ENDPOINT_RESOURCE"]
-VERTEX_AI_INDEX_ENDPOINT_RESOURCE = os.environ["VERTEX_AI_INDEX_ENDPOINT_RESOURCE"]
-DEPLOYED_INDEX_ID = os.environ["DEPLOYED_INDEX_ID"]
+VERTEX_AI_MODEL_ENDPOINT_RESOURCE = os.environ.get("VERTEX_AI_MODEL_ENDPOINT_RESOURCE")
+VERTEX_AI_INDEX_ENDPOINT_RESOURCE = os.environ.get("VERTEX_AI_INDEX_ENDPOINT_RESOURCE")
+DEPLOYED_INDEX_ID = os.environ.get("DEPLOYED_INDEX_ID")
 REDIS_HOST = os.environ["REDIS_HOST"]
 REDIS_PORT = os.environ["REDIS_PORT"]
+# REDIS_HOST and REDIS_PORT are a node of a Redis Cluster holding the posts
+REDIS_CLUSTER = os.environ.get("REDIS_CLUSTER", "") == "true"
+
+# Query embedding cache, optionally shared across instances through redis
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", 1024))
+EMBEDDING_CACHE_TTL = float(os.environ.get("EMBEDDING_CACHE_TTL", 86400))
+EMBEDDING_CACHE_REDIS = os.environ.get("EMBEDDING_CACHE_REDIS", "") == "true"
+
+# Serialized search result cache, keyed on the deployed index version
+RESULT_CACHE_SIZE = int(os.environ.get("RESULT_CACHE_SIZE", 256))
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", 86400))
+RESULT_CACHE_REDIS = os.environ.get("RESULT_CACHE_REDIS", "") == "true"
+INDEX_VERSION_REFRESH_INTERVAL = float(
+    os.environ.get("INDEX_VERSION_REFRESH_INTERVAL", 60)
+)
+
+# Micro-batching of concurrent queries into single embedding and vector search calls
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 32))
+BATCH_MAX_WAIT = float(os.environ.get("BATCH_MAX_WAIT", 0.002))
+
+# Number of posts fetched per Redis round trip by the streaming search endpoint
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", 10))
+
+# Paginated search, neighbors retrieved by the first page and seconds their list
+# stays in redis for later pages
+PAGE_NUM_NEIGHBORS = int(os.environ.get("PAGE_NUM_NEIGHBORS", 200))
+PAGE_CURSOR_TTL = int(os.environ.get("PAGE_CURSOR_TTL", 900))
+
+# Per-request deadline in seconds and retries of the embed, match and fetch stages,
+# each retrying transient failures with exponential backoff and jitter
+REQUEST_TIMEOUT = float(os.environ.get("REQUEST_TIMEOUT", 5.0))
+# Deadline of /search/batch and of the precomputed suggestion batches, which embed,
+# match and fetch up to schema.MAX_BATCH_QUERIES (1000) queries at once
+BATCH_REQUEST_TIMEOUT = float(os.environ.get("BATCH_REQUEST_TIMEOUT", 30.0))
+EMBED_MAX_ATTEMPTS = int(os.environ.get("EMBED_MAX_ATTEMPTS", 3))
+MATCH_MAX_ATTEMPTS = int(os.environ.get("MATCH_MAX_ATTEMPTS", 3))
+FETCH_MAX_ATTEMPTS = int(os.environ.get("FETCH_MAX_ATTEMPTS", 3))
+RETRY_BASE_DELAY = float(os.environ.get("RETRY_BASE_DELAY", 0.05))
+RETRY_MAX_DELAY = float(os.environ.get("RETRY_MAX_DELAY", 1.0))
+
+# Hedging of slow asyncio embedding and vector search calls, a duplicate is sent past
+# this percentile of recent latencies, 0 disables hedging
+HEDGE_PERCENTILE = float(os.environ.get("HEDGE_PERCENTILE", 0))
+HEDGE_MAX_RATE = float(os.environ.get("HEDGE_MAX_RATE", 0.1))
+
+# OpenTelemetry tracing, spans of sampled requests are exported to this OTLP gRPC
+# endpoint, unset disables tracing
+OTLP_ENDPOINT = os.environ.get("OTLP_ENDPOINT")
+TRACE_SAMPLE_RATE = float(os.environ.get("TRACE_SAMPLE_RATE", 0.01))
+
+# Number of search_suggestion.json questions searched at startup before the
+# instance reports ready, priming caches and connections
+WARMUP_NUM_QUERIES = int(os.environ.get("WARMUP_NUM_QUERIES", 5))
+# Seconds startup waits for Redis and the index endpoint before failing
+CONNECT_TIMEOUT = float(os.environ.get("CONNECT_TIMEOUT", 30))
+# Backoff cap in seconds after the first failed startup, doubled up to the max
+STARTUP_RETRY_BASE_DELAY = float(os.environ.get("STARTUP_RETRY_BASE_DELAY", 1.0))
+STARTUP_RETRY_MAX_DELAY = float(os.environ.get("STARTUP_RETRY_MAX_DELAY", 60.0))
+
+# Results of every search_suggestion.json question computed in the background once
+# ready and on index version changes, searched PRECOMPUTE_BATCH_SIZE at a time
+PRECOMPUTE_SUGGESTIONS = os.environ.get("PRECOMPUTE_SUGGESTIONS", "true") == "true"
+PRECOMPUTE_BATCH_SIZE = int(os.environ.get("PRECOMPUTE_BATCH_SIZE", 32))
+
+# Title completion index of /search/complete, written by build_completions.py
+COMPLETION_INDEX_PATH = os.environ.get("COMPLETION_INDEX_PATH")
+
+# Query encoder backend, "vertex" model endpoint or in process "onnx" model on CPU
+QUERY_ENCODER = os.environ.get("QUERY_ENCODER", "vertex")
+ONNX_MODEL_DIR = os.environ.get("ONNX_MODEL_DIR")
+
+# Vector index backend, "vertex" deployed index or in process "numpy", "hnsw",
+# memory-mapped "store", product quantization "pq" or sign-bit "binary" index
+VECTOR_INDEX = os.environ.get("VECTOR_INDEX", "vertex")
+EMBEDDINGS_DIR = os.environ.get("EMBEDDINGS_DIR")
+INDEX_NUM_PARTITIONS = int(os.environ.get("INDEX_NUM_PARTITIONS", 0))
+INDEX_NUM_PROBES = int(os.environ.get("INDEX_NUM_PROBES", 1))
+INDEX_PATH = os.environ.get("INDEX_PATH")
+INDEX_DIMENSIONS = int(os.environ.get("INDEX_DIMENSIONS", 384))
+INDEX_EF_SEARCH = int(os.environ.get("INDEX_EF_SEARCH", 64))
+INDEX_NUM_THREADS = int(os.environ.get("INDEX_NUM_THREADS", -1))
+INDEX_RESCORE_PATH = os.environ.get("INDEX_RESCORE_PATH")
+INDEX_NUM_RESCORE = int(os.environ.get("INDEX_NUM_RESCORE", 200))
+
+# Projection matrix of the pipeline's EmbeddingProjector, applied to query embeddings
+# when the index holds reduced dimension embeddings
+PROJECTION_PATH = os.environ.get("PROJECTION_PATH")
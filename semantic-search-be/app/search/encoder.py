@@ -0,0 +1,159 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Optional
+
+import httpx
+import numpy as np
+from google.cloud import aiplatform
+
+
+logger = logging.getLogger(__name__)
+
+_ONNX_MODEL_FILE_NAME = "model.onnx"
+_TOKENIZER_FILE_NAME = "tokenizer.json"
+_MAX_SEQUENCE_LENGTH = 512
+
+
+class QueryEncoder:
+    """Base class of encoders converting query texts to embeddings."""
+
+    def encode(self, texts: list[str]) -> list[list[float]]:
+        """Convert texts to embeddings.
+
+        Args:
+            texts (list[str]): Texts to be embedded.
+
+        Returns:
+            list[list[float]]: One embedding per text.
+        """
+        raise NotImplementedError
+
+    async def encode_async(self, texts: list[str]) -> list[list[float]]:
+        """Asyncio variant of `encode`."""
+        raise NotImplementedError
+
+
+class VertexEndpointEncoder(QueryEncoder):
+    """Encoder sending texts to the model deployed on a Vertex AI private endpoint."""
+
+    def __init__(self, model_endpoint: aiplatform.PrivateEndpoint) -> None:
+        """Initialize encoder with the endpoint hosting the model.
+
+        Args:
+            model_endpoint (aiplatform.PrivateEndpoint): Endpoint hosting the embedding model.
+        """
+        self._model_endpoint = model_endpoint
+        self._async_http_client = httpx.AsyncClient()
+
+    def encode(self, texts: list[str]) -> list[list[float]]:
+        return self._model_endpoint.predict(texts).predictions
+
+    async def encode_async(self, texts: list[str]) -> list[list[float]]:
+        """Request embeddings from the private endpoint without blocking the event loop."""
+        response = await self._async_http_client.post(
+            self._model_endpoint.predict_http_uri,
+            content=json.dumps({"instances": texts}),
+            headers={"Content-Type": "application/json"},
+        )
+        response.raise_for_status()
+        return response.json()["predictions"]
+
+
+class OnnxEncoder(QueryEncoder):
+    """Encoder running the embedding model in process on CPU with ONNX Runtime.
+
+    The model directory holds `model.onnx`, the multi-qa-MiniLM-L6-dot-v1 transformer
+    exported to ONNX, and `tokenizer.json`, its Hugging Face fast tokenizer. Token
+    embeddings are mean pooled and L2 normalized like the model served on Vertex AI.
+    """
+
+    def __init__(self, model_dir: str, num_threads: int = 0) -> None:
+        """Load the tokenizer and the ONNX model.
+
+        Args:
+            model_dir (str): Local directory holding `model.onnx` and `tokenizer.json`.
+            num_threads (int): Intra-op threads of ONNX Runtime, 0 lets it decide.
+        """
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise ImportError(
+                "Cannot import onnxruntime or tokenizers. Please install them to use the onnx query encoder."
+            )
+
+        self._tokenizer = Tokenizer.from_file(
+            os.path.join(model_dir, _TOKENIZER_FILE_NAME)
+        )
+        self._tokenizer.enable_truncation(max_length=_MAX_SEQUENCE_LENGTH)
+        self._tokenizer.enable_padding()
+
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = num_threads
+        self._session = onnxruntime.InferenceSession(
+            os.path.join(model_dir, _ONNX_MODEL_FILE_NAME),
+            sess_options=session_options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {
+            model_input.name for model_input in self._session.get_inputs()
+        }
+
+        logger.info(f"Loaded onnx query encoder from {model_dir}")
+
+    def encode(self, texts: list[str]) -> list[list[float]]:
+        encodings = self._tokenizer.encode_batch(texts)
+
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array(
+                [e.attention_mask for e in encodings], dtype=np.int64
+            ),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        inputs = {
+            name: value for name, value in inputs.items() if name in self._input_names
+        }
+
+        token_embeddings = self._session.run(None, inputs)[0]
+
+        # mean pooling over non padding tokens, then L2 normalize
+        mask = inputs["attention_mask"][..., None].astype(np.float32)
+        embeddings = (token_embeddings * mask).sum(axis=1) / np.maximum(
+            mask.sum(axis=1), 1e-9
+        )
+        embeddings /= np.maximum(
+            np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12
+        )
+        return embeddings.tolist()
+
+    async def encode_async(self, texts: list[str]) -> list[list[float]]:
+        """Run the CPU bound encoding in a worker thread, ONNX Runtime releases the GIL."""
+        return await asyncio.to_thread(self.encode, texts)
+
+
+def create_query_encoder(
+    encoder: str,
+    model_endpoint_resource: Optional[str] = None,
+    onnx_model_dir: Optional[str] = None,
+) -> QueryEncoder:
+    """Create the query encoder selected by configuration.
+
+    Args:
+        encoder (str): Encoder backend, "vertex" or "onnx".
+        model_endpoint_resource (str): Endpoint resource of the "vertex" backend.
+        onnx_model_dir (str): Model directory of the "onnx" backend.
+
+    Returns:
+        QueryEncoder: Encoder of the selected backend.
+    """
+    if encoder == "vertex":
+        model_endpoint = aiplatform.PrivateEndpoint(model_endpoint_resource)
+        logger.info("Connected to vertex ai model endpoint")
+        return VertexEndpointEncoder(model_endpoint)
+    if encoder == "onnx":
+        return OnnxEncoder(onnx_model_dir)
+
+    raise ValueError(f"Unknown query encoder {encoder}, expected vertex or onnx")
@@ -0,0 +1,176 @@
+import asyncio
+import collections
+import logging
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+# latencies observed before the percentile is trusted, hedging waits for them
+_MIN_SAMPLES = 20
+# samples between recomputations of the hedge delay
+_DELAY_REFRESH_INTERVAL = 16
+
+
+class Hedger:
+    """Send a duplicate of a slow call and take the first response.
+
+    A call not answered within the `percentile` of recently observed latencies is
+    sent again, unless hedges already make up `max_hedge_rate` of the recent
+    calls, which keeps hedging from doubling the load on a degraded backend.
+
+    Attributes:
+        num_calls (int): Number of calls.
+        num_hedges (int): Number of duplicate calls sent.
+        num_hedge_wins (int): Number of duplicate calls answering first.
+        num_hedges_capped (int): Number of slow calls not hedged due to the rate cap.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        percentile: float = 95,
+        max_hedge_rate: float = 0.1,
+        window_size: int = 1000,
+    ) -> None:
+        """Initialize hedger without observed latencies.
+
+        Args:
+            name (str): Name of the hedged call in logs.
+            percentile (float): Percentile of recent latencies waited before hedging.
+            max_hedge_rate (float): Max fraction of recent calls hedged.
+            window_size (int): Number of recent calls the percentile and rate cover.
+        """
+        self.name = name
+        self._percentile = percentile
+        self._max_hedge_rate = max_hedge_rate
+        self._latencies: collections.deque[float] = collections.deque(
+            maxlen=window_size
+        )
+        self._hedged: collections.deque[bool] = collections.deque(maxlen=window_size)
+        self._num_recent_hedges = 0
+        self._delay = None
+        self._samples_since_refresh = 0
+
+        self.num_calls = 0
+        self.num_hedges = 0
+        self.num_hedge_wins = 0
+        self.num_hedges_capped = 0
+
+    @property
+    def delay(self) -> float:
+        """Seconds a call may take before it is hedged, infinite until enough calls
+        have been observed."""
+        if len(self._latencies) < _MIN_SAMPLES:
+            return float("inf")
+        if (
+            self._delay is None
+            or self._samples_since_refresh >= _DELAY_REFRESH_INTERVAL
+        ):
+            self._delay = float(np.percentile(self._latencies, self._percentile))
+            self._samples_since_refresh = 0
+        return self._delay
+
+    def _record(self, latency: Optional[float], hedged: bool) -> None:
+        """Add the latency of a call, if known, and whether it was hedged to the
+        window."""
+        if latency is not None:
+            self._latencies.append(latency)
+            self._samples_since_refresh += 1
+
+        if len(self._hedged) == self._hedged.maxlen and self._hedged[0]:
+            self._num_recent_hedges -= 1
+        self._hedged.append(hedged)
+        self._num_recent_hedges += hedged
+
+    def _can_hedge(self) -> bool:
+        """Check whether one more hedge stays within the hedge rate cap."""
+        return self._num_recent_hedges + 1 <= self._max_hedge_rate * (
+            len(self._hedged) + 1
+        )
+
+    def stats(self) -> dict[str, Optional[float]]:
+        """Get hedging counters and recent latency percentiles in milliseconds.
+
+        Returns:
+            dict[str, Optional[float]]: Counters, hedge delay, p50 and p99 latency.
+        """
+        latencies = np.asarray(self._latencies or [0.0])
+        delay = self.delay
+        return {
+            "calls": self.num_calls,
+            "hedges": self.num_hedges,
+            "hedge_wins": self.num_hedge_wins,
+            "hedges_capped": self.num_hedges_capped,
+            "delay": round(delay * 1000, 2) if delay != float("inf") else None,
+            "p50": round(float(np.percentile(latencies, 50)) * 1000, 2),
+            "p99": round(float(np.percentile(latencies, 99)) * 1000, 2),
+        }
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Await func, sending it again when it is slower than the hedge delay.
+
+        The first successful response is returned and the other call cancelled. A
+        call failing while the other is pending waits for the other.
+
+        Only the latency of the first call is recorded, so the delay follows the
+        unhedged latency distribution. It is recorded when the call succeeds, or as
+        the time it ran so far when a hedge answers first, which is a lower bound
+        above the delay. Latencies of failed calls are not recorded.
+
+        Args:
+            func (Callable[..., Awaitable[Any]]): Coroutine function of the call.
+            *args: Positional arguments of func.
+            **kwargs: Keyword arguments of func.
+
+        Returns:
+            Any: Result of the first successful call.
+        """
+        self.num_calls += 1
+        start = time.perf_counter()
+        hedged = False
+        latency = None
+        delay = self.delay
+        primary = asyncio.ensure_future(func(*args, **kwargs))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(
+                pending, timeout=delay if delay != float("inf") else None
+            )
+            if pending:
+                if self._can_hedge():
+                    hedged = True
+                    self.num_hedges += 1
+                    logger.info(f"hedging {self.name} after {delay:.3f}s")
+                    hedge = asyncio.ensure_future(func(*args, **kwargs))
+                    pending.add(hedge)
+                else:
+                    self.num_hedges_capped += 1
+
+            while pending:
+                more_done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                done |= more_done
+                if any(task.exception() is None for task in done):
+                    break
+
+            for task in done:
+                if task.exception() is None:
+                    primary_failed = primary.done() and (
+                        primary.cancelled() or primary.exception() is not None
+                    )
+                    if not primary_failed:
+                        latency = time.perf_counter() - start
+                    if hedged and task is hedge:
+                        self.num_hedge_wins += 1
+                    return task.result()
+            # every call failed
+            return done.pop().result()
+        finally:
+            for task in pending:
+                task.cancel()
+            self._record(latency, hedged)
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+from google.cloud.aiplatform.matching_engine.matching_engine_index_endpoint import (
+    MatchNeighbor,
+)
+
+from .index import VectorIndex
+
+
+logger = logging.getLogger(__name__)
+
+
+def _import_hnswlib():
+    try:
+        import hnswlib
+    except ImportError:
+        raise ImportError(
+            "Cannot import hnswlib. Please install hnswlib to use the hnsw vector index."
+        )
+    return hnswlib
+
+
+class HnswIndex(VectorIndex):
+    """In-process hierarchical navigable small world graph index.
+
+    Backed by hnswlib with inner product space, the graph is serialized to a single
+    file. Labels are the integer post ids, so the file needs no separate id table.
+    Batched searches run in native threads without holding the GIL.
+    """
+
+    def __init__(
+        self,
+        index,
+        ef_search: int = 64,
+        num_threads: int = -1,
+        version: Optional[str] = None,
+    ) -> None:
+        """Initialize the index from a built or loaded hnswlib index.
+
+        Args:
+            index (hnswlib.Index): Built or loaded hnswlib index.
+            ef_search (int): Size of the candidate list explored per query,
+                                higher is slower with better recall.
+            num_threads (int): Threads searching a batch of queries, -1 uses every core.
+            version (Optional[str]): Version of the indexed embeddings.
+        """
+        self._index = index
+        self._num_threads = num_threads
+        self._version = version
+        self.set_ef_search(ef_search)
+
+    @classmethod
+    def build(
+        cls,
+        ids: list[str],
+        embeddings: np.ndarray,
+        m: int = 16,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+        num_threads: int = -1,
+    ) -> "HnswIndex":
+        """Build the graph over an embedding matrix.
+
+        Args:
+            ids (list[str]): Integer post id of each embedding row.
+            embeddings (np.ndarray): Embedding matrix with one embedding per row.
+            m (int): Number of graph links per node.
+            ef_construction (int): Size of the candidate list explored while inserting.
+            ef_search (int): Size of the candidate list explored per query.
+            num_threads (int): Threads inserting embeddings, -1 uses every core.
+
+        Returns:
+            HnswIndex: Index over the embeddings.
+        """
+        hnswlib = _import_hnswlib()
+
+        index = hnswlib.Index(space="ip", dim=embeddings.shape[1])
+        index.init_index(
+            max_elements=len(embeddings), ef_construction=ef_construction, M=m
+        )
+        index.add_items(
+            embeddings,
+            np.array([int(id) for id in ids], dtype=np.uint64),
+            num_threads=num_threads,
+        )
+        logger.info(f"built hnsw index over {len(ids)} embeddings")
+
+        return cls(index, ef_search=ef_search, num_threads=num_threads)
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        dimensions: int,
+        ef_search: int = 64,
+        num_threads: int = -1,
+    ) -> "HnswIndex":
+        """Load a graph saved with `save`.
+
+        Args:
+            path (str): Path of the saved graph.
+            dimensions (int): Dimension of the indexed embeddings.
+            ef_search (int): Size of the candidate list explored per query.
+            num_threads (int): Threads searching a batch of queries, -1 uses every core.
+
+        Returns:
+            HnswIndex: Loaded index.
+        """
+        hnswlib = _import_hnswlib()
+
+        index = hnswlib.Index(space="ip", dim=dimensions)
+        index.load_index(path)
+        logger.info(f"loaded hnsw index of {index.get_current_count()} embeddings")
+
+        return cls(
+            index,
+            ef_search=ef_search,
+            num_threads=num_threads,
+            version=str(os.path.getmtime(path)),
+        )
+
+    def save(self, path: str) -> None:
+        """Serialize the graph to a single file.
+
+        Args:
+            path (str): Path of the saved graph.
+        """
+        self._index.save_index(path)
+
+    def set_ef_search(self, ef_search: int) -> None:
+        """Set the size of the candidate list explored per query."""
+        self._index.set_ef(ef_search)
+
+    @property
+    def index_id(self) -> str:
+        return "hnsw"
+
+    def get_version(self) -> Optional[str]:
+        return self._version
+
+    def match(
+        self, queries: list[list[float]], num_neighbors: int
+    ) -> list[list[MatchNeighbor]]:
+        # hnswlib explores max(ef, k) candidates, so a large k needs no ef change
+        num_neighbors = min(num_neighbors, self._index.get_current_count())
+
+        labels, distances = self._index.knn_query(
+            np.asarray(queries, dtype=np.float32),
+            k=num_neighbors,
+            num_threads=self._num_threads,
+        )
+
+        # hnswlib inner product distance is 1 - dot product
+        return [
+            [
+                MatchNeighbor(id=str(label), distance=float(1 - distance))
+                for label, distance in zip(query_labels, query_distances)
+            ]
+            for query_labels, query_distances in zip(labels, distances)
+        ]
+
+    async def match_async(
+        self, queries: list[list[float]], num_neighbors: int
+    ) -> list[list[MatchNeighbor]]:
+        """Search in a worker thread, hnswlib releases the GIL while searching."""
+        return await asyncio.to_thread(self.match, queries, num_neighbors)
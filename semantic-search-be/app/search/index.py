@@ -0,0 +1,638 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from typing import Optional
+
+import grpc
+import numpy as np
+from google.cloud import aiplatform
+from google.cloud.aiplatform.matching_engine._protos import (
+    match_service_pb2,
+    match_service_pb2_grpc,
+)
+from google.cloud.aiplatform.matching_engine.matching_engine_index_endpoint import (
+    MatchNeighbor,
+)
+
+
+logger = logging.getLogger(__name__)
+
+_FIRST_RESULT = 0
+_MATCH_GRPC_PORT = 10000
+_EMBEDDINGS_FILE_PATTERN = "embeddings*.json"
+_KMEANS_ITERATIONS = 10
+_KMEANS_SAMPLES_PER_PARTITION = 256
+_ASSIGN_CHUNK_SIZE = 65536
+_SCORE_CHUNK_SIZE = 65536
+
+
+class VectorIndex:
+    """Base class of nearest neighbor indexes searched with dot product similarity."""
+
+    @property
+    def index_id(self) -> str:
+        """Identifier of the searched index, part of the result cache key."""
+        raise NotImplementedError
+
+    def get_version(self) -> Optional[str]:
+        """Get the version of the indexed embeddings, it changes whenever they are updated.
+
+        Returns:
+            Optional[str]: Index version, or None if it cannot be resolved.
+        """
+        raise NotImplementedError
+
+    def match(
+        self, queries: list[list[float]], num_neighbors: int
+    ) -> list[list[MatchNeighbor]]:
+        """Retrieve nearest neighbors of query embeddings.
+
+        Args:
+            queries (list[list[float]]): Query embeddings.
+            num_neighbors (int): Number of nearest neighbors to retrieve per query.
+
+        Returns:
+            list[list[MatchNeighbor]]: A list of match neighbors for each query,
+                                        with closest neighbor first.
+        """
+        raise NotImplementedError
+
+    async def match_async(
+        self, queries: list[list[float]], num_neighbors: int
+    ) -> list[list[MatchNeighbor]]:
+        """Asyncio variant of `match`."""
+        raise NotImplementedError
+
+    async def connect_async(self, timeout: float = 30.0) -> None:
+        """Open the connections of a remote index before the first search, in process
+        indexes have none.
+
+        Args:
+            timeout (float): Seconds to wait for the connections.
+        """
+        return None
+
+
+class VertexMatchingEngineIndex(VectorIndex):
+    """Index deployed on a Vertex AI Matching Engine index endpoint."""
+
+    def __init__(
+        self,
+        index_endpoint: aiplatform.MatchingEngineIndexEndpoint,
+        deployed_index_id: str,
+    ) -> None:
+        """Initialize index with the endpoint it is deployed on.
+
+        Args:
+            index_endpoint (aiplatform.MatchingEngineIndexEndpoint): Index endpoint.
+            deployed_index_id (str): The user specified ID of the DeployedIndex.
+        """
+        self._index_endpoint = index_endpoint
+        self._deployed_index_id = deployed_index_id
+
+        # the asyncio grpc channel is opened lazily because it has to be bound
+        # to the running event loop
+        self._async_channel = None
+        self._async_match_stub = None
+
+    @property
+    def index_id(self) -> str:
+        return self._deployed_index_id
+
+    def _get_deployed_index(self):
+        """Get the deployed index from the index endpoint.
+
+        Returns:
+            DeployedIndex: Deployed index with id `deployed_index_id`.
+        """
+        deployed_indexes = [
+            deployed_index
+            for deployed_index in self._index_endpoint.deployed_indexes
+            if deployed_index.id == self._deployed_index_id
+        ]
+        if not deployed_indexes:
+            raise RuntimeError(
+                f"No deployed index with id '{self._deployed_index_id}' found"
+            )
+
+        return deployed_indexes[_FIRST_RESULT]
+
+    def get_version(self) -> Optional[str]:
+        """Get the update timestamp of the deployed index, it changes whenever the
+        pipeline updates the index embeddings."""
+        index = aiplatform.MatchingEngineIndex(self._get_deployed_index().index)
+        return index.update_time.isoformat()
+
+    def match(
+        self, queries: list[list[float]], num_neighbors: int
+    ) -> list[list[MatchNeighbor]]:
+        return self._index_endpoint.match(
+            deployed_index_id=self._deployed_index_id,
+            queries=queries,
+            num_neighbors=num_neighbors,
+        )
+
+    def _get_async_match_stub(self) -> match_service_pb2_grpc.MatchServiceStub:
+        """Get the asyncio match service stub, opening the grpc channel on first use.
+
+        Returns:
+            match_service_pb2_grpc.MatchServiceStub: Stub bound to an asyncio grpc channel.
+        """
+        if self._async_match_stub is None:
+            deployed_index = self._get_deployed_index()
+            server_ip = deployed_index.private_endpoints.match_grpc_address
+            self._async_channel = grpc.aio.insecure_channel(
+                f"{server_ip}:{_MATCH_GRPC_PORT}"
+            )
+            self._async_match_stub = match_service_pb2_grpc.MatchServiceStub(
+                self._async_channel
+            )
+            logger.info(f"Opened asyncio grpc channel to index endpoint {server_ip}")
+
+        return self._async_match_stub
+
+    async def connect_async(self, timeout: float = 30.0) -> None:
+        """Open the asyncio grpc channel and wait until it is connected.
+
+        Args:
+            timeout (float): Seconds to wait for the connection.
+        """
+        self._get_async_match_stub()
+        try:
+            await asyncio.wait_for(self._async_channel.channel_ready(), timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(
+                f"index endpoint not reachable within {timeout}s"
+            ) from None
+
+    async def match_async(
+        self, queries: list[list[float]], num_neighbors: int
+    ) -> list[list[MatchNeighbor]]:
+        """Perform vector search on the deployed index without blocking the event loop."""
+        batch_request_for_index = (
+            match_service_pb2.BatchMatchRequest.BatchMatchRequestPerIndex(
+                deployed_index_id=self._deployed_index_id,
+                requests=[
+                    match_service_pb2.MatchRequest(
+                        num_neighbors=num_neighbors,
+                        deployed_index_id=self._deployed_index_id,
+                        float_val=query,
+                    )
+                    for query in queries
+                ],
+            )
+        )
+        batch_request = match_service_pb2.BatchMatchRequest(
+            requests=[batch_request_for_index]
+        )
+
+        response = await self._get_async_match_stub().BatchMatch(batch_request)
+
+        return [
+            [
+                MatchNeighbor(id=neighbor.id, distance=neighbor.distance)
+                for neighbor in embedding_neighbors.neighbor
+            ]
+            for embedding_neighbors in response.responses[_FIRST_RESULT].responses
+        ]
+
+
+def load_embeddings(embeddings_dir: str) -> tuple[list[str], np.ndarray]:
+    """Load the JSONL embedding shards written by the MatchingEngineIndexer component.
+
+    Shards are read twice, once to count rows and once to fill a preallocated
+    float32 matrix, so embeddings are never held as Python floats.
+
+    Args:
+        embeddings_dir (str): Directory holding `embeddings*.json` shards.
+
+    Returns:
+        tuple[list[str], np.ndarray]: Id of each row and a contiguous float32 matrix
+                                        with one embedding per row.
+    """
+    paths = sorted(glob.glob(os.path.join(embeddings_dir, _EMBEDDINGS_FILE_PATTERN)))
+    if not paths:
+        raise ValueError(f"no {_EMBEDDINGS_FILE_PATTERN} shards in {embeddings_dir}")
+
+    count = 0
+    dimensions = 0
+    for path in paths:
+        with open(path) as shard:
+            for line in shard:
+                if not line.strip():
+                    continue
+                if count == 0:
+                    dimensions = len(json.loads(line)["embedding"])
+                count += 1
+
+    ids = []
+    embeddings = np.empty((count, dimensions), dtype=np.float32)
+    for path in paths:
+        with open(path) as shard:
+            for line in shard:
+                if not line.strip():
+                    continue
+                feature_vector = json.loads(line)
+                embeddings[len(ids)] = np.asarray(
+                    feature_vector["embedding"], dtype=np.float32
+                )
+                ids.append(feature_vector["id"])
+
+    logger.info(f"loaded {len(ids)} embeddings from {len(paths)} shards")
+
+    return ids, embeddings
+
+
+def load_projection(path: str) -> np.ndarray:
+    """Load the projection matrix written by the pipeline's EmbeddingProjector.
+
+    Args:
+        path (str): Path of `projection.npy`.
+
+    Returns:
+        np.ndarray: float32 matrix of shape (dimensions, reduced dimensions).
+    """
+    projection = np.load(path).astype(np.float32)
+    logger.info(
+        f"loaded projection from {projection.shape[0]} to {projection.shape[1]} dimensions"
+    )
+    return projection
+
+
+def project(queries: list[list[float]], projection: np.ndarray) -> list[list[float]]:
+    """Reduce query embeddings to the dimension of the indexed embeddings."""
+    return (np.asarray(queries, dtype=np.float32) @ projection).tolist()
+
+
+def top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Select the k highest scores of each row, highest first.
+
+    Args:
+        scores (np.ndarray): Scores of shape (num_queries, num_candidates).
+        k (int): Number of scores to select per row.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Column positions and scores of the selection.
+    """
+    k = min(k, scores.shape[1])
+    if k == 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(scores.dtype)
+
+    positions = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    selected = np.take_along_axis(scores, positions, axis=1)
+    order = np.argsort(-selected, axis=1, kind="stable")
+    return (
+        np.take_along_axis(positions, order, axis=1),
+        np.take_along_axis(selected, order, axis=1),
+    )
+
+
+def kmeans(
+    vectors: np.ndarray, num_clusters: int, iterations: int, seed: int = 0
+) -> np.ndarray:
+    """Train k-means centroids with Lloyd's algorithm.
+
+    Args:
+        vectors (np.ndarray): Training vectors, one per row.
+        num_clusters (int): Number of centroids.
+        iterations (int): Number of assignment and update rounds.
+        seed (int): Seed of the centroid initialization.
+
+    Returns:
+        np.ndarray: Centroids of shape (num_clusters, dimensions).
+    """
+    rng = np.random.default_rng(seed)
+    centroids = vectors[
+        rng.choice(len(vectors), size=num_clusters, replace=False)
+    ].copy()
+
+    for _ in range(iterations):
+        assignment = assign_nearest(vectors, centroids)
+        counts = np.bincount(assignment, minlength=num_clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+
+        # keep the previous centroid of a cluster left empty
+        non_empty = counts > 0
+        centroids[non_empty] = sums[non_empty] / counts[non_empty, None]
+
+    return centroids
+
+
+def assign_nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Assign each vector to its nearest centroid by euclidean distance.
+
+    Args:
+        vectors (np.ndarray): Vectors, one per row.
+        centroids (np.ndarray): Centroids, one per row.
+
+    Returns:
+        np.ndarray: Position of the nearest centroid of each vector.
+    """
+    # argmin |x - c|^2 == argmax x.c - |c|^2 / 2
+    half_norms = (centroids**2).sum(axis=1) / 2
+    assignment = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), _ASSIGN_CHUNK_SIZE):
+        chunk = vectors[start : start + _ASSIGN_CHUNK_SIZE]
+        assignment[start : start + len(chunk)] = np.argmax(
+            chunk @ centroids.T - half_norms, axis=1
+        )
+    return assignment
+
+
+class NumpyIndex(VectorIndex):
+    """In-process index over a float32 embedding matrix searched with NumPy.
+
+    Searches by brute force over every embedding, or with an inverted file (IVF)
+    when `num_partitions` is set: embeddings are partitioned by k-means and a
+    query only scans the `num_probes` partitions whose centroids score highest.
+    Distances are dot products, like DOT_PRODUCT_DISTANCE on Matching Engine.
+    """
+
+    def __init__(
+        self,
+        ids: list[str],
+        embeddings: np.ndarray,
+        num_partitions: int = 0,
+        num_probes: int = 1,
+        version: Optional[str] = None,
+    ) -> None:
+        """Build the index.
+
+        Args:
+            ids (list[str]): Id of each embedding row.
+            embeddings (np.ndarray): Embedding matrix with one embedding per row.
+            num_partitions (int): Number of IVF partitions, 0 searches by brute force.
+            num_probes (int): Number of IVF partitions scanned per query.
+            version (Optional[str]): Version of the embeddings.
+        """
+        if len(ids) != len(embeddings):
+            raise ValueError(f"got {len(ids)} ids for {len(embeddings)} embeddings")
+
+        self._num_probes = num_probes
+        self._version = version
+        self._centroids = None
+        self._offsets = None
+
+        if num_partitions > len(embeddings):
+            # k-means needs a distinct row to start each centroid
+            logger.warning(
+                f"reducing {num_partitions} ivf partitions to the "
+                f"{len(embeddings)} embeddings"
+            )
+            num_partitions = len(embeddings)
+
+        if num_partitions > 0:
+            # reorder rows so every partition is a contiguous block of the matrix
+            sample_size = min(
+                len(embeddings), num_partitions * _KMEANS_SAMPLES_PER_PARTITION
+            )
+            sample = embeddings[
+                np.random.default_rng(0).choice(
+                    len(embeddings), size=sample_size, replace=False
+                )
+            ]
+            self._centroids = kmeans(sample, num_partitions, _KMEANS_ITERATIONS)
+            assignment = assign_nearest(embeddings, self._centroids)
+            order = np.argsort(assignment, kind="stable")
+            self._offsets = np.concatenate(
+                ([0], np.cumsum(np.bincount(assignment, minlength=num_partitions)))
+            )
+            embeddings = embeddings[order]
+            ids = [ids[i] for i in order]
+            logger.info(f"built ivf index with {num_partitions} partitions")
+
+        self._ids = ids
+        self._embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+
+    @classmethod
+    def from_embeddings_dir(
+        cls, embeddings_dir: str, num_partitions: int = 0, num_probes: int = 1
+    ) -> "NumpyIndex":
+        """Build the index from the embedding shards of the MatchingEngineIndexer component.
+
+        Args:
+            embeddings_dir (str): Directory holding `embeddings*.json` shards.
+            num_partitions (int): Number of IVF partitions, 0 searches by brute force.
+            num_probes (int): Number of IVF partitions scanned per query.
+
+        Returns:
+            NumpyIndex: Index over the loaded embeddings.
+        """
+        ids, embeddings = load_embeddings(embeddings_dir)
+        version = str(
+            max(
+                os.path.getmtime(path)
+                for path in glob.glob(
+                    os.path.join(embeddings_dir, _EMBEDDINGS_FILE_PATTERN)
+                )
+            )
+        )
+        return cls(
+            ids,
+            embeddings,
+            num_partitions=num_partitions,
+            num_probes=num_probes,
+            version=version,
+        )
+
+    @property
+    def index_id(self) -> str:
+        return "numpy"
+
+    def get_version(self) -> Optional[str]:
+        return self._version
+
+    def _to_match_neighbors(
+        self, positions: np.ndarray, scores: np.ndarray
+    ) -> list[MatchNeighbor]:
+        return [
+            MatchNeighbor(id=self._ids[position], distance=float(score))
+            for position, score in zip(positions, scores)
+        ]
+
+    def _match_brute_force(
+        self, queries: np.ndarray, num_neighbors: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Score every row in chunks, so only one chunk of scores per query batch is
+        materialized at a time."""
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+
+        for start in range(0, len(self._embeddings), _SCORE_CHUNK_SIZE):
+            chunk = self._embeddings[start : start + _SCORE_CHUNK_SIZE]
+            positions, scores = top_k(queries @ chunk.T, num_neighbors)
+
+            # merge the chunk winners with the best rows so far
+            best_rows, best_scores = (
+                np.concatenate((best_rows, positions + start), axis=1),
+                np.concatenate((best_scores, scores), axis=1),
+            )
+            positions, best_scores = top_k(best_scores, num_neighbors)
+            best_rows = np.take_along_axis(best_rows, positions, axis=1)
+
+        return best_rows, best_scores
+
+    def match(
+        self, queries: list[list[float]], num_neighbors: int
+    ) -> list[list[MatchNeighbor]]:
+        queries = np.asarray(queries, dtype=np.float32)
+
+        if self._centroids is None:
+            positions, scores = self._match_brute_force(queries, num_neighbors)
+            return [
+                self._to_match_neighbors(query_positions, query_scores)
+                for query_positions, query_scores in zip(positions, scores)
+            ]
+
+        probes = top_k(queries @ self._centroids.T, self._num_probes)[0]
+        match_neighbors = []
+        for query, query_probes in zip(queries, probes):
+            candidates = np.concatenate(
+                [
+                    np.arange(self._offsets[probe], self._offsets[probe + 1])
+                    for probe in query_probes
+                ]
+            )
+            candidate_positions, scores = top_k(
+                (self._embeddings[candidates] @ query)[None, :], num_neighbors
+            )
+            match_neighbors.append(
+                self._to_match_neighbors(
+                    candidates[candidate_positions[_FIRST_RESULT]],
+                    scores[_FIRST_RESULT],
+                )
+            )
+        return match_neighbors
+
+    async def match_async(
+        self, queries: list[list[float]], num_neighbors: int
+    ) -> list[list[MatchNeighbor]]:
+        """Search in a worker thread, NumPy releases the GIL in matrix products."""
+        return await asyncio.to_thread(self.match, queries, num_neighbors)
+
+
+def evaluate_recall(
+    index: VectorIndex,
+    exact_index: VectorIndex,
+    queries: list[list[float]],
+    num_neighbors: int,
+) -> dict[str, float]:
+    """Measure recall and latency of an approximate index against exact search.
+
+    Args:
+        index (VectorIndex): Approximate index being evaluated.
+        exact_index (VectorIndex): Brute force index over the same embeddings.
+        queries (list[list[float]]): Query embeddings.
+        num_neighbors (int): Number of nearest neighbors retrieved per query.
+
+    Returns:
+        dict[str, float]: Mean recall@num_neighbors and mean latency per query in
+                            milliseconds of single query and batched searches.
+    """
+    exact_matches = exact_index.match(queries, num_neighbors)
+
+    start = time.perf_counter()
+    for query in queries:
+        index.match([query], num_neighbors)
+    single_latency = (time.perf_counter() - start) * 1000 / len(queries)
+
+    start = time.perf_counter()
+    matches = index.match(queries, num_neighbors)
+    batch_latency = (time.perf_counter() - start) * 1000 / len(queries)
+
+    recall = np.mean(
+        [
+            len({m.id for m in query} & {m.id for m in exact_query})
+            / max(len(exact_query), 1)
+            for query, exact_query in zip(matches, exact_matches)
+        ]
+    )
+    return {
+        f"recall@{num_neighbors}": float(recall),
+        "latency_ms": round(single_latency, 4),
+        "batch_latency_ms": round(batch_latency, 4),
+    }
+
+
+def create_vector_index(
+    index: str,
+    index_endpoint_resource: Optional[str] = None,
+    deployed_index_id: Optional[str] = None,
+    embeddings_dir: Optional[str] = None,
+    num_partitions: int = 0,
+    num_probes: int = 1,
+    index_path: Optional[str] = None,
+    dimensions: int = 384,
+    ef_search: int = 64,
+    num_threads: int = -1,
+    rescore_path: Optional[str] = None,
+    num_rescore: int = 200,
+) -> VectorIndex:
+    """Create the vector index selected by configuration.
+
+    Args:
+        index (str): Index backend, "vertex", "numpy", "hnsw", "store", "pq" or
+                        "binary".
+        index_endpoint_resource (Optional[str]): Index endpoint of the "vertex" backend.
+        deployed_index_id (Optional[str]): Deployed index id of the "vertex" backend.
+        embeddings_dir (Optional[str]): Embedding shards directory of the "numpy" backend.
+        num_partitions (int): Number of IVF partitions of the "numpy" backend.
+        num_probes (int): Number of IVF partitions scanned per query by the "numpy" backend.
+        index_path (Optional[str]): Saved graph of the "hnsw" backend, binary
+                                    embedding store of the "store" and "binary"
+                                    backends, or saved codes of the "pq" backend.
+        dimensions (int): Embedding dimension of the "hnsw" backend.
+        ef_search (int): Candidate list size per query of the "hnsw" backend.
+        num_threads (int): Threads searching a batch of the "hnsw" backend.
+        rescore_path (Optional[str]): Binary embedding store rescoring candidates of
+                                    the "pq" backend.
+        num_rescore (int): Candidates rescored per query by the "pq" and "binary"
+                            backends.
+
+    Returns:
+        VectorIndex: Index of the selected backend.
+    """
+    if index == "vertex":
+        index_endpoint = aiplatform.MatchingEngineIndexEndpoint(index_endpoint_resource)
+        logger.info("Connected to vertex ai index endpoint")
+        return VertexMatchingEngineIndex(index_endpoint, deployed_index_id)
+    if index == "numpy":
+        return NumpyIndex.from_embeddings_dir(
+            embeddings_dir, num_partitions=num_partitions, num_probes=num_probes
+        )
+    if index == "hnsw":
+        from .hnsw import HnswIndex
+
+        return HnswIndex.load(
+            index_path,
+            dimensions=dimensions,
+            ef_search=ef_search,
+            num_threads=num_threads,
+        )
+
+    if index == "store":
+        from .store import StoreIndex
+
+        return StoreIndex.open(index_path)
+
+    if index == "pq":
+        from .quantization import PqIndex
+
+        return PqIndex.load(
+            index_path, rescore_path=rescore_path, num_rescore=num_rescore
+        )
+
+    if index == "binary":
+        from .quantization import BinaryIndex
+
+        return BinaryIndex.open(index_path, num_rescore=num_rescore)
+
+    raise ValueError(
+        f"Unknown vector index {index}, "
+        "expected vertex, numpy, hnsw, store, pq or binary"
+    )
@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import time
+from typing import Iterator, Optional
+
+import anyio.to_thread
+from prometheus_client import Counter, Gauge, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from prometheus_client.registry import REGISTRY, Collector
+
+
+logger = logging.getLogger(__name__)
+
+# seconds, stages take from tens of microseconds (cache, serialize) to seconds
+_LATENCY_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+_SIZE_BUCKETS = (1, 2, 5, 10, 20, 40, 80, 120, 200, 500, 1000)
+
+REQUESTS = Counter(
+    "search_http_requests",
+    "HTTP requests by route, method and status code.",
+    ["route", "method", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "search_http_request_duration_seconds",
+    "HTTP request latency by route until the response starts.",
+    ["route"],
+    buckets=_LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "search_http_requests_in_progress", "HTTP requests being handled."
+)
+STAGE_LATENCY = Histogram(
+    "search_stage_duration_seconds",
+    "Latency of each search stage: cache, embed, match, fetch (redis) and serialize.",
+    ["stage"],
+    buckets=_LATENCY_BUCKETS,
+)
+REDIS_BATCH_SIZE = Histogram(
+    "search_redis_batch_size",
+    "Keys read per Redis round trip, by command.",
+    ["command"],
+    buckets=_SIZE_BUCKETS,
+)
+NEIGHBORS = Histogram(
+    "search_neighbors",
+    "Neighbors returned by the vector search per query.",
+    buckets=_SIZE_BUCKETS,
+)
+EVENT_LOOP_LAG = Histogram(
+    "search_event_loop_lag_seconds",
+    "Delay of a periodic event loop callback past its scheduled time.",
+    buckets=_LATENCY_BUCKETS,
+)
+
+# label children resolved once, so observing on the hot path is a single call
+_stage_latency = {}
+_redis_batch_size = {}
+
+
+def observe_stage(stage: str, seconds: float) -> None:
+    """Record the latency of one search stage."""
+    histogram = _stage_latency.get(stage)
+    if histogram is None:
+        histogram = _stage_latency[stage] = STAGE_LATENCY.labels(stage)
+    histogram.observe(seconds)
+
+
+def observe_redis_batch(command: str, num_keys: int) -> None:
+    """Record the number of keys read by one Redis round trip."""
+    histogram = _redis_batch_size.get(command)
+    if histogram is None:
+        histogram = _redis_batch_size[command] = REDIS_BATCH_SIZE.labels(command)
+    histogram.observe(num_keys)
+
+
+def observe_neighbors(num_neighbors: int) -> None:
+    """Record the number of neighbors returned for one query."""
+    NEIGHBORS.observe(num_neighbors)
+
+
+async def monitor_event_loop(interval: float = 0.5) -> None:
+    """Measure how late the event loop runs a callback scheduled every interval.
+
+    A busy or blocked loop delays every request it serves, the lag shows it
+    before latency does.
+
+    Args:
+        interval (float): Seconds between measurements.
+    """
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(time.perf_counter() - start - interval, 0.0))
+
+
+class SearchCollector(Collector):
+    """Collect counters kept by the search service and thread pool usage at scrape
+    time, instead of instrumenting every cache lookup."""
+
+    def __init__(self, post_vector_search) -> None:
+        """Initialize collector of a search service.
+
+        Args:
+            post_vector_search (PostVectorSearch): Search service of the app.
+        """
+        self._post_vector_search = post_vector_search
+
+    def collect(self) -> Iterator:
+        service = self._post_vector_search
+
+        cache_lookups = CounterMetricFamily(
+            "search_cache_lookups",
+            "Cache lookups by cache, tier and outcome, hits over all lookups of a "
+            "tier is its hit ratio.",
+            labels=["cache", "tier", "outcome"],
+        )
+        for name, cache in (
+            ("embedding", service.embedding_cache),
+            ("result", service.result_cache),
+        ):
+            stats = cache.stats()
+            cache_lookups.add_metric([name, "local", "hit"], stats["hits"])
+            cache_lookups.add_metric([name, "local", "miss"], stats["misses"])
+            cache_lookups.add_metric([name, "redis", "hit"], stats["redis_hits"])
+            cache_lookups.add_metric([name, "redis", "miss"], stats["redis_misses"])
+        stats = service.precomputed_results.stats()
+        cache_lookups.add_metric(["precomputed", "local", "hit"], stats["hits"])
+        cache_lookups.add_metric(["precomputed", "local", "miss"], stats["misses"])
+        yield cache_lookups
+
+        hedges = CounterMetricFamily(
+            "search_hedged_calls",
+            "Hedged embedding and vector search calls by outcome.",
+            labels=["stage", "outcome"],
+        )
+        for stage, stats in service.hedging_stats().items():
+            for outcome in ("calls", "hedges", "hedge_wins", "hedges_capped"):
+                hedges.add_metric([stage, outcome], stats[outcome])
+        yield hedges
+
+        batches = CounterMetricFamily(
+            "search_micro_batches",
+            "Micro-batches sent and items coalesced into them, by stage.",
+            labels=["stage", "kind"],
+        )
+        for stage, batcher in service.batchers().items():
+            batches.add_metric([stage, "batches"], batcher.num_batches)
+            batches.add_metric([stage, "items"], batcher.num_items)
+        yield batches
+
+        yield from self._collect_thread_pools()
+
+    def _collect_thread_pools(self) -> Iterator:
+        """Collect usage of the threads running blocking index, encoder and sync
+        endpoint work."""
+        threads = GaugeMetricFamily(
+            "search_thread_pool_threads",
+            "Threads of a pool by state, busy threads reaching max means saturation.",
+            labels=["pool", "state"],
+        )
+
+        try:
+            limiter = anyio.to_thread.current_default_thread_limiter()
+        except RuntimeError:
+            limiter = None  # scraped outside of the event loop
+        if limiter is not None:
+            threads.add_metric(["anyio", "busy"], limiter.borrowed_tokens)
+            threads.add_metric(["anyio", "max"], limiter.total_tokens)
+
+        # ThreadPoolExecutor has no public usage counters, its private attributes
+        # are read when present and skipped when a Python version drops them
+        executor = _default_executor()
+        started = getattr(executor, "_threads", None)
+        if started is not None:
+            threads.add_metric(["asyncio", "started"], len(started))
+        max_workers = getattr(executor, "_max_workers", None)
+        if max_workers is not None:
+            threads.add_metric(["asyncio", "max"], max_workers)
+        work_queue = getattr(executor, "_work_queue", None)
+        if work_queue is not None:
+            threads.add_metric(["asyncio", "queued"], work_queue.qsize())
+        yield threads
+
+
+def _default_executor() -> Optional[object]:
+    """Get the default executor of the running loop used by `asyncio.to_thread`."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    return getattr(loop, "_default_executor", None)
+
+
+def register_search_collector(post_vector_search) -> None:
+    """Register the collector of a search service with the default registry."""
+    REGISTRY.register(SearchCollector(post_vector_search))
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests and timing them until the response starts.
+
+    Plain ASGI rather than `BaseHTTPMiddleware`, which adds a task and a memory
+    stream to every request.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                REQUEST_LATENCY.labels(_route(scope)).observe(
+                    time.perf_counter() - start
+                )
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_PROGRESS.dec()
+            REQUESTS.labels(_route(scope), scope["method"], str(status)).inc()
+
+
+def _route(scope) -> str:
+    """Get the route template of a request, keeping label cardinality bounded."""
+    route = scope.get("route")
+    return route.path if route is not None else "unmatched"
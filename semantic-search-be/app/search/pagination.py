@@ -0,0 +1,84 @@
+import base64
+import binascii
+import secrets
+import struct
+
+from google.cloud.aiplatform.matching_engine.matching_engine_index_endpoint import (
+    MatchNeighbor,
+)
+
+
+CURSOR_PREFIX = "cursor:"
+# neighbor lists are fixed size records, so a page is one GETRANGE of its slice
+_NEIGHBOR = struct.Struct("<Qf")
+_TOKEN_BYTES = 12
+
+
+def new_token() -> str:
+    """Create a random token identifying a stored neighbor list."""
+    return secrets.token_hex(_TOKEN_BYTES)
+
+
+def pack_neighbors(match_neighbors: list[MatchNeighbor]) -> bytes:
+    """Pack neighbors as uint64 post id and float32 distance records.
+
+    Args:
+        match_neighbors (list[MatchNeighbor]): Matched neighbors, closest first.
+
+    Returns:
+        bytes: Packed neighbor records.
+    """
+    return b"".join(
+        _NEIGHBOR.pack(int(match.id), match.distance) for match in match_neighbors
+    )
+
+
+def unpack_neighbors(packed: bytes) -> list[MatchNeighbor]:
+    """Unpack neighbor records written by `pack_neighbors`."""
+    return [
+        MatchNeighbor(id=str(id), distance=distance)
+        for id, distance in _NEIGHBOR.iter_unpack(packed)
+    ]
+
+
+def neighbor_range(offset: int, count: int) -> tuple[int, int]:
+    """Get the inclusive byte range of count neighbor records starting at offset."""
+    return offset * _NEIGHBOR.size, (offset + count) * _NEIGHBOR.size - 1
+
+
+def num_packed_neighbors(length: int) -> int:
+    """Get the number of neighbor records in a packed value of length bytes."""
+    return length // _NEIGHBOR.size
+
+
+def encode_cursor(token: str, offset: int) -> str:
+    """Encode a stored neighbor list token and the offset of the next page.
+
+    Args:
+        token (str): Token of the stored neighbor list.
+        offset (int): Position of the first neighbor of the next page.
+
+    Returns:
+        str: Opaque URL safe cursor.
+    """
+    return base64.urlsafe_b64encode(f"{token}:{offset}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, int]:
+    """Decode a cursor written by `encode_cursor`.
+
+    Args:
+        cursor (str): Opaque cursor.
+
+    Returns:
+        tuple[str, int]: Token of the stored neighbor list and next page offset.
+    """
+    try:
+        decoded = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        token, offset = decoded.decode().split(":")
+        offset = int(offset)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("malformed cursor")
+    if offset < 0:
+        raise ValueError("malformed cursor")
+    return token, offset
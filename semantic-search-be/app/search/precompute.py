@@ -0,0 +1,91 @@
+import logging
+from typing import Optional
+
+from .cache import normalize_query
+
+
+logger = logging.getLogger(__name__)
+
+
+class PrecomputedResults:
+    """Serialized search results of known queries, such as the search suggestions,
+    computed ahead of time for one index version.
+
+    Unlike the result cache nothing is evicted, every result is replaced at once
+    when the results are recomputed for a new index version.
+
+    Attributes:
+        hits (int): Number of lookups answered.
+        misses (int): Number of lookups not answered.
+    """
+
+    def __init__(self) -> None:
+        """Initialize store without results."""
+        self._version: Optional[str] = None
+        self._num_neighbors: Optional[int] = None
+        self._results: dict[str, bytes] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def version(self) -> Optional[str]:
+        """Index version the results were computed for, None before the first run."""
+        return self._version
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get(
+        self, text: str, num_neighbors: int, index_version: Optional[str]
+    ) -> Optional[bytes]:
+        """Get the precomputed result of a search.
+
+        Args:
+            text (str): Search term, normalized like result cache keys.
+            num_neighbors (int): Number of nearest neighbors.
+            index_version (Optional[str]): Version of the index searched.
+
+        Returns:
+            Optional[bytes]: Serialized result, or None when it was not precomputed
+                for that number of neighbors and index version.
+        """
+        result = None
+        if (
+            index_version is not None
+            and index_version == self._version
+            and num_neighbors == self._num_neighbors
+        ):
+            result = self._results.get(normalize_query(text))
+
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return result
+
+    def replace(
+        self, index_version: str, num_neighbors: int, results: dict[str, bytes]
+    ) -> None:
+        """Replace every result with the ones computed for an index version.
+
+        Args:
+            index_version (str): Version of the index the results were computed for.
+            num_neighbors (int): Number of nearest neighbors of every result.
+            results (dict[str, bytes]): Serialized result keyed by search term.
+        """
+        self._results = {
+            normalize_query(text): result for text, result in results.items()
+        }
+        self._version = index_version
+        self._num_neighbors = num_neighbors
+        logger.info(
+            f"precomputed {len(self._results)} results for index version {index_version}"
+        )
+
+    def stats(self) -> dict[str, int]:
+        """Get the number of results and the hit and miss counters.
+
+        Returns:
+            dict[str, int]: Counters keyed by outcome.
+        """
+        return {"size": len(self._results), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,467 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+from google.cloud.aiplatform.matching_engine.matching_engine_index_endpoint import (
+    MatchNeighbor,
+)
+
+from .index import VectorIndex, assign_nearest, kmeans, top_k
+from .store import EmbeddingStore
+
+
+logger = logging.getLogger(__name__)
+
+NUM_CENTROIDS = 256
+_TRAINING_SAMPLE_SIZE = 65536
+_SCORE_CHUNK_SIZE = 65536
+_PACK_CHUNK_SIZE = 65536
+_WORD_BYTES = 8
+
+
+class ProductQuantizer:
+    """Product quantizer splitting embeddings into subspaces of 256 centroids each.
+
+    An embedding is encoded as one byte per subspace, the position of the nearest
+    centroid of its subvector. Queries are not quantized, their dot product with a
+    code is the sum of per-subspace lookup table entries (asymmetric distance).
+    """
+
+    def __init__(self, codebooks: np.ndarray) -> None:
+        """Initialize quantizer from trained codebooks.
+
+        Args:
+            codebooks (np.ndarray): Centroids of shape
+                                    (num_subspaces, 256, dimensions / num_subspaces).
+        """
+        self.codebooks = codebooks.astype(np.float32)
+
+    @classmethod
+    def train(
+        cls,
+        embeddings: np.ndarray,
+        num_subspaces: int,
+        iterations: int = 20,
+        seed: int = 0,
+    ) -> "ProductQuantizer":
+        """Train the codebook of each subspace with k-means on a sample.
+
+        Args:
+            embeddings (np.ndarray): Embedding matrix with one embedding per row.
+            num_subspaces (int): Number of subspaces, bytes per code. Must divide the
+                                    embedding dimension.
+            iterations (int): k-means rounds per subspace.
+            seed (int): Seed of the sample and centroid initialization.
+
+        Returns:
+            ProductQuantizer: Trained quantizer.
+        """
+        dimensions = embeddings.shape[1]
+        if dimensions % num_subspaces:
+            raise ValueError(
+                f"{num_subspaces} subspaces do not divide {dimensions} dimensions"
+            )
+        if len(embeddings) < NUM_CENTROIDS:
+            raise ValueError(f"training needs at least {NUM_CENTROIDS} embeddings")
+
+        rng = np.random.default_rng(seed)
+        sample = embeddings[
+            rng.choice(
+                len(embeddings),
+                size=min(_TRAINING_SAMPLE_SIZE, len(embeddings)),
+                replace=False,
+            )
+        ].astype(np.float32)
+
+        subvectors = sample.reshape(len(sample), num_subspaces, -1)
+        codebooks = np.stack(
+            [
+                kmeans(subvectors[:, j], NUM_CENTROIDS, iterations, seed=seed + j)
+                for j in range(num_subspaces)
+            ]
+        )
+        logger.info(f"trained product quantizer with {num_subspaces} subspaces")
+        return cls(codebooks)
+
+    @property
+    def num_subspaces(self) -> int:
+        return self.codebooks.shape[0]
+
+    @property
+    def dimensions(self) -> int:
+        return self.codebooks.shape[0] * self.codebooks.shape[2]
+
+    def encode(self, embeddings: np.ndarray) -> np.ndarray:
+        """Encode embeddings to codes.
+
+        Args:
+            embeddings (np.ndarray): Embedding matrix with one embedding per row.
+
+        Returns:
+            np.ndarray: uint8 codes of shape (num_embeddings, num_subspaces).
+        """
+        subvectors = np.asarray(embeddings, dtype=np.float32).reshape(
+            len(embeddings), self.num_subspaces, -1
+        )
+        codes = np.empty((len(embeddings), self.num_subspaces), dtype=np.uint8)
+        for j, codebook in enumerate(self.codebooks):
+            codes[:, j] = assign_nearest(subvectors[:, j], codebook)
+        return codes
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Reconstruct approximate embeddings from codes."""
+        return self.codebooks[np.arange(self.num_subspaces), codes].reshape(
+            len(codes), -1
+        )
+
+    def lookup_tables(self, queries: np.ndarray) -> np.ndarray:
+        """Compute the dot product of each query subvector with every centroid.
+
+        Args:
+            queries (np.ndarray): float32 query embeddings, one per row.
+
+        Returns:
+            np.ndarray: Tables of shape (num_queries, num_subspaces, 256).
+        """
+        subvectors = queries.reshape(len(queries), self.num_subspaces, -1)
+        return np.einsum("qjd,jcd->qjc", subvectors, self.codebooks)
+
+    def score(self, tables: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Approximate the dot products of queries and encoded embeddings.
+
+        Args:
+            tables (np.ndarray): Lookup tables of the queries.
+            codes (np.ndarray): Codes of the scored embeddings.
+
+        Returns:
+            np.ndarray: Scores of shape (num_queries, num_codes).
+        """
+        scores = np.zeros((len(tables), len(codes)), dtype=np.float32)
+        for j in range(self.num_subspaces):
+            scores += tables[:, j, codes[:, j]]
+        return scores
+
+
+class PqIndex(VectorIndex):
+    """Index scanning product quantization codes with asymmetric distance.
+
+    Codes take `num_subspaces` bytes per embedding instead of 4 bytes per dimension.
+    When a full precision embedding store is given, the best `num_rescore`
+    candidates are rescored exactly with the stored embeddings, which are only
+    paged in for the candidate rows.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        codes: np.ndarray,
+        quantizer: ProductQuantizer,
+        rescore_store: Optional[EmbeddingStore] = None,
+        num_rescore: int = 200,
+        version: Optional[str] = None,
+    ) -> None:
+        """Initialize index over encoded embeddings.
+
+        Args:
+            ids (np.ndarray): uint64 post id of each code.
+            codes (np.ndarray): uint8 codes, one per row.
+            quantizer (ProductQuantizer): Quantizer that encoded the codes.
+            rescore_store (Optional[EmbeddingStore]): Store of the same embeddings in
+                                    the same row order, used for exact rescoring.
+            num_rescore (int): Candidates rescored per query, 0 disables rescoring.
+            version (Optional[str]): Version of the indexed embeddings.
+        """
+        if rescore_store is not None and len(rescore_store) != len(codes):
+            raise ValueError("rescore store and codes have different sizes")
+
+        self._ids = ids
+        self._codes = codes
+        self._quantizer = quantizer
+        self._rescore_store = rescore_store
+        self.num_rescore = num_rescore
+        self._version = version
+
+    @classmethod
+    def build(
+        cls,
+        ids: list[str],
+        embeddings: np.ndarray,
+        num_subspaces: int = 48,
+        iterations: int = 20,
+    ) -> "PqIndex":
+        """Train a quantizer on the embeddings and encode them.
+
+        Args:
+            ids (list[str]): Integer post id of each embedding row.
+            embeddings (np.ndarray): Embedding matrix with one embedding per row.
+            num_subspaces (int): Number of subspaces, bytes per code.
+            iterations (int): k-means rounds per subspace.
+
+        Returns:
+            PqIndex: Index over the codes, without rescoring.
+        """
+        quantizer = ProductQuantizer.train(embeddings, num_subspaces, iterations)
+        codes = quantizer.encode(embeddings)
+        logger.info(f"encoded {len(ids)} embeddings to {num_subspaces} byte codes")
+
+        return cls(np.array([int(id) for id in ids], dtype=np.uint64), codes, quantizer)
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        rescore_path: Optional[str] = None,
+        num_rescore: int = 200,
+    ) -> "PqIndex":
+        """Load an index saved with `save`.
+
+        Args:
+            path (str): Path of the saved index.
+            rescore_path (Optional[str]): Binary embedding store used for rescoring.
+            num_rescore (int): Candidates rescored per query.
+
+        Returns:
+            PqIndex: Loaded index.
+        """
+        with np.load(path) as saved:
+            ids, codes, codebooks = saved["ids"], saved["codes"], saved["codebooks"]
+        logger.info(f"loaded product quantization index of {len(ids)} codes")
+
+        return cls(
+            ids,
+            codes,
+            ProductQuantizer(codebooks),
+            rescore_store=EmbeddingStore(rescore_path) if rescore_path else None,
+            num_rescore=num_rescore,
+            version=str(os.path.getmtime(path)),
+        )
+
+    def save(self, path: str) -> None:
+        """Save ids, codes and codebooks to a single uncompressed npz file.
+
+        Args:
+            path (str): Path of the saved index.
+        """
+        with open(path, "wb") as f:
+            np.savez(
+                f,
+                ids=self._ids,
+                codes=self._codes,
+                codebooks=self._quantizer.codebooks,
+            )
+
+    @property
+    def index_id(self) -> str:
+        return "pq"
+
+    def get_version(self) -> Optional[str]:
+        return self._version
+
+    def _rescore(
+        self, queries: np.ndarray, rows: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Rescore candidate rows of each query with full precision embeddings."""
+        scores = np.stack(
+            [
+                self._rescore_store.get(query_rows) @ query
+                for query, query_rows in zip(queries, rows)
+            ]
+        )
+        positions, scores = top_k(scores, scores.shape[1])
+        return np.take_along_axis(rows, positions, axis=1), scores
+
+    def match(
+        self, queries: list[list[float]], num_neighbors: int
+    ) -> list[list[MatchNeighbor]]:
+        queries = np.asarray(queries, dtype=np.float32)
+        rescore = self._rescore_store is not None and self.num_rescore > 0
+        num_candidates = (
+            max(num_neighbors, self.num_rescore) if rescore else num_neighbors
+        )
+
+        tables = self._quantizer.lookup_tables(queries)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, len(self._codes), _SCORE_CHUNK_SIZE):
+            scores = self._quantizer.score(
+                tables, self._codes[start : start + _SCORE_CHUNK_SIZE]
+            )
+            positions, scores = top_k(scores, num_candidates)
+
+            # merge the chunk winners with the best rows so far
+            best_rows = np.concatenate((best_rows, positions + start), axis=1)
+            best_scores = np.concatenate((best_scores, scores), axis=1)
+            positions, best_scores = top_k(best_scores, num_candidates)
+            best_rows = np.take_along_axis(best_rows, positions, axis=1)
+
+        if rescore:
+            best_rows, best_scores = self._rescore(queries, best_rows)
+
+        return [
+            [
+                MatchNeighbor(id=str(self._ids[row]), distance=float(score))
+                for row, score in zip(rows[:num_neighbors], scores[:num_neighbors])
+            ]
+            for rows, scores in zip(best_rows, best_scores)
+        ]
+
+    async def match_async(
+        self, queries: list[list[float]], num_neighbors: int
+    ) -> list[list[MatchNeighbor]]:
+        """Search in a worker thread, NumPy releases the GIL in table lookups."""
+        return await asyncio.to_thread(self.match, queries, num_neighbors)
+
+
+def pack_sign_bits(embeddings: np.ndarray) -> np.ndarray:
+    """Reduce embeddings to the sign bit of each dimension.
+
+    Args:
+        embeddings (np.ndarray): Embedding matrix with one embedding per row.
+
+    Returns:
+        np.ndarray: uint64 words of shape (num_embeddings, ceil(dimensions / 64)),
+                    384 dimensions pack to 6 words (48 bytes).
+    """
+    bits = np.packbits(np.asarray(embeddings) > 0, axis=1)
+    padding = -bits.shape[1] % _WORD_BYTES
+    if padding:
+        bits = np.pad(bits, ((0, 0), (0, padding)))
+    return np.ascontiguousarray(bits).view(np.uint64)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """Count set bits of uint64 words with SWAR arithmetic."""
+    words = words - ((words >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    words = (words & np.uint64(0x3333333333333333)) + (
+        (words >> np.uint64(2)) & np.uint64(0x3333333333333333)
+    )
+    words = (words + (words >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return (words * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+
+def hamming_distances(query_bits: np.ndarray, bits: np.ndarray) -> np.ndarray:
+    """Count differing sign bits between queries and packed embeddings.
+
+    Args:
+        query_bits (np.ndarray): Packed sign bits of the queries.
+        bits (np.ndarray): Packed sign bits of the embeddings.
+
+    Returns:
+        np.ndarray: int32 distances of shape (num_queries, num_embeddings).
+    """
+    distances = np.zeros((len(query_bits), len(bits)), dtype=np.int32)
+    for j in range(bits.shape[1]):
+        distances += popcount(query_bits[:, j, None] ^ bits[None, :, j]).astype(
+            np.int32
+        )
+    return distances
+
+
+class BinaryIndex(VectorIndex):
+    """Index prefiltering with sign bits and reranking from an embedding store.
+
+    Every embedding is reduced to one sign bit per dimension and scanned with XOR
+    and popcount. The `num_rescore` candidates with the fewest differing bits are
+    rescored exactly with the stored embeddings, which are only paged in for the
+    candidate rows.
+    """
+
+    def __init__(
+        self,
+        store: EmbeddingStore,
+        num_rescore: int = 200,
+        version: Optional[str] = None,
+    ) -> None:
+        """Pack the sign bits of every stored embedding.
+
+        Args:
+            store (EmbeddingStore): Mapped embedding store.
+            num_rescore (int): Candidates rescored per query, 0 ranks by hamming
+                                distance alone.
+            version (Optional[str]): Version of the stored embeddings.
+        """
+        self._store = store
+        self._bits = np.concatenate(
+            [
+                pack_sign_bits(store.matrix[start : start + _PACK_CHUNK_SIZE])
+                for start in range(0, len(store), _PACK_CHUNK_SIZE)
+            ]
+        )
+        self.num_rescore = num_rescore
+        self._version = version
+        logger.info(f"packed sign bits of {len(store)} embeddings")
+
+    @classmethod
+    def open(cls, path: str, num_rescore: int = 200) -> "BinaryIndex":
+        """Map a store file and pack its sign bits.
+
+        Args:
+            path (str): Path of the store file.
+            num_rescore (int): Candidates rescored per query.
+
+        Returns:
+            BinaryIndex: Index over the store.
+        """
+        return cls(
+            EmbeddingStore(path),
+            num_rescore=num_rescore,
+            version=str(os.path.getmtime(path)),
+        )
+
+    @property
+    def index_id(self) -> str:
+        return "binary"
+
+    def get_version(self) -> Optional[str]:
+        return self._version
+
+    def match(
+        self, queries: list[list[float]], num_neighbors: int
+    ) -> list[list[MatchNeighbor]]:
+        queries = np.asarray(queries, dtype=np.float32)
+        num_candidates = max(num_neighbors, self.num_rescore)
+
+        query_bits = pack_sign_bits(queries)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.int32)
+        for start in range(0, len(self._bits), _SCORE_CHUNK_SIZE):
+            # fewest differing bits first
+            scores = -hamming_distances(
+                query_bits, self._bits[start : start + _SCORE_CHUNK_SIZE]
+            )
+            positions, scores = top_k(scores, num_candidates)
+
+            # merge the chunk winners with the best rows so far
+            best_rows = np.concatenate((best_rows, positions + start), axis=1)
+            best_scores = np.concatenate((best_scores, scores), axis=1)
+            positions, best_scores = top_k(best_scores, num_candidates)
+            best_rows = np.take_along_axis(best_rows, positions, axis=1)
+
+        if self.num_rescore > 0:
+            best_scores = np.stack(
+                [
+                    self._store.get(rows) @ query
+                    for query, rows in zip(queries, best_rows)
+                ]
+            )
+        else:
+            # 1 - 2 * hamming / dimensions estimates the cosine similarity
+            best_scores = 1 + 2 * best_scores / self._store.dimensions
+
+        positions, best_scores = top_k(best_scores, num_neighbors)
+        best_rows = np.take_along_axis(best_rows, positions, axis=1)
+        return [
+            [
+                MatchNeighbor(id=str(self._store.ids[row]), distance=float(score))
+                for row, score in zip(rows, scores)
+            ]
+            for rows, scores in zip(best_rows, best_scores)
+        ]
+
+    async def match_async(
+        self, queries: list[list[float]], num_neighbors: int
+    ) -> list[list[MatchNeighbor]]:
+        """Search in a worker thread, NumPy releases the GIL in bitwise operations."""
+        return await asyncio.to_thread(self.match, queries, num_neighbors)
@@ -0,0 +1,117 @@
+import struct
+import zlib
+
+
+# Binary post record stored as one Redis string under the post id:
+#   flags:  uint8, record format version, high bit set when the rest is zlib compressed
+#   header: uint16 title length, uint16 body length, uint8 number of tags
+#   title and body UTF-8 bytes, then each tag as uint8 length and UTF-8 bytes
+RECORD_VERSION = 1
+_COMPRESSED = 0x80
+_FLAGS = struct.Struct("<B")
+_HEADER = struct.Struct("<HHB")
+_TAG_LENGTH = struct.Struct("<B")
+_TAG_SEPARATOR = "|"
+_MAX_TEXT_LENGTH = 0xFFFF
+_MAX_TAGS = 0xFF
+_MAX_TAG_LENGTH = 0xFF
+
+
+def encode_post(
+    title: str, body: str, tags: list[str], compress: bool = False
+) -> bytes:
+    """Encode a post to a binary record.
+
+    Args:
+        title (str): Title of the post.
+        body (str): Body content of the post.
+        tags (list[str]): Tags of the post.
+        compress (bool): Compress the record with zlib when that makes it smaller.
+
+    Returns:
+        bytes: Binary record.
+
+    Raises:
+        ValueError: A field is too long for the record header.
+    """
+    title_bytes = title.encode("utf-8")
+    body_bytes = body.encode("utf-8")
+    tag_bytes = [tag.encode("utf-8") for tag in tags]
+
+    if len(title_bytes) > _MAX_TEXT_LENGTH:
+        raise ValueError(
+            f"title of {len(title_bytes)} bytes, records hold {_MAX_TEXT_LENGTH}"
+        )
+    if len(body_bytes) > _MAX_TEXT_LENGTH:
+        raise ValueError(
+            f"body of {len(body_bytes)} bytes, records hold {_MAX_TEXT_LENGTH}"
+        )
+    if len(tag_bytes) > _MAX_TAGS:
+        raise ValueError(f"{len(tag_bytes)} tags, records hold {_MAX_TAGS}")
+    for tag in tag_bytes:
+        if len(tag) > _MAX_TAG_LENGTH:
+            raise ValueError(
+                f"tag of {len(tag)} bytes, records hold {_MAX_TAG_LENGTH}"
+            )
+
+    payload = b"".join(
+        [
+            _HEADER.pack(len(title_bytes), len(body_bytes), len(tag_bytes)),
+            title_bytes,
+            body_bytes,
+            *(_TAG_LENGTH.pack(len(tag)) + tag for tag in tag_bytes),
+        ]
+    )
+
+    if compress:
+        compressed = zlib.compress(payload, level=9)
+        if len(compressed) < len(payload):
+            return _FLAGS.pack(RECORD_VERSION | _COMPRESSED) + compressed
+    return _FLAGS.pack(RECORD_VERSION) + payload
+
+
+def decode_post(record: bytes) -> dict:
+    """Decode a binary record written by `encode_post`.
+
+    Args:
+        record (bytes): Binary record.
+
+    Returns:
+        dict: Post with "title", "body" and "tags" list.
+    """
+    (flags,) = _FLAGS.unpack_from(record)
+    if flags & ~_COMPRESSED != RECORD_VERSION:
+        raise ValueError(f"unsupported post record version {flags & ~_COMPRESSED}")
+
+    payload = zlib.decompress(record[1:]) if flags & _COMPRESSED else record[1:]
+    title_length, body_length, num_tags = _HEADER.unpack_from(payload)
+
+    offset = _HEADER.size
+    title = payload[offset : offset + title_length].decode("utf-8")
+    offset += title_length
+    body = payload[offset : offset + body_length].decode("utf-8")
+    offset += body_length
+
+    tags = []
+    for _ in range(num_tags):
+        tag_length = payload[offset]
+        tags.append(payload[offset + 1 : offset + 1 + tag_length].decode("utf-8"))
+        offset += 1 + tag_length
+
+    return {"title": title, "body": body, "tags": tags}
+
+
+def post_from_hash(post_hash: dict[str, str]) -> dict:
+    """Convert a post stored in the Redis hash layout to the decoded record layout.
+
+    Args:
+        post_hash (dict[str, str]): Hash with "title", "body" and "|" separated "tags".
+
+    Returns:
+        dict: Post with "title", "body" and "tags" list.
+    """
+    return {
+        "title": post_hash["title"],
+        "body": post_hash["body"],
+        "tags": post_hash["tags"].split(_TAG_SEPARATOR),
+    }
@@ -0,0 +1,201 @@
+import asyncio
+import contextlib
+import contextvars
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Iterator, Optional
+
+import grpc
+import httpx
+import redis.exceptions
+from google.api_core import exceptions as google_exceptions
+from opentelemetry import trace
+
+
+logger = logging.getLogger(__name__)
+
+# transient failures of the model endpoint, the index endpoint and redis, any other
+# error, such as a ValueError of an empty query or a missing post, fails fast
+_RETRYABLE_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    redis.exceptions.ConnectionError,
+    redis.exceptions.TimeoutError,
+    httpx.TransportError,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.DeadlineExceeded,
+    google_exceptions.InternalServerError,
+    google_exceptions.TooManyRequests,
+    google_exceptions.Aborted,
+)
+_RETRYABLE_HTTP_STATUS = {429, 500, 502, 503, 504}
+_RETRYABLE_GRPC_CODES = {
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+    grpc.StatusCode.ABORTED,
+}
+
+# monotonic time the current request has to finish by, None when it has no deadline
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "deadline", default=None
+)
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a request runs out of its deadline, it is never retried."""
+
+
+@contextlib.contextmanager
+def deadline(timeout: Optional[float]) -> Iterator[None]:
+    """Limit the time every retried stage of the current request may take in total.
+
+    Nested deadlines keep the earlier expiry, so a search calling another search
+    entry point shares one budget.
+
+    Args:
+        timeout (Optional[float]): Seconds from now, None or 0 sets no deadline.
+    """
+    expiry = _deadline.get()
+    if timeout:
+        expiry = min(expiry or float("inf"), time.monotonic() + timeout)
+
+    token = _deadline.set(expiry)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Get the seconds left until the current request's deadline, None without one."""
+    expiry = _deadline.get()
+    if expiry is None:
+        return None
+    return expiry - time.monotonic()
+
+
+def is_retryable(error: Exception) -> bool:
+    """Check whether an error is a transient failure worth retrying.
+
+    Args:
+        error (Exception): Error raised by a stage.
+
+    Returns:
+        bool: True for connection errors, timeouts, overload and server errors.
+    """
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in _RETRYABLE_HTTP_STATUS
+    if isinstance(error, grpc.RpcError) and callable(getattr(error, "code", None)):
+        return error.code() in _RETRYABLE_GRPC_CODES
+    return isinstance(error, _RETRYABLE_ERRORS)
+
+
+class RetryPolicy:
+    """Retry one stage of a search with exponential backoff and full jitter.
+
+    Only errors accepted by `is_retryable` are retried, and no attempt or backoff
+    is started past the deadline of the current request.
+    """
+
+    def __init__(
+        self,
+        stage: str,
+        max_attempts: int = 3,
+        base_delay: float = 0.05,
+        max_delay: float = 1.0,
+    ) -> None:
+        """Initialize retry policy of a stage.
+
+        Args:
+            stage (str): Name of the stage in logs and errors.
+            max_attempts (int): Maximum number of attempts, 1 disables retries.
+            base_delay (float): Backoff cap in seconds after the first failed attempt,
+                                doubled after every further one.
+            max_delay (float): Maximum backoff cap in seconds.
+        """
+        self.stage = stage
+        self._max_attempts = max(max_attempts, 1)
+        self._base_delay = base_delay
+        self._max_delay = max_delay
+        self.num_retries = 0
+
+    def backoff(self, attempt: int) -> float:
+        """Get a random delay before the retry following attempt, counted from 0."""
+        return random.uniform(0, min(self._max_delay, self._base_delay * 2**attempt))
+
+    def _check_deadline(self, delay: float = 0.0) -> Optional[float]:
+        """Get the time left for an attempt after delay, raising when there is none."""
+        remaining = remaining_time()
+        if remaining is not None and remaining <= delay:
+            raise DeadlineExceeded(f"deadline exceeded before {self.stage} finished")
+        return None if remaining is None else remaining - delay
+
+    def _should_retry(self, attempt: int, error: Exception) -> bool:
+        """Log a failed attempt and decide whether to attempt again."""
+        if attempt + 1 >= self._max_attempts or not is_retryable(error):
+            return False
+        logger.info(f"{self.stage} attempt #{attempt} failed with {str(error)}")
+        trace.get_current_span().add_event(
+            "retry", {"stage": self.stage, "attempt": attempt, "error": str(error)}
+        )
+        self.num_retries += 1
+        return True
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call func, retrying transient failures.
+
+        The deadline is checked between attempts, a blocking attempt in progress
+        is not interrupted.
+
+        Args:
+            func (Callable[..., Any]): Stage function.
+            *args: Positional arguments of func.
+            **kwargs: Keyword arguments of func.
+
+        Returns:
+            Any: Result of func.
+        """
+        for attempt in range(self._max_attempts):
+            self._check_deadline()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if not self._should_retry(attempt, e):
+                    raise
+                delay = self.backoff(attempt)
+                self._check_deadline(delay)
+                time.sleep(delay)
+
+    async def call_async(self, func: Callable[..., Awaitable[Any]], *args, **kwargs):
+        """Asyncio variant of `call`, also cancelling an attempt at the deadline.
+
+        Args:
+            func (Callable[..., Awaitable[Any]]): Stage coroutine function.
+            *args: Positional arguments of func.
+            **kwargs: Keyword arguments of func.
+
+        Returns:
+            Any: Result of func.
+        """
+        for attempt in range(self._max_attempts):
+            timeout = self._check_deadline()
+            try:
+                return await asyncio.wait_for(func(*args, **kwargs), timeout)
+            except asyncio.TimeoutError as e:
+                remaining = remaining_time()
+                if remaining is not None and remaining <= 0:
+                    raise DeadlineExceeded(
+                        f"deadline exceeded before {self.stage} finished"
+                    ) from e
+                if not self._should_retry(attempt, e):
+                    raise
+            except Exception as e:
+                if not self._should_retry(attempt, e):
+                    raise
+            delay = self.backoff(attempt)
+            self._check_deadline(delay)
+            await asyncio.sleep(delay)
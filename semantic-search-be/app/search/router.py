@@ -1,47 +1,396 @@
+import asyncio
 import json
+import logging
 import random
 import time
 
-from typing import Annotated
-from fastapi import APIRouter, Query
+from typing import Annotated, AsyncIterator, Literal, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from opentelemetry.propagate import extract
 
+from .completion import CompletionIndex
+from .metrics import register_search_collector
+from .retry import RetryPolicy
 from .service import PostVectorSearch
 from . import config
-from .schema import Result
+from .schema import (
+    MAX_COMPLETIONS,
+    MAX_NUM_NEIGHBORS,
+    BatchResult,
+    BatchSearchRequest,
+    PageResult,
+    Result,
+)
+from .serialization import dumps
+from .timing import rounded, server_timing, stage_timings
+from .tracing import tracer
+
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/search", tags=["search"])
 
-# Initialize PostVectorSearch instance
-post_vector_search = PostVectorSearch(
-    model_endpoint_resource=config.VERTEX_AI_MODEL_ENDPOINT_RESOURCE,
-    index_endpoint_resource=config.VERTEX_AI_INDEX_ENDPOINT_RESOURCE,
-    deployed_index_id=config.DEPLOYED_INDEX_ID,
-    redis_host=config.REDIS_HOST,
-    redis_port=config.REDIS_PORT,
-)
 NUM_NEIGHBORS = 40
 
 # Load sample questions from a JSON file
 with open("search_suggestion.json") as data:
     sample_questions = json.load(data)
 
+# PostVectorSearch instance, created by `run_search_service` once the app started
+_post_vector_search: Optional[PostVectorSearch] = None
+_startup_error: Optional[str] = None
+# Title completions, mapped by `run_search_service` when COMPLETION_INDEX_PATH is set
+_completion_index: Optional[CompletionIndex] = None
+
+
+def create_post_vector_search() -> PostVectorSearch:
+    """Create the search service from the environment configuration.
+
+    Blocks on Vertex AI endpoint lookups and index loading, so it runs in a thread.
+
+    Returns:
+        PostVectorSearch: Search service.
+    """
+    return PostVectorSearch(
+        model_endpoint_resource=config.VERTEX_AI_MODEL_ENDPOINT_RESOURCE,
+        index_endpoint_resource=config.VERTEX_AI_INDEX_ENDPOINT_RESOURCE,
+        deployed_index_id=config.DEPLOYED_INDEX_ID,
+        redis_host=config.REDIS_HOST,
+        redis_port=config.REDIS_PORT,
+        redis_cluster=config.REDIS_CLUSTER,
+        embedding_cache_size=config.EMBEDDING_CACHE_SIZE,
+        embedding_cache_ttl=config.EMBEDDING_CACHE_TTL,
+        embedding_cache_redis=config.EMBEDDING_CACHE_REDIS,
+        result_cache_size=config.RESULT_CACHE_SIZE,
+        result_cache_ttl=config.RESULT_CACHE_TTL,
+        result_cache_redis=config.RESULT_CACHE_REDIS,
+        index_version_refresh_interval=config.INDEX_VERSION_REFRESH_INTERVAL,
+        batch_max_size=config.BATCH_MAX_SIZE,
+        batch_max_wait=config.BATCH_MAX_WAIT,
+        query_encoder=config.QUERY_ENCODER,
+        onnx_model_dir=config.ONNX_MODEL_DIR,
+        vector_index=config.VECTOR_INDEX,
+        embeddings_dir=config.EMBEDDINGS_DIR,
+        index_num_partitions=config.INDEX_NUM_PARTITIONS,
+        index_num_probes=config.INDEX_NUM_PROBES,
+        index_path=config.INDEX_PATH,
+        index_dimensions=config.INDEX_DIMENSIONS,
+        index_ef_search=config.INDEX_EF_SEARCH,
+        index_num_threads=config.INDEX_NUM_THREADS,
+        index_rescore_path=config.INDEX_RESCORE_PATH,
+        index_num_rescore=config.INDEX_NUM_RESCORE,
+        projection_path=config.PROJECTION_PATH,
+        page_num_neighbors=config.PAGE_NUM_NEIGHBORS,
+        page_cursor_ttl=config.PAGE_CURSOR_TTL,
+        request_timeout=config.REQUEST_TIMEOUT,
+        batch_request_timeout=config.BATCH_REQUEST_TIMEOUT,
+        embed_max_attempts=config.EMBED_MAX_ATTEMPTS,
+        match_max_attempts=config.MATCH_MAX_ATTEMPTS,
+        fetch_max_attempts=config.FETCH_MAX_ATTEMPTS,
+        retry_base_delay=config.RETRY_BASE_DELAY,
+        retry_max_delay=config.RETRY_MAX_DELAY,
+        hedge_percentile=config.HEDGE_PERCENTILE,
+        hedge_max_rate=config.HEDGE_MAX_RATE,
+    )
+
+
+async def run_search_service() -> None:
+    """Create, connect and warm up the search service, then keep the index version
+    fresh and the results of the search suggestions precomputed, run by the app
+    lifespan until shutdown.
+
+    Runs in the background so uvicorn binds while the service starts, the search
+    endpoints answer 503 and `/ready` reports not ready until it is done. A failed
+    startup is retried with backoff, `/ready` reports the last error meanwhile.
+    """
+    global _post_vector_search, _startup_error, _completion_index
+
+    questions = [suggestion["question"] for suggestion in sample_questions]
+    if config.COMPLETION_INDEX_PATH:
+        # completions are optional, a bad index leaves only /search/complete down
+        try:
+            _completion_index = CompletionIndex(config.COMPLETION_INDEX_PATH)
+        except Exception:
+            logger.exception("completion index failed to load")
+
+    retry_policy = RetryPolicy(
+        "startup",
+        base_delay=config.STARTUP_RETRY_BASE_DELAY,
+        max_delay=config.STARTUP_RETRY_MAX_DELAY,
+    )
+    attempt = 0
+    while True:
+        post_vector_search = None
+        try:
+            post_vector_search = await asyncio.to_thread(create_post_vector_search)
+            await post_vector_search.connect_async(config.CONNECT_TIMEOUT)
+            await asyncio.to_thread(post_vector_search.refresh_index_version)
+            register_search_collector(post_vector_search)
+            await post_vector_search.warm_up_async(
+                questions[: config.WARMUP_NUM_QUERIES], NUM_NEIGHBORS
+            )
+            break
+        except Exception as e:
+            # raising would only end the background task, retry until shutdown
+            _startup_error = str(e)
+            delay = retry_policy.backoff(attempt)
+            logger.exception(
+                f"search service failed to start, retrying in {delay:.1f} seconds"
+            )
+            if post_vector_search is not None:
+                await post_vector_search.close_async()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    _startup_error = None
+    _post_vector_search = post_vector_search
+
+    background = [post_vector_search.keep_index_version_fresh_async()]
+    if config.PRECOMPUTE_SUGGESTIONS:
+        background.append(
+            post_vector_search.keep_results_precomputed_async(
+                questions,
+                NUM_NEIGHBORS,
+                batch_size=config.PRECOMPUTE_BATCH_SIZE,
+                interval=config.INDEX_VERSION_REFRESH_INTERVAL,
+            )
+        )
+    await asyncio.gather(*background)
+
+
+async def stop_search_service() -> None:
+    """Finish the in-flight work of the search service, run by the app lifespan on
+    shutdown."""
+    if _post_vector_search is not None:
+        await _post_vector_search.close_async()
+
+
+def readiness() -> tuple[bool, Optional[str]]:
+    """Get whether the search service is ready to serve, and why it failed to start.
+
+    Returns:
+        tuple[bool, Optional[str]]: Readiness and startup error, if any.
+    """
+    return _post_vector_search is not None, _startup_error
+
+
+def get_post_vector_search() -> PostVectorSearch:
+    """Get the search service, answering 503 while it starts.
+
+    Returns:
+        PostVectorSearch: Search service.
+    """
+    if _post_vector_search is None:
+        raise HTTPException(status_code=503, detail="Search service is starting")
+    return _post_vector_search
+
 
-@router.get("")
-def search(query: Annotated[str, Query(min_length=3)]) -> Result:
+@router.get("", response_model=Result)
+async def search(
+    query: Annotated[str, Query(min_length=3)], request: Request
+) -> Response:
     """Endpoint for performing a semantic search based on the given query.
 
     Args:
         query (str): Search query.
+        request (Request): HTTP request, carrying the caller's trace context.
 
     Returns:
         Result: Result object containing latency, number of matches, and matched posts.
     """
+    post_vector_search = get_post_vector_search()
     start = time.perf_counter()
-    matches = post_vector_search.search(text=query, num_neighbors=NUM_NEIGHBORS)
+    with tracer.start_as_current_span(
+        "router.search", context=extract(request.headers)
+    ) as span, stage_timings() as stage_latency:
+        span.set_attribute("num_neighbors", NUM_NEIGHBORS)
+        result = await post_vector_search.search_result_async(
+            text=query, num_neighbors=NUM_NEIGHBORS
+        )
     stop = time.perf_counter()
     latency = round((stop - start) * 1000, 2)  # to milliseconds
-    return Result(latency=latency, num_matches=len(matches), matches=matches)
+
+    return _json_response_with_latency(latency, result, stage_latency)
+
+
+def _json_response_with_latency(
+    latency: float, result: bytes, stage_latency: Optional[dict[str, float]] = None
+) -> Response:
+    """Prepend latency to a serialized result instead of rebuilding its model.
+
+    Args:
+        latency (float): Latency of the request in milliseconds.
+        result (bytes): Serialized result without latency.
+        stage_latency (Optional[dict[str, float]]): Milliseconds of each search
+            stage, added to the result and as a Server-Timing header.
+
+    Returns:
+        Response: JSON response.
+    """
+    prefix = b'{"latency":' + dumps(latency) + b","
+    headers = None
+    if stage_latency is not None:
+        prefix += b'"stage_latency":' + dumps(rounded(stage_latency)) + b","
+        headers = {"Server-Timing": server_timing(stage_latency, latency)}
+    return Response(
+        content=prefix + result[1:], media_type="application/json", headers=headers
+    )
+
+
+@router.get("/stream")
+async def search_stream(
+    query: Annotated[str, Query(min_length=3)],
+    num_neighbors: Annotated[int, Query(gt=0, le=MAX_NUM_NEIGHBORS)] = NUM_NEIGHBORS,
+    format: Literal["ndjson", "sse"] = "ndjson",
+) -> StreamingResponse:
+    """Endpoint for a semantic search streaming matches as their posts are fetched.
+
+    The first record is a header with the embed and match latency in milliseconds
+    and the number of matches, then one record per match with the fields of
+    `PostMatch`, closest first. Records are newline delimited JSON, or Server-Sent
+    Events named `header` and `match` when format is "sse".
+
+    Args:
+        query (str): Search query.
+        num_neighbors (int): Number of nearest neighbors to retrieve.
+        format (str): "ndjson" or "sse".
+
+    Returns:
+        StreamingResponse: Stream of the header and match records.
+    """
+    post_vector_search = get_post_vector_search()
+    # embed and match before streaming, so their errors still get an error status
+    match_neighbors, stage_latency = await post_vector_search.find_match_timed_async(
+        text=query, num_neighbors=num_neighbors
+    )
+    header = {
+        "embed_latency": stage_latency["embed"],
+        "match_latency": stage_latency["match"],
+        "num_matches": len(match_neighbors),
+    }
+
+    if format == "sse":
+        media_type = "text/event-stream"
+
+        def record(event: str, data) -> bytes:
+            return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+    else:
+        media_type = "application/x-ndjson"
+
+        def record(event: str, data) -> bytes:
+            return dumps(data) + b"\n"
+
+    async def records() -> AsyncIterator[bytes]:
+        yield record("header", header)
+        async for matches in post_vector_search.stream_posts_async(
+            match_neighbors, chunk_size=config.STREAM_CHUNK_SIZE
+        ):
+            yield b"".join(record("match", match) for match in matches)
+
+    return StreamingResponse(
+        records(),
+        media_type=media_type,
+        headers={"Server-Timing": server_timing(stage_latency)},
+    )
+
+
+@router.get("/page", response_model=PageResult)
+async def search_page(
+    query: Annotated[Optional[str], Query(min_length=3)] = None,
+    cursor: Optional[str] = None,
+    page_size: Annotated[int, Query(gt=0, le=MAX_NUM_NEIGHBORS)] = 10,
+) -> Response:
+    """Endpoint for a paginated semantic search.
+
+    The first page, requested with a query, retrieves an oversized neighbor list
+    and keeps it in Redis under the returned cursor. Later pages, requested with
+    the cursor of the previous page, skip embedding and vector search.
+
+    Args:
+        query (Optional[str]): Search query of the first page.
+        cursor (Optional[str]): `next_cursor` of the previous page.
+        page_size (int): Number of matches per page.
+
+    Returns:
+        PageResult: Matched posts of the page and the cursor of the next page.
+    """
+    post_vector_search = get_post_vector_search()
+    if (query is None) == (cursor is None):
+        raise HTTPException(
+            status_code=400, detail="Exactly one of query or cursor is required"
+        )
+
+    start = time.perf_counter()
+    with stage_timings() as stage_latency:
+        if cursor is None:
+            result = await post_vector_search.search_page_async(
+                text=query, page_size=page_size
+            )
+        else:
+            try:
+                result = await post_vector_search.next_page_async(
+                    cursor=cursor, page_size=page_size
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            if result is None:
+                raise HTTPException(status_code=404, detail="Cursor expired")
+    stop = time.perf_counter()
+    latency = round((stop - start) * 1000, 2)  # to milliseconds
+
+    return _json_response_with_latency(latency, result, stage_latency)
+
+
+@router.post("/batch", response_model=BatchResult)
+async def search_batch(request: BatchSearchRequest) -> Response:
+    """Endpoint for performing semantic searches of many queries in one request.
+
+    Args:
+        request (BatchSearchRequest): Queries, each with its own number of neighbors.
+
+    Returns:
+        BatchResult: Result of each query in request order, and latency of each stage.
+    """
+    post_vector_search = get_post_vector_search()
+    start = time.perf_counter()
+    with stage_timings() as stage_latency:
+        result = await post_vector_search.search_batch_json_async(
+            texts=[query.query for query in request.queries],
+            num_neighbors=[query.num_neighbors for query in request.queries],
+        )
+    stop = time.perf_counter()
+    latency = round((stop - start) * 1000, 2)  # to milliseconds
+
+    # the batch result already has its stage latency
+    response = _json_response_with_latency(latency, result)
+    response.headers["Server-Timing"] = server_timing(stage_latency, latency)
+    return response
+
+
+@router.get("/complete")
+async def complete(
+    prefix: Annotated[str, Query(min_length=1, max_length=200)],
+    limit: Annotated[int, Query(gt=0, le=MAX_COMPLETIONS)] = 10,
+) -> list[str]:
+    """Endpoint for completing a typed prefix with post titles.
+
+    A lookup in the mapped completion index without model or index calls, so the
+    frontend can call it on every keystroke.
+
+    Args:
+        prefix (str): Typed text.
+        limit (int): Maximum number of titles.
+
+    Returns:
+        list[str]: Titles starting with the prefix, in lexicographic order.
+    """
+    if _completion_index is None:
+        if not config.COMPLETION_INDEX_PATH:
+            raise HTTPException(status_code=404, detail="Completions are disabled")
+        raise HTTPException(status_code=503, detail="Completions are unavailable")
+    return _completion_index.complete(prefix, limit)
 
 
 @router.get("/suggestions")
@@ -53,3 +402,31 @@ def get_suggestion() -> list[str]:
     """
     suggestions = random.choices(sample_questions, k=3)
     return [suggestion["question"] for suggestion in suggestions]
+
+
+@router.get("/cache")
+def get_cache_stats() -> dict[str, dict[str, int]]:
+    """Endpoint for retrieving embedding, result cache and precomputed result hit and
+    miss counters.
+
+    Returns:
+        dict[str, dict[str, int]]: Counters of each cache keyed by tier and outcome.
+    """
+    post_vector_search = get_post_vector_search()
+    return {
+        "embedding": post_vector_search.embedding_cache.stats(),
+        "result": post_vector_search.result_cache.stats(),
+        "precomputed": post_vector_search.precomputed_results.stats(),
+    }
+
+
+@router.get("/hedging")
+def get_hedging_stats() -> dict[str, dict]:
+    """Endpoint for retrieving hedged embedding and vector search counters.
+
+    Returns:
+        dict[str, dict]: Hedge counters, delay and latency percentiles in
+            milliseconds of each hedged stage.
+    """
+    post_vector_search = get_post_vector_search()
+    return post_vector_search.hedging_stats()
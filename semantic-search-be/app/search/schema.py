@@ -1,4 +1,11 @@
-from pydantic import BaseModel
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+MAX_NUM_NEIGHBORS = 200
+MAX_BATCH_QUERIES = 1000
+MAX_COMPLETIONS = 20
 
 
 class Post(BaseModel):
@@ -29,6 +36,27 @@ class PostMatch(BaseModel):
     post: Post
 
 
+class StageLatency(BaseModel):
+    """Pydantic model representing the latency of each search stage in milliseconds.
+
+    Stages a request skips, such as everything but the cache on a result cache hit,
+    are None.
+
+    Attributes:
+        cache (Optional[float]): Latency of the result cache lookup and update.
+        embed (Optional[float]): Latency of converting queries to embeddings.
+        match (Optional[float]): Latency of the vector search.
+        fetch (Optional[float]): Latency of retrieving posts from Redis.
+        serialize (Optional[float]): Latency of building the JSON response body.
+    """
+
+    cache: Optional[float] = None
+    embed: Optional[float] = None
+    match: Optional[float] = None
+    fetch: Optional[float] = None
+    serialize: Optional[float] = None
+
+
 class Result(BaseModel):
     """Pydantic model representing the result of a search operation.
 
@@ -36,8 +64,76 @@ class Result(BaseModel):
         latency (float): Latency of the search operation.
         num_matches (int): Number of matches found.
         matches (list[PostMatch]): List of matched posts.
+        stage_latency (Optional[StageLatency]): Latency of each search stage.
+    """
+
+    latency: float
+    num_matches: int
+    matches: list[PostMatch]
+    stage_latency: Optional[StageLatency] = None
+
+
+class PageResult(BaseModel):
+    """Pydantic model representing one page of a paginated search.
+
+    Attributes:
+        latency (float): Latency of the page request.
+        num_matches (int): Number of matches on the page.
+        matches (list[PostMatch]): Matched posts of the page.
+        next_cursor (Optional[str]): Cursor of the next page, None on the last page.
+        stage_latency (Optional[StageLatency]): Latency of each search stage.
     """
 
     latency: float
     num_matches: int
     matches: list[PostMatch]
+    next_cursor: Optional[str] = None
+    stage_latency: Optional[StageLatency] = None
+
+
+class BatchQuery(BaseModel):
+    """Pydantic model representing one query of a batch search.
+
+    Attributes:
+        query (str): Search query.
+        num_neighbors (int): Number of nearest neighbors to retrieve.
+    """
+
+    query: str = Field(min_length=3)
+    num_neighbors: int = Field(default=40, gt=0, le=MAX_NUM_NEIGHBORS)
+
+
+class BatchSearchRequest(BaseModel):
+    """Pydantic model representing a batch search request.
+
+    Attributes:
+        queries (list[BatchQuery]): Queries searched together.
+    """
+
+    queries: list[BatchQuery] = Field(min_length=1, max_length=MAX_BATCH_QUERIES)
+
+
+class QueryResult(BaseModel):
+    """Pydantic model representing the result of one query of a batch search.
+
+    Attributes:
+        num_matches (int): Number of matches found.
+        matches (list[PostMatch]): List of matched posts.
+    """
+
+    num_matches: int
+    matches: list[PostMatch]
+
+
+class BatchResult(BaseModel):
+    """Pydantic model representing the result of a batch search operation.
+
+    Attributes:
+        latency (float): Latency of the batch search operation.
+        stage_latency (StageLatency): Latency of each search stage.
+        results (list[QueryResult]): Result of each query, in request order.
+    """
+
+    latency: float
+    stage_latency: StageLatency
+    results: list[QueryResult]
@@ -0,0 +1,66 @@
+import json
+
+from google.cloud.aiplatform.matching_engine.matching_engine_index_endpoint import (
+    MatchNeighbor,
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps(obj) -> bytes:
+    """Encode plain dicts and lists to JSON bytes, with orjson when it is installed.
+
+    Args:
+        obj: JSON compatible object of dicts, lists, strings and numbers.
+
+    Returns:
+        bytes: UTF-8 encoded JSON.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def match_dicts(match_neighbors: list[MatchNeighbor], posts: list[dict]) -> list[dict]:
+    """Build `PostMatch` shaped dicts without constructing or validating models.
+
+    Args:
+        match_neighbors (list[MatchNeighbor]): List of matched neighbors.
+        posts (list[dict]): Post with "title", "body" and "tags" list of each match.
+
+    Returns:
+        list[dict]: One dict per match with the fields of `PostMatch`, in order.
+    """
+    return [
+        {
+            "id": match.id,
+            "distance": round(float(match.distance), 2),
+            "post": {
+                "title": post["title"],
+                "body": post["body"],
+                "tags": post["tags"],
+            },
+        }
+        for match, post in zip(match_neighbors, posts)
+    ]
+
+
+def serialize_matches(match_neighbors: list[MatchNeighbor], posts: list[dict]) -> bytes:
+    """Serialize matches as the `num_matches` and `matches` fields of a `Result`.
+
+    Args:
+        match_neighbors (list[MatchNeighbor]): List of matched neighbors.
+        posts (list[dict]): Post of each matched neighbor.
+
+    Returns:
+        bytes: JSON object with `num_matches` and `matches`.
+    """
+    return dumps(
+        {
+            "num_matches": len(match_neighbors),
+            "matches": match_dicts(match_neighbors, posts),
+        }
+    )
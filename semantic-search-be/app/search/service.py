@@ -1,12 +1,41 @@
-import redis
+import asyncio
+import functools
 import logging
-from google.cloud import aiplatform
 from google.cloud.aiplatform.matching_engine.matching_engine_index_endpoint import (
     MatchNeighbor,
 )
-import time
+from typing import AsyncIterator, Optional
 
+from .batching import MicroBatcher
+from .cache import EmbeddingCache, ResultCache
+from .cluster import (
+    create_async_redis_client,
+    create_redis_client,
+    mget,
+    mget_async,
+    num_mget_commands,
+)
+from .encoder import QueryEncoder, create_query_encoder
+from .hedging import Hedger
+from .index import VectorIndex, create_vector_index, load_projection, project
+from .metrics import observe_neighbors, observe_redis_batch
+from .pagination import (
+    CURSOR_PREFIX,
+    decode_cursor,
+    encode_cursor,
+    neighbor_range,
+    new_token,
+    num_packed_neighbors,
+    pack_neighbors,
+    unpack_neighbors,
+)
+from .precompute import PrecomputedResults
+from .records import decode_post, post_from_hash
+from .retry import RetryPolicy, deadline
 from .schema import Post, PostMatch
+from .serialization import dumps, match_dicts, serialize_matches
+from .timing import rounded, stage_timings, timed
+from .tracing import current_span, traced, tracer
 
 
 logger = logging.getLogger(__name__)
@@ -14,41 +43,86 @@ logger = logging.getLogger(__name__)
 _FIRST_RESULT = 0
 
 
-def retry(max_retries, wait_time):
-    """Decorator for retrying a function in case of exceptions.
+def _with_deadline(timeout_attribute: str):
+    """Create a decorator running a search entry point under a deadline.
+
+    Every retried stage called by the entry point shares the deadline, see
+    `retry.deadline`.
 
     Args:
-        max_retries (int): Maximum number of retries.
-        wait_time (float): Time to wait between retries in seconds.
+        timeout_attribute (str): `PostVectorSearch` attribute holding the timeout.
 
     Returns:
-        function: Decorated function.
+        function: Decorator of `PostVectorSearch` methods.
     """
 
     def decorator(func):
-        def wrapper(*args, **kwargs):
-            for retries in range(max_retries):
-                try:
-                    result = func(*args, **kwargs)
-                    return result
-                except Exception as e:
-                    logger.info(f"Try #{retries} failed with {str(e)}: Retrying..:")
-                    time.sleep(wait_time)
-            raise Exception(f"Max retries of function {func} exceeded, Error: {str(e)}")
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                with deadline(getattr(self, timeout_attribute)):
+                    return await func(self, *args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            with deadline(getattr(self, timeout_attribute)):
+                return func(self, *args, **kwargs)
 
         return wrapper
 
     return decorator
 
 
+# single searches share the per-request deadline, batches of many queries their own
+with_request_deadline = _with_deadline("_request_timeout")
+with_batch_deadline = _with_deadline("_batch_request_timeout")
+
+
 class PostVectorSearch:
     def __init__(
         self,
-        model_endpoint_resource: str,
-        index_endpoint_resource: str,
-        deployed_index_id: str,
+        model_endpoint_resource: Optional[str],
+        index_endpoint_resource: Optional[str],
+        deployed_index_id: Optional[str],
         redis_host: str,
         redis_port: str,
+        redis_cluster: bool = False,
+        embedding_cache_size: int = 1024,
+        embedding_cache_ttl: float = 86400,
+        embedding_cache_redis: bool = False,
+        result_cache_size: int = 256,
+        result_cache_ttl: float = 86400,
+        result_cache_redis: bool = False,
+        index_version_refresh_interval: float = 60,
+        batch_max_size: int = 32,
+        batch_max_wait: float = 0.002,
+        query_encoder: str = "vertex",
+        onnx_model_dir: Optional[str] = None,
+        vector_index: str = "vertex",
+        embeddings_dir: Optional[str] = None,
+        index_num_partitions: int = 0,
+        index_num_probes: int = 1,
+        index_path: Optional[str] = None,
+        index_dimensions: int = 384,
+        index_ef_search: int = 64,
+        index_num_threads: int = -1,
+        index_rescore_path: Optional[str] = None,
+        index_num_rescore: int = 200,
+        projection_path: Optional[str] = None,
+        page_num_neighbors: int = 200,
+        page_cursor_ttl: int = 900,
+        request_timeout: float = 5.0,
+        batch_request_timeout: float = 30.0,
+        embed_max_attempts: int = 3,
+        match_max_attempts: int = 3,
+        fetch_max_attempts: int = 3,
+        retry_base_delay: float = 0.05,
+        retry_max_delay: float = 1.0,
+        hedge_percentile: float = 0,
+        hedge_max_rate: float = 0.1,
     ) -> None:
         """Initialize client for Redis, Vertex AI model, and index endpoints.
 
@@ -61,25 +135,392 @@ class PostVectorSearch:
                                 specified when deploying index endpoint
             redis_host: redis server host
             redis_port: redis server port
+            redis_cluster: redis_host and redis_port are a node of a redis cluster,
+                            posts are fetched from every node in parallel
+            embedding_cache_size: max number of query embeddings cached in process
+            embedding_cache_ttl: seconds a cached query embedding stays valid
+            embedding_cache_redis: share cached query embeddings through redis
+            result_cache_size: max number of serialized search results cached in process
+            result_cache_ttl: seconds a cached search result stays valid
+            result_cache_redis: share cached search results through redis
+            index_version_refresh_interval: seconds between index version lookups
+            batch_max_size: max number of concurrent queries coalesced into one
+                            embedding or vector search call
+            batch_max_wait: seconds to wait for concurrent queries before sending a batch
+            query_encoder: backend converting queries to embeddings, "vertex" sends them
+                            to the model endpoint and "onnx" runs the model in process
+            onnx_model_dir: local directory of the model run by the "onnx" backend
+            vector_index: backend searching nearest neighbors, "vertex" searches the
+                            deployed index, "numpy" searches embeddings in process,
+                            "hnsw" searches a graph index in process, "store"
+                            scans a memory-mapped binary embedding store, "pq"
+                            scans product quantization codes and "binary" scans
+                            sign bits of a store and reranks exactly
+            embeddings_dir: local directory of the embedding shards written by the
+                            pipeline, loaded by the "numpy" backend
+            index_num_partitions: IVF partitions of the "numpy" backend, 0 is brute force
+            index_num_probes: IVF partitions scanned per query by the "numpy" backend
+            index_path: saved graph of the "hnsw" backend, store of the "store" and
+                        "binary" backends or codes of the "pq" backend
+            index_dimensions: embedding dimension of the "hnsw" backend
+            index_ef_search: candidate list size per query of the "hnsw" backend
+            index_num_threads: threads searching a batch of the "hnsw" backend
+            index_rescore_path: binary embedding store rescoring candidates of the
+                                "pq" backend, unset disables rescoring
+            index_num_rescore: candidates rescored per query by the "pq" and
+                                "binary" backends
+            projection_path: projection matrix reducing query embeddings to the
+                                dimension of the indexed embeddings, unset searches
+                                full dimension embeddings
+            page_num_neighbors: neighbors retrieved by the first page of a paginated
+                                search and kept for its later pages
+            page_cursor_ttl: seconds the neighbor list of a paginated search stays
+                                in redis
+            request_timeout: seconds a search may spend in its embed, match and
+                                fetch stages including retries, 0 disables the deadline
+            batch_request_timeout: seconds a batch search or a precomputed batch may
+                                spend in its stages, 0 disables the deadline
+            embed_max_attempts: attempts of the query embedding stage
+            match_max_attempts: attempts of the vector search stage
+            fetch_max_attempts: attempts of the redis post fetch stage
+            retry_base_delay: backoff cap in seconds after a first failed attempt,
+                                doubled after every further one
+            retry_max_delay: max backoff cap in seconds
+            hedge_percentile: percentile of recent embedding and vector search
+                                latencies after which a duplicate call is sent,
+                                0 disables hedging
+            hedge_max_rate: max fraction of recent calls hedged
         """
-        self._model_endpoint = aiplatform.PrivateEndpoint(model_endpoint_resource)
-        logger.info("Connected to vertex ai model endpoint")
+        self._encoder: QueryEncoder = create_query_encoder(
+            query_encoder,
+            model_endpoint_resource=model_endpoint_resource,
+            onnx_model_dir=onnx_model_dir,
+        )
 
-        self._index_endpoint = aiplatform.MatchingEngineIndexEndpoint(
-            index_endpoint_resource
+        self._index: VectorIndex = create_vector_index(
+            vector_index,
+            index_endpoint_resource=index_endpoint_resource,
+            deployed_index_id=deployed_index_id,
+            embeddings_dir=embeddings_dir,
+            num_partitions=index_num_partitions,
+            num_probes=index_num_probes,
+            index_path=index_path,
+            dimensions=index_dimensions,
+            ef_search=index_ef_search,
+            num_threads=index_num_threads,
+            rescore_path=index_rescore_path,
+            num_rescore=index_num_rescore,
         )
-        logger.info("Connected to vertex ai index endpoint")
 
-        self._deployed_index_id = deployed_index_id
+        self._projection = load_projection(projection_path) if projection_path else None
+
+        self._redis_client = create_redis_client(
+            redis_host, redis_port, redis_cluster, decode_responses=True
+        )
 
-        self._redis_client = redis.Redis(
-            host=redis_host, port=redis_port, decode_responses=True
+        self._async_redis_client = create_async_redis_client(
+            redis_host, redis_port, redis_cluster, decode_responses=True
         )
 
         logger.info(
-            f"Initialize redis client on host {redis_host} and port {redis_port}"
+            f"Initialize redis {'cluster ' if redis_cluster else ''}client on host "
+            f"{redis_host} and port {redis_port}"
+        )
+
+        # caches and binary post records store bytes, so their redis clients must
+        # not decode responses
+        binary_redis_client = create_redis_client(redis_host, redis_port, redis_cluster)
+        async_binary_redis_client = create_async_redis_client(
+            redis_host, redis_port, redis_cluster
+        )
+        self._binary_redis_client = binary_redis_client
+        self._async_binary_redis_client = async_binary_redis_client
+
+        self._embedding_cache = EmbeddingCache(
+            max_size=embedding_cache_size,
+            ttl=embedding_cache_ttl,
+            redis_client=binary_redis_client if embedding_cache_redis else None,
+            async_redis_client=(
+                async_binary_redis_client if embedding_cache_redis else None
+            ),
+        )
+
+        self._result_cache = ResultCache(
+            max_size=result_cache_size,
+            ttl=result_cache_ttl,
+            redis_client=binary_redis_client if result_cache_redis else None,
+            async_redis_client=(
+                async_binary_redis_client if result_cache_redis else None
+            ),
+        )
+
+        # results of the search suggestions, filled by `keep_results_precomputed_async`
+        self._precomputed_results = PrecomputedResults()
+
+        self._page_num_neighbors = page_num_neighbors
+        self._page_cursor_ttl = page_cursor_ttl
+
+        # stages retry transient failures on their own, so a redis error does not
+        # repeat the embedding and vector search
+        self._request_timeout = request_timeout
+        self._batch_request_timeout = batch_request_timeout
+        self._embed_retry = RetryPolicy(
+            "embed", embed_max_attempts, retry_base_delay, retry_max_delay
+        )
+        self._match_retry = RetryPolicy(
+            "match", match_max_attempts, retry_base_delay, retry_max_delay
+        )
+        self._fetch_retry = RetryPolicy(
+            "fetch", fetch_max_attempts, retry_base_delay, retry_max_delay
+        )
+
+        # duplicates of slow embedding and vector search calls of the asyncio path
+        self._embed_hedger = (
+            Hedger("embed", hedge_percentile, hedge_max_rate)
+            if hedge_percentile
+            else None
+        )
+        self._match_hedger = (
+            Hedger("match", hedge_percentile, hedge_max_rate)
+            if hedge_percentile
+            else None
+        )
+
+        self._index_version = None
+        self._index_version_refresh_interval = index_version_refresh_interval
+
+        # concurrent queries of the asyncio search path share embedding and match calls
+        self._batch_max_size = max(batch_max_size, 1)
+        self._embed_batcher = MicroBatcher(
+            self._encode_async, max_batch_size=batch_max_size, max_wait=batch_max_wait
+        )
+        self._match_batcher = MicroBatcher(
+            self._match_batch_async,
+            max_batch_size=batch_max_size,
+            max_wait=batch_max_wait,
         )
 
+    async def connect_async(self, timeout: float = 30.0) -> None:
+        """Establish the Redis connection pools and the index connections.
+
+        Clients connect lazily, so without this the first searches of a new
+        instance pay for the connection setup.
+
+        Args:
+            timeout (float): Seconds to wait for Redis and for the index.
+        """
+        await asyncio.gather(
+            self._ping_redis_async(timeout), self._index.connect_async(timeout)
+        )
+        logger.info("Connected to redis and the vector index")
+
+    async def _ping_redis_async(self, timeout: float) -> None:
+        """Ping every Redis client, failing when Redis does not answer in time."""
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    self._async_redis_client.ping(),
+                    self._async_binary_redis_client.ping(),
+                    asyncio.to_thread(self._redis_client.ping),
+                    asyncio.to_thread(self._binary_redis_client.ping),
+                ),
+                timeout,
+            )
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"redis not reachable within {timeout}s") from None
+
+    async def close_async(self) -> None:
+        """Finish the in-flight micro-batches, so no caller waits forever on shutdown."""
+        await asyncio.gather(*(batcher.close() for batcher in self.batchers().values()))
+
+    async def warm_up_async(self, texts: list[str], num_neighbors: int) -> int:
+        """Search texts to prime the caches and the model and index connections.
+
+        Failed searches are logged and skipped, warm-up never fails startup.
+
+        Args:
+            texts (list[str]): Search terms.
+            num_neighbors (int): Number of nearest neighbors.
+
+        Returns:
+            int: Number of successful searches.
+        """
+        num_searched = 0
+        for text in texts:
+            try:
+                await self.search_result_async(text, num_neighbors)
+                num_searched += 1
+            except Exception as e:
+                logger.warning(f"warm-up search failed with {str(e)}")
+        logger.info(f"Warmed up with {num_searched} of {len(texts)} searches")
+        return num_searched
+
+    async def precompute_results_async(
+        self, texts: list[str], num_neighbors: int, batch_size: int = 32
+    ) -> int:
+        """Search texts in batches and store their results for the current index version.
+
+        Failed batches are logged and skipped, their texts are searched as usual.
+
+        Args:
+            texts (list[str]): Search terms.
+            num_neighbors (int): Number of nearest neighbors.
+            batch_size (int): Number of texts sharing one embedding call, one vector
+                              search and one Redis fetch.
+
+        Returns:
+            int: Number of results stored.
+        """
+        index_version = self._index_version
+        if index_version is None:
+            # like the result cache, results are only served for a known version
+            logger.warning("index version unknown, skipping precomputed results")
+            return 0
+
+        results = {}
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start : start + batch_size]
+            try:
+                with deadline(self._batch_request_timeout):
+                    match_neighbors, posts, _ = await self._search_batch_posts_async(
+                        batch, [num_neighbors] * len(batch)
+                    )
+            except Exception as e:
+                logger.warning(
+                    f"precomputing {len(batch)} results failed with {str(e)}"
+                )
+                continue
+            for text, matches in zip(batch, match_neighbors):
+                results[text] = serialize_matches(
+                    matches, [posts[match.id] for match in matches]
+                )
+
+        if not results:
+            # keep the previous results, the next run tries again
+            return 0
+        self._precomputed_results.replace(index_version, num_neighbors, results)
+        return len(results)
+
+    async def keep_results_precomputed_async(
+        self,
+        texts: list[str],
+        num_neighbors: int,
+        batch_size: int = 32,
+        interval: float = 60,
+    ) -> None:
+        """Precompute the results of texts, then again whenever the index version
+        changes. Runs until cancelled, next to `keep_index_version_fresh_async`.
+
+        Args:
+            texts (list[str]): Search terms.
+            num_neighbors (int): Number of nearest neighbors.
+            batch_size (int): Number of texts searched together.
+            interval (float): Seconds between index version checks.
+        """
+        while True:
+            if self._index_version != self._precomputed_results.version:
+                await self.precompute_results_async(texts, num_neighbors, batch_size)
+            await asyncio.sleep(interval)
+
+    async def keep_index_version_fresh_async(self) -> None:
+        """Look up the index version once per refresh interval. Runs until cancelled.
+
+        Requests only read the last known version, so the admin API lookup never
+        blocks a search.
+        """
+        while True:
+            await asyncio.sleep(self._index_version_refresh_interval)
+            await asyncio.to_thread(self.refresh_index_version)
+
+    @property
+    def embedding_cache(self) -> EmbeddingCache:
+        """Query embedding cache in front of the model endpoint."""
+        return self._embedding_cache
+
+    @property
+    def result_cache(self) -> ResultCache:
+        """Serialized search result cache in front of the whole search."""
+        return self._result_cache
+
+    @property
+    def precomputed_results(self) -> PrecomputedResults:
+        """Results of the search suggestions computed ahead of time."""
+        return self._precomputed_results
+
+    def batchers(self) -> dict[str, MicroBatcher]:
+        """Micro-batchers of the asyncio search path keyed by stage."""
+        return {"embed": self._embed_batcher, "match": self._match_batcher}
+
+    def hedging_stats(self) -> dict[str, dict[str, Optional[float]]]:
+        """Get counters and latency percentiles of every enabled hedger.
+
+        Returns:
+            dict[str, dict[str, Optional[float]]]: Stats of each hedger keyed by stage.
+        """
+        return {
+            hedger.name: hedger.stats()
+            for hedger in (self._embed_hedger, self._match_hedger)
+            if hedger is not None
+        }
+
+    def refresh_index_version(self) -> Optional[str]:
+        """Look up the version of the searched index.
+
+        The version changes whenever the pipeline updates the index embeddings.
+        When the lookup fails the last known version is kept.
+
+        Returns:
+            Optional[str]: Index version, or None if it was never resolved.
+        """
+        try:
+            index_version = self._index.get_version()
+        except Exception as e:
+            logger.warning(f"failed to get index version with {str(e)}")
+            return self._index_version
+
+        if index_version != self._index_version:
+            logger.info(f"index version changed to {index_version}")
+            self._index_version = index_version
+
+        return self._index_version
+
+    def _embed(self, text: str) -> list[float]:
+        """Get the embedding of a text from the cache or the query encoder.
+
+        Args:
+            text (str): Text to be embedded.
+
+        Returns:
+            list[float]: Embedding of the text.
+        """
+        embedding = self._embedding_cache.get(text)
+        if embedding is not None:
+            logger.info("embedding cache hit")
+            return embedding
+
+        embedding = self._embed_retry.call(self._encoder.encode, [text])[
+            _FIRST_RESULT
+        ]  # extract single embedding from batch result
+
+        if embedding is None or len(embedding) == 0:
+            raise ValueError(f"there is a problem getting embedding for text {text}")
+
+        logger.info(f"resulting embedding dimension: {len(embedding)}")
+
+        self._embedding_cache.set(text, embedding)
+        return embedding
+
+    def _project(self, queries: list[list[float]]) -> list[list[float]]:
+        """Apply the pipeline's projection to query embeddings, if one is configured.
+
+        Embeddings are cached before projection, so the cache stays valid when
+        the projection changes.
+        """
+        if self._projection is None:
+            return queries
+        return project(queries, self._projection)
+
+    @traced("find_match")
     def find_match(self, text: str, num_neighbors: int) -> list[MatchNeighbor]:
         """Convert text to embedding and perform vector search.
 
@@ -96,26 +537,25 @@ class PostVectorSearch:
             raise ValueError("num_neigbhors cannot be less than or equal to 0")
 
         logger.info(f"trying to match {num_neighbors} neighbors to text {text}")
+        current_span().set_attribute("num_neighbors", num_neighbors)
 
-        embedding: list[float] = self._model_endpoint.predict([text]).predictions[
-            _FIRST_RESULT
-        ]  # extract single embedding from batch result
-
-        if embedding is None or len(embedding) == 0:
-            raise ValueError(f"there is a problem getting embedding for text {text}")
-
-        logger.info(f"resulting embedding dimension: {len(embedding)}")
+        with tracer.start_as_current_span("embed") as span, timed("embed"):
+            embedding = self._embed(text)
+            span.set_attribute("embedding.dimension", len(embedding))
 
         logger.info("performing vector search")
-        # perform queries on vertex ai vector search for n nearest neighbors
-        match_neighbors: list[MatchNeighbor] = self._index_endpoint.match(
-            deployed_index_id=self._deployed_index_id,
-            queries=[embedding],
-            num_neighbors=num_neighbors,
-        )[
-            _FIRST_RESULT
-        ]  # extract a list of match neighbors from batch result
+        # perform queries on the vector index for n nearest neighbors
+        with tracer.start_as_current_span("match") as span, timed("match"):
+            match_neighbors: list[MatchNeighbor] = self._match_retry.call(
+                self._index.match,
+                queries=self._project([embedding]),
+                num_neighbors=num_neighbors,
+            )[
+                _FIRST_RESULT
+            ]  # extract a list of match neighbors from batch result
+            span.set_attribute("num_matches", len(match_neighbors))
         logger.info(f"found {len(match_neighbors)} match neighbors")
+        observe_neighbors(len(match_neighbors))
         return match_neighbors
 
     def get_posts_from_matches(
@@ -129,30 +569,82 @@ class PostVectorSearch:
         Returns:
             list[PostMatch]: List of PostMatch objects.
         """
-        logger.info("setting up redis pipeline")
+        posts = self._fetch_posts([match.id for match in match_neighbors])
+        return self._to_post_matches(match_neighbors, posts)
+
+    @traced("get_posts_from_matches")
+    def _fetch_posts(self, ids: list[str]) -> list[dict]:
+        """Fetch posts from Redis, retrying transient failures.
+
+        Args:
+            ids (list[str]): Post ids.
+
+        Returns:
+            list[dict]: Post with "title", "body" and "tags" list of each id.
+        """
+        with timed("fetch"):
+            return self._fetch_retry.call(self._read_posts, ids)
+
+    def _read_posts(self, ids: list[str]) -> list[dict]:
+        """Read posts with one MGET of binary records.
+
+        Posts still stored in the hash layout hold no string value, so MGET returns
+        nil for them and they are fetched with a pipeline of HGETALL instead.
+
+        Args:
+            ids (list[str]): Post ids.
+
+        Returns:
+            list[dict]: Post with "title", "body" and "tags" list of each id.
+        """
+        span = current_span()
+        span.set_attribute("num_posts", len(ids))
+        if not ids:
+            return []
+
+        observe_redis_batch("mget", len(ids))
+        records = mget(self._binary_redis_client, ids)
+        posts = [decode_post(record) if record else None for record in records]
 
-        with self._redis_client.pipeline() as redis_pipeline:
-            for match in match_neighbors:
-                redis_pipeline.hgetall(match.id)
+        missing = [i for i, post in enumerate(posts) if post is None]
+        if missing:
+            logger.info(f"fetching {len(missing)} posts from redis hashes")
+            observe_redis_batch("hgetall", len(missing))
+            with self._redis_client.pipeline() as redis_pipeline:
+                for i in missing:
+                    redis_pipeline.hgetall(ids[i])
+                for i, post_hash in zip(missing, redis_pipeline.execute()):
+                    posts[i] = post_from_hash(post_hash)
+
+        span.set_attribute(
+            "redis.commands",
+            num_mget_commands(self._binary_redis_client, ids) + len(missing),
+        )
+        return posts
 
-            logger.info("execute redis pipeline")
+    @staticmethod
+    def _to_post_matches(
+        match_neighbors: list[MatchNeighbor], posts: list[dict]
+    ) -> list[PostMatch]:
+        """Build PostMatch objects from matched neighbors and their fetched posts.
 
-            posts_dict: list[dict[str:str]] = redis_pipeline.execute()
+        Args:
+            match_neighbors (list[MatchNeighbor]): List of matched neighbors.
+            posts (list[dict]): Post of each matched neighbor.
 
+        Returns:
+            list[PostMatch]: List of PostMatch objects.
+        """
         return [
             PostMatch(
                 id=match.id,
                 distance=round(match.distance, 2),
-                post=Post(
-                    title=post["title"],
-                    body=post["body"],
-                    tags=post["tags"].split("|"),
-                ),
+                post=Post(title=post["title"], body=post["body"], tags=post["tags"]),
             )
-            for match, post in zip(match_neighbors, posts_dict)
+            for match, post in zip(match_neighbors, posts)
         ]
 
-    @retry(max_retries=5, wait_time=0)
+    @with_request_deadline
     def search(self, text: str, num_neighbors: int) -> list[PostMatch]:
         """Convert text to embedding, perform vector search, and convert neighbors to PostMatch.
 
@@ -166,3 +658,529 @@ class PostVectorSearch:
         match_neighbors = self.find_match(text, num_neighbors)
 
         return self.get_posts_from_matches(match_neighbors)
+
+    async def _encode_async(self, texts: list[str]) -> list[list[float]]:
+        """Convert texts to embeddings with the query encoder without blocking the event loop.
+
+        Args:
+            texts (list[str]): Texts to be embedded.
+
+        Returns:
+            list[list[float]]: One embedding per text.
+        """
+        if self._embed_hedger is not None:
+            return await self._embed_hedger.call(self._encoder.encode_async, texts)
+        return await self._encoder.encode_async(texts)
+
+    async def _match_async(
+        self, queries: list[list[float]], num_neighbors: int
+    ) -> list[list[MatchNeighbor]]:
+        """Perform vector search on the vector index without blocking the event loop.
+
+        Args:
+            queries (list[list[float]]): Query embeddings.
+            num_neighbors (int): Number of nearest neighbors to retrieve per query.
+
+        Returns:
+            list[list[MatchNeighbor]]: A list of match neighbors for each query.
+        """
+        queries = self._project(queries)
+        if self._match_hedger is not None:
+            return await self._match_hedger.call(
+                self._index.match_async, queries, num_neighbors
+            )
+        return await self._index.match_async(queries, num_neighbors)
+
+    async def _match_batch_async(
+        self, queries: list[tuple[list[float], int]]
+    ) -> list[list[MatchNeighbor]]:
+        """Perform one vector search for queries asking for different numbers of neighbors.
+
+        Args:
+            queries (list[tuple[list[float], int]]): Query embedding and number of
+                                                    nearest neighbors of each query.
+
+        Returns:
+            list[list[MatchNeighbor]]: A list of match neighbors for each query.
+        """
+        match_neighbors = await self._match_async(
+            queries=[embedding for embedding, _ in queries],
+            num_neighbors=max(num_neighbors for _, num_neighbors in queries),
+        )
+        return [
+            neighbors[:num_neighbors]
+            for neighbors, (_, num_neighbors) in zip(match_neighbors, queries)
+        ]
+
+    async def _embed_async(self, text: str) -> list[float]:
+        """Asyncio variant of `_embed`."""
+        embedding = await self._embedding_cache.get_async(text)
+        if embedding is not None:
+            logger.info("embedding cache hit")
+            return embedding
+
+        embedding = await self._embed_retry.call_async(self._embed_batcher.submit, text)
+
+        if embedding is None or len(embedding) == 0:
+            raise ValueError(f"there is a problem getting embedding for text {text}")
+
+        logger.info(f"resulting embedding dimension: {len(embedding)}")
+
+        await self._embedding_cache.set_async(text, embedding)
+        return embedding
+
+    @traced("find_match")
+    async def find_match_async(
+        self, text: str, num_neighbors: int, batched: bool = True
+    ) -> list[MatchNeighbor]:
+        """Asyncio variant of `find_match`.
+
+        Args:
+            text (str): Text to be matched.
+            num_neighbors (int): Number of nearest neighbors to retrieve.
+            batched (bool): Share the vector search with concurrent queries. A batch
+                            retrieves as many neighbors as its largest query, so
+                            queries asking for many neighbors search on their own.
+
+        Returns:
+            list[MatchNeighbor]: List of matched neighbors.
+        """
+        if not text:
+            raise ValueError("Cannot match empty text!")
+        if num_neighbors <= 0:
+            raise ValueError("num_neigbhors cannot be less than or equal to 0")
+
+        logger.info(f"trying to match {num_neighbors} neighbors to text {text}")
+        current_span().set_attribute("num_neighbors", num_neighbors)
+
+        with tracer.start_as_current_span("embed") as span, timed("embed"):
+            embedding = await self._embed_async(text)
+            span.set_attribute("embedding.dimension", len(embedding))
+
+        logger.info("performing vector search")
+        with tracer.start_as_current_span("match") as span, timed("match"):
+            if batched:
+                match_neighbors: list[MatchNeighbor] = (
+                    await self._match_retry.call_async(
+                        self._match_batcher.submit, (embedding, num_neighbors)
+                    )
+                )
+            else:
+                [match_neighbors] = await self._match_retry.call_async(
+                    self._match_async, [embedding], num_neighbors
+                )
+            span.set_attribute("num_matches", len(match_neighbors))
+        logger.info(f"found {len(match_neighbors)} match neighbors")
+        observe_neighbors(len(match_neighbors))
+        return match_neighbors
+
+    @with_request_deadline
+    async def find_match_timed_async(
+        self, text: str, num_neighbors: int
+    ) -> tuple[list[MatchNeighbor], dict[str, float]]:
+        """Variant of `find_match_async` also timing the embed and match stages.
+
+        Args:
+            text (str): Text to be matched.
+            num_neighbors (int): Number of nearest neighbors to retrieve.
+
+        Returns:
+            tuple[list[MatchNeighbor], dict[str, float]]: Matched neighbors, and the
+                latency in milliseconds of the embed and match stages.
+        """
+        with stage_timings() as timings:
+            match_neighbors = await self.find_match_async(text, num_neighbors)
+
+        return match_neighbors, rounded(
+            {stage: timings[stage] for stage in ("embed", "match")}
+        )
+
+    async def stream_posts_async(
+        self, match_neighbors: list[MatchNeighbor], chunk_size: int
+    ) -> AsyncIterator[list[dict]]:
+        """Fetch posts of matches chunk by chunk, yielding each chunk once fetched.
+
+        Only one chunk of posts is held at a time, so memory per request does not
+        grow with the number of neighbors.
+
+        Args:
+            match_neighbors (list[MatchNeighbor]): List of matched neighbors.
+            chunk_size (int): Number of posts fetched per Redis round trip.
+
+        Yields:
+            list[dict]: `PostMatch` shaped dicts of the next chunk of matches.
+        """
+        for start in range(0, len(match_neighbors), chunk_size):
+            chunk = match_neighbors[start : start + chunk_size]
+            posts = await self._fetch_posts_async([match.id for match in chunk])
+            yield match_dicts(chunk, posts)
+
+    async def get_posts_from_matches_async(
+        self, match_neighbors: list[MatchNeighbor]
+    ) -> list[PostMatch]:
+        """Asyncio variant of `get_posts_from_matches` using `redis.asyncio`.
+
+        Args:
+            match_neighbors (list[MatchNeighbor]): List of matched neighbors.
+
+        Returns:
+            list[PostMatch]: List of PostMatch objects.
+        """
+        posts = await self._fetch_posts_async([match.id for match in match_neighbors])
+        return self._to_post_matches(match_neighbors, posts)
+
+    @traced("get_posts_from_matches")
+    async def _fetch_posts_async(self, ids: list[str]) -> list[dict]:
+        """Asyncio variant of `_fetch_posts`."""
+        with timed("fetch"):
+            return await self._fetch_retry.call_async(self._read_posts_async, ids)
+
+    async def _read_posts_async(self, ids: list[str]) -> list[dict]:
+        """Asyncio variant of `_read_posts`."""
+        span = current_span()
+        span.set_attribute("num_posts", len(ids))
+        if not ids:
+            return []
+
+        observe_redis_batch("mget", len(ids))
+        records = await mget_async(self._async_binary_redis_client, ids)
+        posts = [decode_post(record) if record else None for record in records]
+
+        missing = [i for i, post in enumerate(posts) if post is None]
+        if missing:
+            logger.info(f"fetching {len(missing)} posts from redis hashes")
+            observe_redis_batch("hgetall", len(missing))
+            async with self._async_redis_client.pipeline() as redis_pipeline:
+                for i in missing:
+                    redis_pipeline.hgetall(ids[i])
+                for i, post_hash in zip(missing, await redis_pipeline.execute()):
+                    posts[i] = post_from_hash(post_hash)
+
+        span.set_attribute(
+            "redis.commands",
+            num_mget_commands(self._async_binary_redis_client, ids) + len(missing),
+        )
+        return posts
+
+    @with_request_deadline
+    async def search_async(self, text: str, num_neighbors: int) -> list[PostMatch]:
+        """Asyncio variant of `search`, awaited by the /search route.
+
+        Args:
+            text (str): Search term.
+            num_neighbors (int): Number of nearest neighbors.
+
+        Returns:
+            list[PostMatch]: List of PostMatch sorted with closest distance first.
+        """
+        match_neighbors = await self.find_match_async(text, num_neighbors)
+
+        return await self.get_posts_from_matches_async(match_neighbors)
+
+    @with_request_deadline
+    async def search_json_async(self, text: str, num_neighbors: int) -> bytes:
+        """Search and serialize the matches straight from the fetched posts.
+
+        Skips building and validating PostMatch models, the JSON has the same
+        fields as `search_async` results.
+
+        Args:
+            text (str): Search term.
+            num_neighbors (int): Number of nearest neighbors.
+
+        Returns:
+            bytes: JSON object with `num_matches` and `matches` of a `Result`.
+        """
+        match_neighbors = await self.find_match_async(text, num_neighbors)
+        posts = await self._fetch_posts_async([match.id for match in match_neighbors])
+        with timed("serialize"):
+            return serialize_matches(match_neighbors, posts)
+
+    @with_request_deadline
+    async def search_result_async(self, text: str, num_neighbors: int) -> bytes:
+        """Search and get the serialized result, answered from the precomputed results
+        or the result cache when possible.
+
+        A hit skips the embedding, the vector search, the Redis lookups and
+        the construction of PostMatch objects.
+
+        Args:
+            text (str): Search term.
+            num_neighbors (int): Number of nearest neighbors.
+
+        Returns:
+            bytes: JSON object with `num_matches` and `matches` of a `Result`.
+        """
+        index_version = self._index_version
+        if index_version is None:
+            # without a version a cached result could outlive an index update
+            return await self.search_json_async(text, num_neighbors)
+
+        with timed("cache"):
+            result = self._precomputed_results.get(text, num_neighbors, index_version)
+        if result is not None:
+            logger.info("precomputed result hit")
+            return result
+
+        key = ResultCache.result_key(
+            text, num_neighbors, self._index.index_id, index_version
+        )
+        with timed("cache"):
+            result = await self._result_cache.get_async(key)
+        if result is not None:
+            logger.info("result cache hit")
+            return result
+
+        result = await self.search_json_async(text, num_neighbors)
+        with timed("cache"):
+            await self._result_cache.set_async(key, result)
+        return result
+
+    @staticmethod
+    def _serialize_page(
+        match_neighbors: list[MatchNeighbor],
+        posts: list[dict],
+        next_cursor: Optional[str],
+    ) -> bytes:
+        """Serialize a page as the `num_matches`, `matches` and `next_cursor` of a `PageResult`."""
+        with timed("serialize"):
+            return dumps(
+                {
+                    "num_matches": len(match_neighbors),
+                    "matches": match_dicts(match_neighbors, posts),
+                    "next_cursor": next_cursor,
+                }
+            )
+
+    @with_request_deadline
+    async def search_page_async(self, text: str, page_size: int) -> bytes:
+        """Search the first page of a paginated search.
+
+        Retrieves `page_num_neighbors` neighbors and stores them in Redis under a new
+        cursor while the posts of the first page are fetched.
+
+        Args:
+            text (str): Search term.
+            page_size (int): Number of matches per page.
+
+        Returns:
+            bytes: JSON object with `num_matches`, `matches` and `next_cursor`.
+        """
+        # the long neighbor list is not batched with the searches of a few neighbors
+        match_neighbors = await self.find_match_async(
+            text, max(self._page_num_neighbors, page_size), batched=False
+        )
+        page = match_neighbors[:page_size]
+
+        token = new_token()
+        _, posts = await asyncio.gather(
+            self._fetch_retry.call_async(
+                self._async_binary_redis_client.set,
+                CURSOR_PREFIX + token,
+                pack_neighbors(match_neighbors),
+                ex=self._page_cursor_ttl,
+            ),
+            self._fetch_posts_async([match.id for match in page]),
+        )
+
+        next_cursor = (
+            encode_cursor(token, len(page))
+            if len(match_neighbors) > len(page)
+            else None
+        )
+        return self._serialize_page(page, posts, next_cursor)
+
+    @with_request_deadline
+    async def next_page_async(self, cursor: str, page_size: int) -> Optional[bytes]:
+        """Get a later page of a paginated search from its stored neighbor list.
+
+        Costs one Redis round trip reading only the neighbors of the page, and one
+        fetching their posts.
+
+        Args:
+            cursor (str): `next_cursor` of the previous page.
+            page_size (int): Number of matches per page.
+
+        Returns:
+            Optional[bytes]: JSON object with `num_matches`, `matches` and
+                            `next_cursor`, or None when the cursor expired.
+        """
+        token, offset = decode_cursor(cursor)
+        key = CURSOR_PREFIX + token
+
+        with timed("fetch"):
+            packed, length = await self._fetch_retry.call_async(
+                self._read_neighbors_async, key, *neighbor_range(offset, page_size)
+            )
+
+        if not length:
+            return None
+
+        page = unpack_neighbors(packed)
+        posts = await self._fetch_posts_async([match.id for match in page])
+
+        next_offset = offset + len(page)
+        next_cursor = (
+            encode_cursor(token, next_offset)
+            if next_offset < num_packed_neighbors(length)
+            else None
+        )
+        return self._serialize_page(page, posts, next_cursor)
+
+    async def _read_neighbors_async(
+        self, key: str, start: int, end: int
+    ) -> tuple[bytes, int]:
+        """Read a byte range of a stored neighbor list and its total length."""
+        async with self._async_binary_redis_client.pipeline(
+            transaction=False
+        ) as redis_pipeline:
+            redis_pipeline.getrange(key, start, end)
+            redis_pipeline.strlen(key)
+            packed, length = await redis_pipeline.execute()
+        return packed, length
+
+    async def _get_batch_embeddings_async(self, texts: list[str]) -> list[list[float]]:
+        """Get embeddings of texts from the cache, encoding the misses concurrently in
+        calls of at most `batch_max_size` texts.
+
+        Args:
+            texts (list[str]): Texts to be embedded.
+
+        Returns:
+            list[list[float]]: Embedding of each text.
+        """
+        embeddings = await self._embedding_cache.get_many_async(texts)
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if not missing:
+            return embeddings
+
+        chunks = [
+            missing[start : start + self._batch_max_size]
+            for start in range(0, len(missing), self._batch_max_size)
+        ]
+        predictions = await asyncio.gather(
+            *(
+                self._embed_retry.call_async(
+                    self._encode_async, [texts[i] for i in chunk]
+                )
+                for chunk in chunks
+            )
+        )
+        for chunk, chunk_predictions in zip(chunks, predictions):
+            for i, embedding in zip(chunk, chunk_predictions):
+                if embedding is None or len(embedding) == 0:
+                    raise ValueError(
+                        f"there is a problem getting embedding for text {texts[i]}"
+                    )
+                embeddings[i] = embedding
+
+        await self._embedding_cache.set_many_async(
+            {texts[i]: embeddings[i] for i in missing}
+        )
+        return embeddings
+
+    async def _search_batch_posts_async(
+        self, texts: list[str], num_neighbors: list[int]
+    ) -> tuple[list[list[MatchNeighbor]], dict[str, dict], dict[str, float]]:
+        """Search many queries with one embedding call, one vector search and one Redis fetch.
+
+        Args:
+            texts (list[str]): Search terms.
+            num_neighbors (list[int]): Number of nearest neighbors of each search term.
+
+        Returns:
+            tuple[list[list[MatchNeighbor]], dict[str, dict], dict[str, float]]: Matches
+                of each search term, fetched posts keyed by id, and the latency in
+                milliseconds of the embed, match and fetch stages.
+        """
+        if not texts or any(not text for text in texts):
+            raise ValueError("Cannot match empty text!")
+        if len(texts) != len(num_neighbors):
+            raise ValueError("every text needs its own num_neighbors")
+        if any(k <= 0 for k in num_neighbors):
+            raise ValueError("num_neigbhors cannot be less than or equal to 0")
+
+        logger.info(f"trying to match a batch of {len(texts)} texts")
+
+        with stage_timings() as timings:
+            with tracer.start_as_current_span("embed") as span, timed("embed"):
+                embeddings = await self._get_batch_embeddings_async(texts)
+                span.set_attribute("num_queries", len(texts))
+
+            with tracer.start_as_current_span("match") as span, timed("match"):
+                match_neighbors = await self._match_retry.call_async(
+                    self._match_batch_async, list(zip(embeddings, num_neighbors))
+                )
+                span.set_attribute("num_queries", len(texts))
+
+            # fetch every distinct post once, queries of a batch often share neighbors
+            ids = list(
+                dict.fromkeys(
+                    match.id for matches in match_neighbors for match in matches
+                )
+            )
+            logger.info(f"fetching {len(ids)} distinct posts from redis")
+            posts = dict(zip(ids, await self._fetch_posts_async(ids)))
+
+        for matches in match_neighbors:
+            observe_neighbors(len(matches))
+
+        stage_latency = rounded(
+            {stage: timings[stage] for stage in ("embed", "match", "fetch")}
+        )
+        return match_neighbors, posts, stage_latency
+
+    @with_batch_deadline
+    async def search_batch_async(
+        self, texts: list[str], num_neighbors: list[int]
+    ) -> tuple[list[list[PostMatch]], dict[str, float]]:
+        """Search many queries with one embedding call, one vector search and one Redis fetch.
+
+        Args:
+            texts (list[str]): Search terms.
+            num_neighbors (list[int]): Number of nearest neighbors of each search term.
+
+        Returns:
+            tuple[list[list[PostMatch]], dict[str, float]]: PostMatch list of each search
+                term, and the latency in milliseconds of the embed, match and fetch stages.
+        """
+        match_neighbors, posts, stage_latency = await self._search_batch_posts_async(
+            texts, num_neighbors
+        )
+        results = [
+            self._to_post_matches(matches, [posts[match.id] for match in matches])
+            for matches in match_neighbors
+        ]
+        return results, stage_latency
+
+    @with_batch_deadline
+    async def search_batch_json_async(
+        self, texts: list[str], num_neighbors: list[int]
+    ) -> bytes:
+        """Variant of `search_batch_async` serializing straight from the fetched posts.
+
+        Args:
+            texts (list[str]): Search terms.
+            num_neighbors (list[int]): Number of nearest neighbors of each search term.
+
+        Returns:
+            bytes: JSON object with `stage_latency` and `results` of a `BatchResult`.
+        """
+        match_neighbors, posts, stage_latency = await self._search_batch_posts_async(
+            texts, num_neighbors
+        )
+        with timed("serialize"):
+            return dumps(
+                {
+                    "stage_latency": stage_latency,
+                    "results": [
+                        {
+                            "num_matches": len(matches),
+                            "matches": match_dicts(
+                                matches, [posts[match.id] for match in matches]
+                            ),
+                        }
+                        for matches in match_neighbors
+                    ],
+                }
+            )
@@ -0,0 +1,263 @@
+import asyncio
+import logging
+import mmap
+import os
+import struct
+from typing import Optional
+
+import numpy as np
+from google.cloud.aiplatform.matching_engine.matching_engine_index_endpoint import (
+    MatchNeighbor,
+)
+
+from .index import VectorIndex, top_k
+
+
+logger = logging.getLogger(__name__)
+
+# Binary embedding store layout, every section starts on a 64 byte boundary:
+#   header: magic, format version, dtype code, row count, dimensions
+#   ids:    uint64[count] post ids
+#   scales: float32[count] per-vector scales, int8 stores only
+#   matrix: dtype[count, dimensions] row-major embeddings
+# The pipeline's MatchingEngineIndexer writes the same layout.
+STORE_MAGIC = b"SEMB"
+STORE_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<4sHHQI")
+_ALIGNMENT = 64
+_DTYPES = {1: np.float16, 2: np.int8, 3: np.float32}
+_DTYPE_CODES = {np.dtype(dtype): code for code, dtype in _DTYPES.items()}
+_INT8_MAX = 127
+_SCORE_CHUNK_SIZE = 65536
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _section_offsets(
+    count: int, dimensions: int, dtype: np.dtype
+) -> tuple[int, int, int]:
+    """Get the byte offsets of the ids, scales and matrix sections."""
+    ids_offset = _align(_HEADER.size)
+    scales_offset = _align(ids_offset + count * 8)
+    matrix_offset = (
+        _align(scales_offset + count * 4) if dtype == np.int8 else scales_offset
+    )
+    return ids_offset, scales_offset, matrix_offset
+
+
+def quantize(
+    embeddings: np.ndarray, dtype: str
+) -> tuple[np.ndarray, Optional[np.ndarray]]:
+    """Convert float embeddings to the compact store dtype.
+
+    Args:
+        embeddings (np.ndarray): Embedding matrix with one embedding per row.
+        dtype (str): "float16", "int8" or "float32".
+
+    Returns:
+        tuple[np.ndarray, Optional[np.ndarray]]: Converted matrix, and the per-vector
+                                    scales of int8 stores, `embedding ~= row * scale`.
+    """
+    if dtype != "int8":
+        return embeddings.astype(dtype), None
+
+    scales = np.abs(embeddings).max(axis=1) / _INT8_MAX
+    scales[scales == 0] = 1
+    matrix = np.rint(embeddings / scales[:, None]).astype(np.int8)
+    return matrix, scales.astype(np.float32)
+
+
+def write_embedding_store(
+    path: str, ids: list[str], embeddings: np.ndarray, dtype: str = "float16"
+) -> None:
+    """Write embeddings to a binary store file.
+
+    Args:
+        path (str): Path of the store file.
+        ids (list[str]): Integer post id of each embedding row.
+        embeddings (np.ndarray): Embedding matrix with one embedding per row.
+        dtype (str): Stored dtype, "float16", "int8" or "float32".
+    """
+    matrix, scales = quantize(np.asarray(embeddings, dtype=np.float32), dtype)
+    count, dimensions = matrix.shape
+    ids_offset, scales_offset, matrix_offset = _section_offsets(
+        count, dimensions, matrix.dtype
+    )
+
+    with open(path, "wb") as f:
+        f.write(
+            _HEADER.pack(
+                STORE_MAGIC,
+                STORE_FORMAT_VERSION,
+                _DTYPE_CODES[matrix.dtype],
+                count,
+                dimensions,
+            )
+        )
+        f.seek(ids_offset)
+        f.write(np.array([int(id) for id in ids], dtype="<u8").tobytes())
+        if scales is not None:
+            f.seek(scales_offset)
+            f.write(scales.astype("<f4").tobytes())
+        f.seek(matrix_offset)
+        f.write(np.ascontiguousarray(matrix).tobytes())
+
+
+class EmbeddingStore:
+    """Read-only memory-mapped binary embedding store.
+
+    Every array is a view of the mapped file, so worker processes opening the same
+    store share one page cache copy and opening it reads nothing up front.
+
+    Attributes:
+        ids (np.ndarray): uint64 post id of each row.
+        matrix (np.ndarray): Stored embedding matrix, float16, int8 or float32.
+        scales (Optional[np.ndarray]): float32 per-vector scales of int8 stores.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Map a store file written by `write_embedding_store`.
+
+        Args:
+            path (str): Path of the store file.
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, dtype_code, count, dimensions = _HEADER.unpack_from(
+            self._mmap, 0
+        )
+        if magic != STORE_MAGIC or version != STORE_FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {STORE_FORMAT_VERSION} store")
+
+        dtype = np.dtype(_DTYPES[dtype_code])
+        ids_offset, scales_offset, matrix_offset = _section_offsets(
+            count, dimensions, dtype
+        )
+
+        self.ids = np.frombuffer(
+            self._mmap, dtype="<u8", count=count, offset=ids_offset
+        )
+        self.scales = (
+            np.frombuffer(self._mmap, dtype="<f4", count=count, offset=scales_offset)
+            if dtype == np.int8
+            else None
+        )
+        self.matrix = np.frombuffer(
+            self._mmap, dtype=dtype, count=count * dimensions, offset=matrix_offset
+        ).reshape(count, dimensions)
+
+        logger.info(f"mapped {count} {dtype} embeddings from {path}")
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    @property
+    def dimensions(self) -> int:
+        return self.matrix.shape[1]
+
+    def get(self, rows: np.ndarray) -> np.ndarray:
+        """Get embeddings of rows as float32.
+
+        Args:
+            rows (np.ndarray): Row positions.
+
+        Returns:
+            np.ndarray: float32 embeddings, one per row position.
+        """
+        embeddings = self.matrix[rows].astype(np.float32)
+        if self.scales is not None:
+            embeddings *= self.scales[rows, None]
+        return embeddings
+
+    def dot(
+        self, queries: np.ndarray, start: int = 0, stop: Optional[int] = None
+    ) -> np.ndarray:
+        """Score a contiguous block of rows against queries by dot product.
+
+        Args:
+            queries (np.ndarray): float32 query embeddings, one per row.
+            start (int): First scored row.
+            stop (Optional[int]): Row after the last scored row, defaults to the end.
+
+        Returns:
+            np.ndarray: Scores of shape (num_queries, stop - start).
+        """
+        block = self.matrix[start:stop].astype(np.float32)
+        scores = queries @ block.T
+        if self.scales is not None:
+            scores *= self.scales[start:stop]
+        return scores
+
+
+class StoreIndex(VectorIndex):
+    """Brute force index scanning a memory-mapped embedding store in chunks.
+
+    Only one float32 chunk per query batch is materialized at a time, so resident
+    memory stays small while the store itself is shared through the page cache.
+    """
+
+    def __init__(self, store: EmbeddingStore, version: Optional[str] = None) -> None:
+        """Initialize index over a store.
+
+        Args:
+            store (EmbeddingStore): Mapped embedding store.
+            version (Optional[str]): Version of the stored embeddings.
+        """
+        self._store = store
+        self._version = version
+
+    @classmethod
+    def open(cls, path: str) -> "StoreIndex":
+        """Map a store file and index it.
+
+        Args:
+            path (str): Path of the store file.
+
+        Returns:
+            StoreIndex: Index over the store.
+        """
+        return cls(EmbeddingStore(path), version=str(os.path.getmtime(path)))
+
+    @property
+    def index_id(self) -> str:
+        return "store"
+
+    def get_version(self) -> Optional[str]:
+        return self._version
+
+    def match(
+        self, queries: list[list[float]], num_neighbors: int
+    ) -> list[list[MatchNeighbor]]:
+        queries = np.asarray(queries, dtype=np.float32)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+
+        for start in range(0, len(self._store), _SCORE_CHUNK_SIZE):
+            scores = self._store.dot(queries, start, start + _SCORE_CHUNK_SIZE)
+            positions, scores = top_k(scores, num_neighbors)
+
+            # merge the chunk winners with the best rows so far
+            best_rows, best_scores = (
+                np.concatenate((best_rows, positions + start), axis=1),
+                np.concatenate((best_scores, scores), axis=1),
+            )
+            positions, best_scores = top_k(best_scores, num_neighbors)
+            best_rows = np.take_along_axis(best_rows, positions, axis=1)
+
+        return [
+            [
+                MatchNeighbor(id=str(self._store.ids[row]), distance=float(score))
+                for row, score in zip(rows, scores)
+            ]
+            for rows, scores in zip(best_rows, best_scores)
+        ]
+
+    async def match_async(
+        self, queries: list[list[float]], num_neighbors: int
+    ) -> list[list[MatchNeighbor]]:
+        """Search in a worker thread, NumPy releases the GIL in matrix products."""
+        return await asyncio.to_thread(self.match, queries, num_neighbors)
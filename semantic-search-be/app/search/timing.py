@@ -0,0 +1,77 @@
+import contextlib
+import contextvars
+import time
+from typing import Iterator, Optional
+
+from .metrics import observe_stage
+
+
+# milliseconds spent in each stage of the current request, None when not recorded
+_stage_latency: contextvars.ContextVar[Optional[dict[str, float]]] = (
+    contextvars.ContextVar("stage_latency", default=None)
+)
+
+
+@contextlib.contextmanager
+def stage_timings() -> Iterator[dict[str, float]]:
+    """Record the latency of the stages timed by `timed` in the current request.
+
+    A nested call shares the timings of the outer one.
+
+    Yields:
+        dict[str, float]: Milliseconds spent in each stage, filled as stages finish.
+    """
+    timings = _stage_latency.get()
+    if timings is not None:
+        yield timings
+        return
+
+    token = _stage_latency.set({})
+    try:
+        yield _stage_latency.get()
+    finally:
+        _stage_latency.reset(token)
+
+
+@contextlib.contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time a block as a stage, in the stage latency metric and the current
+    request's timings.
+
+    Repeated stages, such as the chunked post fetches of a streaming search,
+    accumulate.
+
+    Args:
+        stage (str): Stage name.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe_stage(stage, elapsed)
+
+        timings = _stage_latency.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed * 1000
+
+
+def rounded(timings: dict[str, float]) -> dict[str, float]:
+    """Round stage timings to hundredths of a millisecond, like every latency field."""
+    return {stage: round(latency, 2) for stage, latency in timings.items()}
+
+
+def server_timing(timings: dict[str, float], total: Optional[float] = None) -> str:
+    """Format stage timings as a Server-Timing header value.
+
+    Args:
+        timings (dict[str, float]): Milliseconds spent in each stage.
+        total (Optional[float]): Milliseconds of the whole request.
+
+    Returns:
+        str: Header value such as "embed;dur=1.2, match;dur=3.4".
+    """
+    metrics = [f"{stage};dur={latency:.2f}" for stage, latency in timings.items()]
+    if total is not None:
+        metrics.append(f"total;dur={total:.2f}")
+    return ", ".join(metrics)
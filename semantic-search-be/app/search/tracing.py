@@ -0,0 +1,71 @@
+import asyncio
+import functools
+import logging
+
+from opentelemetry import trace
+from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+from opentelemetry.sdk.resources import SERVICE_NAME, Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+
+logger = logging.getLogger(__name__)
+
+# spans are no-ops until `configure_tracing` installs a tracer provider
+tracer = trace.get_tracer("semantic-search")
+
+
+def current_span() -> trace.Span:
+    """Get the span of the current context to add attributes or events to."""
+    return trace.get_current_span()
+
+
+def traced(name: str):
+    """Decorator running a function in a span.
+
+    Args:
+        name (str): Span name.
+
+    Returns:
+        function: Decorator.
+    """
+
+    def decorator(func):
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.start_as_current_span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with tracer.start_as_current_span(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def configure_tracing(service_name: str, endpoint: str, sample_rate: float) -> None:
+    """Export spans of sampled requests to an OTLP collector.
+
+    Requests are sampled by trace id, unless the caller already decided, so a
+    request traced upstream stays traced.
+
+    Args:
+        service_name (str): Service name attached to every span.
+        endpoint (str): OTLP gRPC endpoint, such as "http://localhost:4317".
+        sample_rate (float): Fraction of requests traced.
+    """
+    provider = TracerProvider(
+        resource=Resource.create({SERVICE_NAME: service_name}),
+        sampler=ParentBased(TraceIdRatioBased(sample_rate)),
+    )
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint)))
+    trace.set_tracer_provider(provider)
+    logger.info(f"Exporting {sample_rate:.0%} of traces to {endpoint}")
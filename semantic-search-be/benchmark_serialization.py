@@ -0,0 +1,61 @@
+import json
+import timeit
+
+from google.cloud.aiplatform.matching_engine.matching_engine_index_endpoint import (
+    MatchNeighbor,
+)
+
+from app.search.schema import Result
+from app.search.serialization import serialize_matches
+from app.search.service import PostVectorSearch
+
+
+NUM_NEIGHBORS = 40
+NUM_RUNS = 2000
+
+
+def model_response(match_neighbors: list[MatchNeighbor], posts: list[dict]) -> bytes:
+    """Previous path, PostMatch models validated again as a Result by FastAPI."""
+    post_matches = PostVectorSearch._to_post_matches(match_neighbors, posts)
+    result = Result(latency=1.0, num_matches=len(post_matches), matches=post_matches)
+    # the raw path omits stage_latency unless it was measured
+    return json.dumps(
+        Result.model_validate(result).model_dump(exclude_none=True)
+    ).encode("utf-8")
+
+
+def raw_response(match_neighbors: list[MatchNeighbor], posts: list[dict]) -> bytes:
+    """Serialize straight from the fetched posts and prepend latency."""
+    return b'{"latency":1.0,' + serialize_matches(match_neighbors, posts)[1:]
+
+
+def run():
+    """Compare CPU time per search response of the model and raw serialization paths."""
+    match_neighbors = [
+        MatchNeighbor(id=str(75000000 + i), distance=0.9 - i / 100)
+        for i in range(NUM_NEIGHBORS)
+    ]
+    posts = [
+        {
+            "title": f"How do I merge two dictionaries in a single expression {i}?",
+            "body": "<p>I want to merge two dictionaries into a new dictionary.</p>"
+            " Like this: x = {'a': 1, 'b': 2}",
+            "tags": ["python", "dictionary", "merge"],
+        }
+        for i in range(NUM_NEIGHBORS)
+    ]
+    assert json.loads(model_response(match_neighbors, posts)) == json.loads(
+        raw_response(match_neighbors, posts)
+    )
+
+    report = {}
+    for name, response in [("model", model_response), ("raw", raw_response)]:
+        seconds = timeit.timeit(
+            lambda: response(match_neighbors, posts), number=NUM_RUNS
+        )
+        report[f"{name}_us_per_request"] = round(seconds / NUM_RUNS * 1e6, 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    run()
@@ -1,15 +1,22 @@
+import argparse
 import sys
 import math
 from typing import Generator, Any
 import pandas as pd
+import redis
 from google.cloud import bigquery
 from tqdm.auto import tqdm
 
+from app.search.cluster import create_redis_client
+from app.search.records import encode_post
+
 
 PROJECT_ID = "stackoverflow-semantic-search"
 QUERY_TEMPLATE = "SELECT id, title, LEFT(body, 100) as body, tags FROM bigquery-public-data.stackoverflow.posts_questions WHERE creation_date BETWEEN '2018-01-01' AND '2022-06-01' AND score > 0 ORDER BY creation_date LIMIT {limit} OFFSET {offset}"
 BQ_CHUNK_SIZE = 220167
 BQ_TOTAL_ROWS = 3082338
+# commands queued before a cluster pipeline is sent to the nodes
+CLUSTER_PIPELINE_SIZE = 10000
 
 
 def query_bigquery_chunks(
@@ -63,8 +70,105 @@ def gen_redis_proto(*cmd):
     return proto
 
 
+def gen_redis_proto_bytes(*cmd: bytes) -> bytes:
+    """Generate a Redis protocol message of binary safe arguments."""
+    proto = [b"*" + str(len(cmd)).encode() + b"\r\n"]
+    for arg in cmd:
+        proto.append(b"$" + str(len(arg)).encode() + b"\r\n" + arg + b"\r\n")
+    return b"".join(proto)
+
+
+def post_record(id, title, body, tags, compress: bool = False) -> bytes:
+    """Encode a post as one binary record.
+
+    Text is escaped like the hash layout so both layouts serve identical posts.
+    """
+    try:
+        return encode_post(
+            string_escape(title),
+            string_escape(body),
+            string_escape(tags).split("|"),
+            compress=compress,
+        )
+    except ValueError as e:
+        raise ValueError(f"post {id} does not fit a binary record: {e}") from e
+
+
+def gen_post_record_proto(id, title, body, tags, compress: bool = False) -> bytes:
+    """Generate a Redis SET of a post as one binary record."""
+    return gen_redis_proto_bytes(
+        b"SET", str(id).encode(), post_record(id, title, body, tags, compress)
+    )
+
+
+def load_cluster_chunk(
+    client: redis.RedisCluster,
+    df: pd.DataFrame,
+    layout: str,
+    compress: bool = False,
+    pipeline_size: int = CLUSTER_PIPELINE_SIZE,
+) -> None:
+    """Write a chunk of posts to a Redis Cluster.
+
+    `redis-cli --pipe` writes to a single node, a cluster pipeline instead routes
+    each post to the node serving its hash slot and sends every node its commands
+    at once.
+
+    Args:
+        client (redis.RedisCluster): Cluster client.
+        df (pd.DataFrame): Posts with id, title, body and tags columns.
+        layout (str): "record" or "hash".
+        compress (bool): zlib compress binary records.
+        pipeline_size (int): Number of commands sent per pipeline.
+    """
+    with client.pipeline() as redis_pipeline:
+        for i, (id, title, body, tags) in enumerate(
+            tqdm(zip(df.id, df.title, df.body, df.tags), total=len(df), position=0),
+            start=1,
+        ):
+            if layout == "record":
+                redis_pipeline.set(
+                    str(id), post_record(id, title, body, tags, compress)
+                )
+            else:
+                redis_pipeline.hset(
+                    str(id),
+                    mapping={
+                        "title": string_escape(title),
+                        "body": string_escape(body),
+                        "tags": string_escape(tags),
+                    },
+                )
+            if i % pipeline_size == 0:
+                redis_pipeline.execute()
+        redis_pipeline.execute()
+
+
 def run():
     """Main function to fetch data from BigQuery and store in Redis."""
+    parser = argparse.ArgumentParser(description=run.__doc__)
+    parser.add_argument(
+        "--layout",
+        choices=["record", "hash"],
+        default="record",
+        help="store each post as one binary record string or as a hash of fields",
+    )
+    parser.add_argument(
+        "--compress", action="store_true", help="zlib compress binary records"
+    )
+    parser.add_argument(
+        "--cluster",
+        metavar="HOST:PORT",
+        help="write to the Redis Cluster of this node instead of printing the "
+        "protocol for redis-cli --pipe",
+    )
+    args = parser.parse_args()
+
+    cluster_client = None
+    if args.cluster:
+        host, port = args.cluster.rsplit(":", 1)
+        cluster_client = create_redis_client(host, port, cluster=True)
+
     client = bigquery.Client(project=PROJECT_ID)
     for df in tqdm(
         query_bigquery_chunks(
@@ -77,6 +181,10 @@ def run():
         position=0,
         desc="Chunk of rows from BigQuery",
     ):
+        if cluster_client is not None:
+            load_cluster_chunk(cluster_client, df, args.layout, args.compress)
+            continue
+
         ids = df.id.tolist()
         titles = df.title.tolist()
         bodies = df.body.tolist()
@@ -85,6 +193,12 @@ def run():
         for id, title, body, tags in tqdm(
             zip(ids, titles, bodies, tags_list), total=len(ids), position=0
         ):
+            if args.layout == "record":
+                sys.stdout.buffer.write(
+                    gen_post_record_proto(id, title, body, tags, args.compress)
+                )
+                continue
+
             sys.stdout.write(
                 gen_redis_proto(
                     "HSET",
@@ -0,0 +1,47 @@
+import argparse
+import logging
+import math
+from typing import Iterator
+
+from google.cloud import bigquery
+from tqdm.auto import tqdm
+
+from app.search.completion import write_completion_index
+from bq_to_redis import (
+    BQ_CHUNK_SIZE,
+    BQ_TOTAL_ROWS,
+    PROJECT_ID,
+    QUERY_TEMPLATE,
+    query_bigquery_chunks,
+)
+
+
+def query_titles(client: bigquery.Client) -> Iterator[str]:
+    """Yield the title of every post loaded into Redis by bq_to_redis.py."""
+    for df in tqdm(
+        query_bigquery_chunks(
+            client=client,
+            query_template=QUERY_TEMPLATE,
+            max_rows=BQ_TOTAL_ROWS,
+            rows_per_chunk=BQ_CHUNK_SIZE,
+        ),
+        total=math.ceil(BQ_TOTAL_ROWS / BQ_CHUNK_SIZE),
+        desc="Chunk of rows from BigQuery",
+    ):
+        yield from df.title.tolist()
+
+
+def run():
+    """Build the title completion index served by /search/complete from BigQuery."""
+    parser = argparse.ArgumentParser(description=run.__doc__)
+    parser.add_argument("output", help="path of the completion index file")
+    args = parser.parse_args()
+
+    client = bigquery.Client(project=PROJECT_ID)
+    num_titles = write_completion_index(args.output, query_titles(client))
+    print(f"wrote {num_titles} distinct titles to {args.output}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run()
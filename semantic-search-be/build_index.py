@@ -0,0 +1,115 @@
+import argparse
+import json
+import logging
+
+import numpy as np
+
+from app.search.hnsw import HnswIndex
+from app.search.index import NumpyIndex, evaluate_recall, load_embeddings
+from app.search.quantization import BinaryIndex, PqIndex
+from app.search.store import StoreIndex, write_embedding_store
+
+
+NUM_NEIGHBORS = 40
+NUM_EVALUATION_QUERIES = 1000
+
+
+def build_hnsw(
+    ids: list[str], embeddings: np.ndarray, args: argparse.Namespace
+) -> HnswIndex:
+    """Build an HNSW index and save it to the output path."""
+    index = HnswIndex.build(
+        ids,
+        embeddings,
+        m=args.m,
+        ef_construction=args.ef_construction,
+        ef_search=args.ef_search,
+    )
+    index.save(args.output)
+    return index
+
+
+def build_store(
+    ids: list[str], embeddings: np.ndarray, args: argparse.Namespace
+) -> StoreIndex:
+    """Write a binary embedding store to the output path and map it."""
+    write_embedding_store(args.output, ids, embeddings, dtype=args.dtype)
+    return StoreIndex.open(args.output)
+
+
+def build_pq(
+    ids: list[str], embeddings: np.ndarray, args: argparse.Namespace
+) -> PqIndex:
+    """Train a product quantizer, save the codes to the output path and load them."""
+    PqIndex.build(ids, embeddings, num_subspaces=args.num_subspaces).save(args.output)
+    return PqIndex.load(
+        args.output, rescore_path=args.rescore_store, num_rescore=args.num_rescore
+    )
+
+
+def build_binary(
+    ids: list[str], embeddings: np.ndarray, args: argparse.Namespace
+) -> BinaryIndex:
+    """Write an embedding store to the output path and pack its sign bits."""
+    write_embedding_store(args.output, ids, embeddings, dtype=args.dtype)
+    return BinaryIndex.open(args.output, num_rescore=args.num_rescore)
+
+
+def run():
+    """Build a serving index from the pipeline's embedding shards and report its recall."""
+    parser = argparse.ArgumentParser(description=run.__doc__)
+    parser.add_argument(
+        "embeddings_dir", help="feature_vector output of MatchingEngineIndexer"
+    )
+    parser.add_argument("output", help="path of the saved index")
+    parser.add_argument(
+        "--index", choices=["hnsw", "store", "pq", "binary"], default="hnsw"
+    )
+    parser.add_argument("--m", type=int, default=16)
+    parser.add_argument("--ef-construction", type=int, default=200)
+    parser.add_argument("--ef-search", type=int, default=64)
+    parser.add_argument(
+        "--dtype", choices=["float16", "int8", "float32"], default="float16"
+    )
+    parser.add_argument("--num-subspaces", type=int, default=48)
+    parser.add_argument(
+        "--rescore-store", help="embedding store of the same shards rescoring pq"
+    )
+    parser.add_argument("--num-rescore", type=int, default=200)
+    args = parser.parse_args()
+
+    ids, embeddings = load_embeddings(args.embeddings_dir)
+
+    if args.index == "hnsw":
+        index = build_hnsw(ids, embeddings, args)
+    elif args.index == "store":
+        index = build_store(ids, embeddings, args)
+    elif args.index == "pq":
+        index = build_pq(ids, embeddings, args)
+    else:
+        index = build_binary(ids, embeddings, args)
+
+    # queries are perturbed corpus embeddings, so they are not exact index hits
+    rng = np.random.default_rng(0)
+    queries = embeddings[
+        rng.choice(len(embeddings), size=min(NUM_EVALUATION_QUERIES, len(embeddings)))
+    ]
+    queries = queries + rng.normal(scale=0.05, size=queries.shape).astype(np.float32)
+
+    exact_index = NumpyIndex(ids, embeddings)
+    report = evaluate_recall(index, exact_index, queries.tolist(), NUM_NEIGHBORS)
+    if args.index == "binary" or (args.index == "pq" and args.rescore_store):
+        # also report the compact scores alone to show what rescoring buys
+        index.num_rescore = 0
+        report = {
+            "rescored": report,
+            "without_rescore": evaluate_recall(
+                index, exact_index, queries.tolist(), NUM_NEIGHBORS
+            ),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    run()
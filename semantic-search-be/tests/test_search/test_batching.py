@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+from app.search.batching import MicroBatcher
+
+
+def test_micro_batcher_close_drains_in_flight_batches():
+    async def double(items: list[int]) -> list[int]:
+        await asyncio.sleep(0.01)
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = MicroBatcher(double, max_batch_size=2, max_wait=60)
+        submitted = [asyncio.ensure_future(batcher.submit(i)) for i in range(3)]
+        await asyncio.sleep(0)
+
+        # the full batch is in flight, the last item waits for max_wait
+        assert len(batcher._tasks) == 1
+        await batcher.close()
+
+        assert not batcher._tasks
+        return await asyncio.gather(*submitted)
+
+    assert asyncio.run(run()) == [0, 2, 4]
+
+
+def test_micro_batcher_close_cancels_stuck_batches():
+    async def hang(items: list[int]) -> list[int]:
+        await asyncio.sleep(60)
+        return items
+
+    async def run():
+        batcher = MicroBatcher(hang, max_batch_size=1, max_wait=0)
+        submitted = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0)
+        await batcher.close(timeout=0.01)
+
+        with pytest.raises(asyncio.CancelledError):
+            await submitted
+
+    asyncio.run(run())
@@ -0,0 +1,150 @@
+import asyncio
+import pytest
+
+import redis
+from app.search.cache import (
+    EmbeddingCache,
+    LRUCache,
+    ResultCache,
+    normalize_query,
+    pack_embedding,
+    unpack_embedding,
+)
+
+
+def test_normalize_query():
+    assert normalize_query("  How to\tSort a  LIST\n") == "how to sort a list"
+    assert normalize_query("ｐｙｔｈｏｎ ﬁle") == "python file"
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_lru_cache_expires_entries(monkeypatch: pytest.MonkeyPatch):
+    cache = LRUCache(max_size=2, ttl=10)
+    monkeypatch.setattr("app.search.cache.time.monotonic", lambda: 100)
+    cache.set("a", 1)
+    monkeypatch.setattr("app.search.cache.time.monotonic", lambda: 111)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_pack_embedding_roundtrip():
+    embedding = [0.5, -1.25, 3.0]
+    data = pack_embedding(embedding)
+
+    assert len(data) == 12
+    assert unpack_embedding(data) == embedding
+
+
+def test_embedding_cache_redis_tier(monkeypatch: pytest.MonkeyPatch):
+    # Mocking the Redis client with a dict
+    store = {}
+
+    monkeypatch.setattr(
+        redis.Redis, "get", lambda self, name: store.get(name), raising=True
+    )
+    monkeypatch.setattr(
+        redis.Redis,
+        "set",
+        lambda self, name, value, px: store.__setitem__(name, value),
+        raising=True,
+    )
+
+    redis_client = redis.Redis()
+    writer = EmbeddingCache(max_size=8, ttl=60, redis_client=redis_client)
+    reader = EmbeddingCache(max_size=8, ttl=60, redis_client=redis_client)
+
+    assert reader.get("What is Redis") is None
+    writer.set("What is Redis", [1.0, 2.0])
+
+    assert reader.get("what is  redis") == [1.0, 2.0]
+    assert reader.get("what is redis") == [1.0, 2.0]
+    assert reader.stats() == {
+        "size": 1,
+        "hits": 1,
+        "misses": 2,
+        "redis_hits": 1,
+        "redis_misses": 1,
+    }
+
+
+def test_redis_tier_keeps_sub_second_ttl(monkeypatch: pytest.MonkeyPatch):
+    # Mocking the Redis client, recording the expiry of each value
+    expiries = {}
+
+    monkeypatch.setattr(
+        redis.Redis,
+        "set",
+        lambda self, name, value, px: expiries.__setitem__(name, px),
+        raising=True,
+    )
+
+    cache = ResultCache(max_size=8, ttl=0.5, redis_client=redis.Redis())
+    cache.set("key", b"{}")
+
+    assert list(expiries.values()) == [500]
+
+
+def test_embedding_cache_many_async_uses_one_round_trip():
+    # Mocking the asyncio Redis client with a dict, recording round trips
+    store = {}
+    round_trips = []
+
+    class MockAsyncPipeline:
+        def __init__(self):
+            self.commands = []
+
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, type, value, traceback):
+            pass
+
+        def set(self, name, value, **kwargs):
+            self.commands.append((name, value))
+
+        async def execute(self):
+            round_trips.append(f"set {len(self.commands)}")
+            store.update(self.commands)
+
+    class MockAsyncRedis:
+        async def mget(self, keys):
+            round_trips.append(f"mget {len(keys)}")
+            return [store.get(key) for key in keys]
+
+        def pipeline(self, transaction=True):
+            return MockAsyncPipeline()
+
+    writer = EmbeddingCache(max_size=8, ttl=60, async_redis_client=MockAsyncRedis())
+    reader = EmbeddingCache(max_size=8, ttl=60, async_redis_client=MockAsyncRedis())
+    writer.set("cached locally", [0.0])
+
+    asyncio.run(writer.set_many_async({"first": [1.0], "Second": [2.0]}))
+    embeddings = asyncio.run(
+        reader.get_many_async(["first", "second", "cached locally", "missing"])
+    )
+    cached = asyncio.run(writer.get_many_async(["cached locally", "first"]))
+
+    assert embeddings == [[1.0], [2.0], None, None]
+    assert cached == [[0.0], [1.0]]
+    assert round_trips == ["set 2", "mget 4"]
+
+
+def test_result_key_includes_index_version():
+    key = ResultCache.result_key("Redis  Cluster", 40, "index_id", "v1")
+
+    assert key == ResultCache.result_key("redis cluster", 40, "index_id", "v1")
+    assert key != ResultCache.result_key("redis cluster", 40, "index_id", "v2")
+    assert key != ResultCache.result_key("redis cluster", 20, "index_id", "v1")
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+import redis
+import redis.asyncio
+
+from app.search.cluster import (
+    create_async_redis_client,
+    mget,
+    mget_async,
+    num_mget_commands,
+)
+from app.search.records import decode_post, encode_post
+
+
+def test_create_async_redis_client_of_cluster():
+    client = create_async_redis_client("localhost", "7000", cluster=True)
+
+    assert isinstance(client, redis.asyncio.RedisCluster)
+    assert isinstance(
+        create_async_redis_client("localhost", "6379"), redis.asyncio.Redis
+    )
+
+
+def test_mget_splits_cluster_keys_by_slot(monkeypatch: pytest.MonkeyPatch):
+    # Mocking the cluster client, MGET of keys of many slots fails on a cluster
+    def mock_constructor(self, *args, **kwargs):
+        self.calls = []
+
+    def mock_mget(self, keys: list[str]):
+        raise redis.exceptions.RedisClusterException("keys must map to one slot")
+
+    def mock_mget_nonatomic(self, keys: list[str]):
+        self.calls.append(keys)
+        return [encode_post(key, "body", []) for key in keys]
+
+    monkeypatch.setattr(redis.RedisCluster, "__init__", mock_constructor)
+    monkeypatch.setattr(redis.RedisCluster, "mget", mock_mget)
+    monkeypatch.setattr(redis.RedisCluster, "mget_nonatomic", mock_mget_nonatomic)
+
+    client = redis.RedisCluster()
+    records = mget(client, ["1", "2", "3"])
+
+    assert [decode_post(record)["title"] for record in records] == ["1", "2", "3"]
+    assert client.calls == [["1", "2", "3"]]
+
+
+def test_mget_async_uses_mget_on_a_single_node(monkeypatch: pytest.MonkeyPatch):
+    calls = []
+
+    async def mock_mget(self, keys: list[str]):
+        calls.append(keys)
+        return [None] * len(keys)
+
+    monkeypatch.setattr(redis.asyncio.Redis, "mget", mock_mget)
+
+    records = asyncio.run(mget_async(redis.asyncio.Redis(), ["1", "2"]))
+
+    assert records == [None, None]
+    assert calls == [["1", "2"]]
+
+
+def test_num_mget_commands_counts_cluster_slots():
+    keys = ["{post}1", "{post}2", "b"]
+
+    # keys sharing a hash tag share a slot, so one MGET per distinct slot
+    assert (
+        num_mget_commands(
+            create_async_redis_client("localhost", "7000", cluster=True), keys
+        )
+        == 2
+    )
+    assert num_mget_commands(redis.asyncio.Redis(), keys) == 1
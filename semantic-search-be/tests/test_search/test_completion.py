@@ -0,0 +1,54 @@
+import pytest
+
+from app.search.completion import CompletionIndex, write_completion_index
+
+
+@pytest.fixture
+def completion_index(tmp_path) -> CompletionIndex:
+    path = str(tmp_path / "titles.idx")
+    num_titles = write_completion_index(
+        path,
+        [
+            "How to sort a list",
+            "how to  sort a LIST",
+            "How to split a string",
+            "Hows it going",
+            "Python sort",
+            "Ünicode errors",
+            "",
+        ],
+    )
+
+    assert num_titles == 5
+    return CompletionIndex(path)
+
+
+def test_complete_matches_normalized_prefix(completion_index: CompletionIndex):
+    assert completion_index.complete("HOW  to") == [
+        "How to sort a list",
+        "How to split a string",
+    ]
+    assert completion_index.complete("how") == [
+        "How to sort a list",
+        "How to split a string",
+        "Hows it going",
+    ]
+    assert completion_index.complete("ünicode") == ["Ünicode errors"]
+
+
+def test_complete_ends_word_at_typed_space(completion_index: CompletionIndex):
+    assert completion_index.complete("how ", limit=1) == ["How to sort a list"]
+    assert completion_index.complete("how") != completion_index.complete("how ")
+
+
+def test_complete_without_matches(completion_index: CompletionIndex):
+    assert completion_index.complete("zebra") == []
+    assert completion_index.complete("  ") == []
+
+
+def test_completion_index_rejects_other_files(tmp_path):
+    path = tmp_path / "titles.json"
+    path.write_bytes(b"{}" * 64)
+
+    with pytest.raises(ValueError):
+        CompletionIndex(str(path))
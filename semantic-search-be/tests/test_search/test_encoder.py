@@ -0,0 +1,46 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from app.search.encoder import OnnxEncoder, create_query_encoder
+
+
+def test_onnx_encoder_mean_pools_and_normalizes(monkeypatch: pytest.MonkeyPatch):
+    # Mocking the constructor and setting up mock tokenizer and session
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(OnnxEncoder, "__init__", mock_constructor)
+
+    class MockTokenizer:
+        def encode_batch(self, texts: list[str]):
+            return [
+                SimpleNamespace(ids=[1, 2], attention_mask=[1, 1], type_ids=[0, 0]),
+                SimpleNamespace(ids=[3, 0], attention_mask=[1, 0], type_ids=[0, 0]),
+            ]
+
+    class MockSession:
+        def run(self, output_names, inputs):
+            assert set(inputs) == {"input_ids", "attention_mask"}
+            return [
+                np.array(
+                    [[[3.0, 0.0], [5.0, 0.0]], [[0.0, 2.0], [9.0, 9.0]]],
+                    dtype=np.float32,
+                )
+            ]
+
+    encoder = OnnxEncoder()
+    encoder._tokenizer = MockTokenizer()
+    encoder._session = MockSession()
+    encoder._input_names = {"input_ids", "attention_mask"}
+
+    # Testing the encode method, padding tokens are left out of the mean
+    embeddings = encoder.encode(["first", "second"])
+
+    assert embeddings == [[1.0, 0.0], [0.0, 1.0]]
+
+
+def test_create_query_encoder_unknown_backend():
+    with pytest.raises(ValueError):
+        create_query_encoder("gpu")
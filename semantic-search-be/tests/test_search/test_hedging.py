@@ -0,0 +1,100 @@
+import asyncio
+import pytest
+
+from app.search.hedging import Hedger
+
+
+def warm_up(hedger: Hedger, latency: float, num_calls: int = 100):
+    # Recording fast calls so the hedge delay is known
+    for _ in range(num_calls):
+        hedger._record(latency, hedged=False)
+
+
+def test_hedger_sends_duplicate_of_slow_call():
+    hedger = Hedger("match", percentile=95, max_hedge_rate=0.5)
+    warm_up(hedger, 0.001)
+    calls = []
+
+    async def slow_first_call():
+        calls.append(1)
+        await asyncio.sleep(1 if len(calls) == 1 else 0)
+        return len(calls)
+
+    result = asyncio.run(hedger.call(slow_first_call))
+
+    assert result == 2
+    assert hedger.num_hedges == 1
+    assert hedger.num_hedge_wins == 1
+
+
+def test_hedger_caps_hedge_rate():
+    hedger = Hedger("embed", percentile=50, max_hedge_rate=0.1, window_size=20)
+    warm_up(hedger, 0.001, num_calls=20)
+
+    async def slow_call():
+        await asyncio.sleep(0.005)
+
+    async def run():
+        for _ in range(20):
+            await hedger.call(slow_call)
+
+    asyncio.run(run())
+
+    # at most 10% of the 20 recent calls
+    assert hedger.num_hedges == 2
+    assert hedger.num_hedges_capped > 0
+    assert hedger.stats()["hedges"] == 2
+
+
+def test_hedger_falls_back_to_other_call_on_failure():
+    hedger = Hedger("match", max_hedge_rate=1.0)
+    warm_up(hedger, 0.001)
+    calls = []
+
+    async def failing_first_call():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(0.01)
+            raise ConnectionError("reset")
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    assert asyncio.run(hedger.call(failing_first_call)) == "ok"
+    # the failed first call leaves no latency behind
+    assert len(hedger._latencies) == 100
+
+
+def test_hedger_records_only_first_call_latency():
+    hedger = Hedger("match", percentile=50, max_hedge_rate=1.0)
+    warm_up(hedger, 0.01)
+    calls = []
+
+    async def slow_first_call():
+        calls.append(1)
+        await asyncio.sleep(1 if len(calls) == 1 else 0)
+        return len(calls)
+
+    assert asyncio.run(hedger.call(slow_first_call)) == 2
+
+    # the fast hedge is not recorded, the cancelled first call ran at least the delay
+    assert len(hedger._latencies) == 101
+    assert hedger._latencies[-1] >= 0.01
+
+    async def failing_call():
+        raise ConnectionError("reset")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(hedger.call(failing_call))
+    assert len(hedger._latencies) == 101
+
+
+def test_hedger_does_not_hedge_without_latency_history():
+    hedger = Hedger("embed", max_hedge_rate=1.0)
+
+    async def failing_call():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad query")
+
+    with pytest.raises(ValueError):
+        asyncio.run(hedger.call(failing_call))
+    assert hedger.num_hedges == 0
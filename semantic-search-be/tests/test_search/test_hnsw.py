@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from app.search.hnsw import HnswIndex
+from app.search.index import NumpyIndex, evaluate_recall
+
+hnswlib = pytest.importorskip("hnswlib")
+
+
+@pytest.fixture
+def embeddings() -> np.ndarray:
+    rng = np.random.default_rng(42)
+    embeddings = rng.normal(size=(1000, 16)).astype(np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def test_hnsw_recall_against_exact_search(embeddings: np.ndarray):
+    ids = [str(i + 1000) for i in range(len(embeddings))]
+    index = HnswIndex.build(ids, embeddings, m=16, ef_construction=100, ef_search=100)
+
+    report = evaluate_recall(
+        index, NumpyIndex(ids, embeddings), embeddings[:50].tolist(), 10
+    )
+
+    assert report["recall@10"] > 0.9
+
+
+def test_hnsw_save_and_load(tmp_path, embeddings: np.ndarray):
+    ids = [str(i + 1000) for i in range(len(embeddings))]
+    index = HnswIndex.build(ids, embeddings, m=8, ef_construction=50)
+    path = str(tmp_path / "index.bin")
+    index.save(path)
+
+    loaded = HnswIndex.load(path, dimensions=16, ef_search=50)
+    matches = loaded.match(embeddings[:2].tolist(), num_neighbors=3)
+
+    assert [query[0].id for query in matches] == ["1000", "1001"]
+    assert matches[0][0].distance == pytest.approx(1.0, abs=1e-5)
+    assert loaded.get_version() is not None
+
+
+def test_hnsw_large_match_keeps_configured_ef(embeddings: np.ndarray):
+    ids = [str(i + 1000) for i in range(len(embeddings))]
+    index = HnswIndex.build(ids, embeddings, m=8, ef_construction=50, ef_search=20)
+
+    matches = index.match(embeddings[:1].tolist(), num_neighbors=200)
+
+    assert len(matches[0]) == 200
+    assert index._index.ef == 20
@@ -0,0 +1,127 @@
+import asyncio
+import json
+
+import numpy as np
+import pytest
+
+from app.search.index import (
+    NumpyIndex,
+    VertexMatchingEngineIndex,
+    load_embeddings,
+    top_k,
+)
+
+
+@pytest.fixture
+def embeddings() -> np.ndarray:
+    rng = np.random.default_rng(42)
+    embeddings = rng.normal(size=(500, 16)).astype(np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def test_top_k():
+    positions, scores = top_k(np.array([[0.1, 0.9, 0.5, 0.7]]), 3)
+
+    assert positions.tolist() == [[1, 3, 2]]
+    assert scores.tolist() == [[0.9, 0.7, 0.5]]
+
+
+def test_load_embeddings(tmp_path):
+    # Embedding shards as written by the MatchingEngineIndexer component
+    for shard, rows in enumerate([[("1", [0.5, 1.0])], [("2", [-1.0, 0.25])]]):
+        with open(tmp_path / f"embeddings-0000{shard}-of-00002.json", "w") as f:
+            for id, embedding in rows:
+                f.write(
+                    json.dumps({"id": id, "embedding": [str(v) for v in embedding]})
+                    + "\n"
+                )
+
+    ids, matrix = load_embeddings(str(tmp_path))
+
+    assert ids == ["1", "2"]
+    assert matrix.dtype == np.float32
+    assert matrix.tolist() == [[0.5, 1.0], [-1.0, 0.25]]
+
+
+def test_brute_force_match(embeddings: np.ndarray):
+    ids = [str(i) for i in range(len(embeddings))]
+    index = NumpyIndex(ids, embeddings)
+
+    queries = embeddings[:3]
+    matches = index.match(queries.tolist(), num_neighbors=5)
+
+    expected = np.argsort(-(queries @ embeddings.T), axis=1)[:, :5]
+    assert [[match.id for match in query] for query in matches] == [
+        [str(i) for i in row] for row in expected
+    ]
+    assert matches[0][0].id == "0"
+    assert matches[0][0].distance == pytest.approx(1.0)
+
+
+def test_brute_force_match_in_chunks(
+    monkeypatch: pytest.MonkeyPatch, embeddings: np.ndarray
+):
+    ids = [str(i) for i in range(len(embeddings))]
+    index = NumpyIndex(ids, embeddings)
+    queries = embeddings[:4].tolist()
+    expected = index.match(queries, num_neighbors=10)
+
+    # rows scored in chunks smaller than the number of neighbors
+    monkeypatch.setattr("app.search.index._SCORE_CHUNK_SIZE", 7)
+    matches = index.match(queries, num_neighbors=10)
+
+    assert [[m.id for m in query] for query in matches] == [
+        [m.id for m in query] for query in expected
+    ]
+
+
+def test_ivf_with_fewer_rows_than_partitions(embeddings: np.ndarray):
+    ids = [str(i) for i in range(3)]
+    index = NumpyIndex(ids, embeddings[:3], num_partitions=8, num_probes=8)
+
+    matches = index.match(embeddings[:1].tolist(), num_neighbors=3)
+
+    assert matches[0][0].id == "0"
+    assert sorted(match.id for match in matches[0]) == ids
+
+
+def test_ivf_match_probing_every_partition_is_exact(embeddings: np.ndarray):
+    ids = [str(i) for i in range(len(embeddings))]
+    exact = NumpyIndex(ids, embeddings)
+    ivf = NumpyIndex(ids, embeddings, num_partitions=8, num_probes=8)
+
+    queries = embeddings[10:20].tolist()
+    exact_matches = exact.match(queries, num_neighbors=10)
+    ivf_matches = ivf.match(queries, num_neighbors=10)
+
+    assert [[m.id for m in query] for query in ivf_matches] == [
+        [m.id for m in query] for query in exact_matches
+    ]
+
+
+def test_ivf_match_finds_query_in_its_partition(embeddings: np.ndarray):
+    ids = [str(i) for i in range(len(embeddings))]
+    ivf = NumpyIndex(ids, embeddings, num_partitions=8, num_probes=2)
+
+    matches = ivf.match(embeddings[:20].tolist(), num_neighbors=1)
+
+    assert [query[0].id for query in matches] == ids[:20]
+
+
+def test_vertex_connect_async_times_out(monkeypatch: pytest.MonkeyPatch):
+    # Mocking the constructor and a grpc channel that never connects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(VertexMatchingEngineIndex, "__init__", mock_constructor)
+
+    class MockChannel:
+        async def channel_ready(self):
+            await asyncio.sleep(60)
+
+    index = VertexMatchingEngineIndex()
+    index._async_channel = MockChannel()
+    index._async_match_stub = object()
+
+    with pytest.raises(TimeoutError, match="not reachable"):
+        asyncio.run(index.connect_async(timeout=0.01))
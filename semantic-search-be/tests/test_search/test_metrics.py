@@ -0,0 +1,128 @@
+import pytest
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.testclient import TestClient
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+from prometheus_client.registry import CollectorRegistry
+
+from app.search.batching import MicroBatcher
+from app.search.cache import EmbeddingCache, ResultCache
+from app.search.metrics import MetricsMiddleware, SearchCollector
+from app.search.precompute import PrecomputedResults
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    def get_item(item_id: int) -> dict:
+        if item_id == 0:
+            raise HTTPException(status_code=404, detail="Not found")
+        return {"id": item_id}
+
+    @app.get("/metrics")
+    async def metrics() -> Response:
+        return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+    return app
+
+
+def request_count(route: str, status: str) -> float:
+    return (
+        REGISTRY.get_sample_value(
+            "search_http_requests_total",
+            {"route": route, "method": "GET", "status": status},
+        )
+        or 0.0
+    )
+
+
+def test_metrics_middleware_labels_requests_by_route_template():
+    client = TestClient(create_app())
+    ok_before = request_count("/items/{item_id}", "200")
+    not_found_before = request_count("/items/{item_id}", "404")
+    unmatched_before = request_count("unmatched", "404")
+    latency_before = (
+        REGISTRY.get_sample_value(
+            "search_http_request_duration_seconds_count",
+            {"route": "/items/{item_id}"},
+        )
+        or 0.0
+    )
+
+    assert client.get("/items/1").status_code == 200
+    assert client.get("/items/2").status_code == 200
+    assert client.get("/items/0").status_code == 404
+    assert client.get("/missing").status_code == 404
+    metrics = client.get("/metrics").text
+
+    assert request_count("/items/{item_id}", "200") == ok_before + 2
+    assert request_count("/items/{item_id}", "404") == not_found_before + 1
+    assert request_count("unmatched", "404") == unmatched_before + 1
+    assert (
+        REGISTRY.get_sample_value(
+            "search_http_request_duration_seconds_count",
+            {"route": "/items/{item_id}"},
+        )
+        == latency_before + 3
+    )
+    # path parameters never become label values
+    assert 'route="/items/1"' not in metrics
+    assert "search_http_requests_in_progress" in metrics
+
+
+def test_search_collector_reports_service_counters(monkeypatch: pytest.MonkeyPatch):
+    # Mocking the search service with the objects the collector reads
+    class MockPostVectorSearch:
+        embedding_cache = EmbeddingCache(max_size=8, ttl=60)
+        result_cache = ResultCache(max_size=8, ttl=60)
+        precomputed_results = PrecomputedResults()
+
+        def hedging_stats(self):
+            return {
+                "embed": {"calls": 10, "hedges": 2, "hedge_wins": 1, "hedges_capped": 0}
+            }
+
+        def batchers(self):
+            batcher = MicroBatcher(None, max_batch_size=8, max_wait=0.002)
+            batcher.num_batches, batcher.num_items = 3, 12
+            return {"embed": batcher}
+
+    service = MockPostVectorSearch()
+    service.embedding_cache.set("hit", [1.0])
+    service.embedding_cache.get("hit")
+    service.embedding_cache.get("miss")
+    service.precomputed_results.get("question", 40, "v1")
+
+    registry = CollectorRegistry()
+    registry.register(SearchCollector(service))
+
+    def sample(name: str, labels: dict) -> float:
+        return registry.get_sample_value(name, labels)
+
+    assert (
+        sample(
+            "search_cache_lookups_total",
+            {"cache": "embedding", "tier": "local", "outcome": "hit"},
+        )
+        == 1
+    )
+    assert (
+        sample(
+            "search_cache_lookups_total",
+            {"cache": "precomputed", "tier": "local", "outcome": "miss"},
+        )
+        == 1
+    )
+    assert (
+        sample("search_hedged_calls_total", {"stage": "embed", "outcome": "hedges"})
+        == 2
+    )
+    assert (
+        sample("search_micro_batches_total", {"stage": "embed", "kind": "items"}) == 12
+    )
+
+    # Mocking an executor without the private ThreadPoolExecutor attributes
+    monkeypatch.setattr("app.search.metrics._default_executor", lambda: object())
+
+    assert "search_thread_pool_threads" in generate_latest(registry).decode()
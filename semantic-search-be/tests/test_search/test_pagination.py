@@ -0,0 +1,41 @@
+import pytest
+
+from google.cloud.aiplatform.matching_engine.matching_engine_index_endpoint import (
+    MatchNeighbor,
+)
+from app.search.pagination import (
+    decode_cursor,
+    encode_cursor,
+    neighbor_range,
+    new_token,
+    num_packed_neighbors,
+    pack_neighbors,
+    unpack_neighbors,
+)
+
+
+def test_packed_neighbors_slice_by_byte_range():
+    match_neighbors = [MatchNeighbor(id=str(i), distance=i / 4) for i in range(10, 20)]
+
+    packed = pack_neighbors(match_neighbors)
+    start, end = neighbor_range(3, 4)
+
+    assert num_packed_neighbors(len(packed)) == 10
+    assert unpack_neighbors(packed) == match_neighbors
+    # GETRANGE end is inclusive
+    assert unpack_neighbors(packed[start : end + 1]) == match_neighbors[3:7]
+
+
+def test_cursor_roundtrip():
+    token = new_token()
+
+    cursor = encode_cursor(token, 30)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (token, 30)
+
+
+@pytest.mark.parametrize("cursor", ["", "not base64!", encode_cursor("token", -1)])
+def test_decode_cursor_rejects_malformed_cursor(cursor: str):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
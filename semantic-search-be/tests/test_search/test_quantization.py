@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+from app.search.index import NumpyIndex
+from app.search.quantization import (
+    BinaryIndex,
+    PqIndex,
+    ProductQuantizer,
+    hamming_distances,
+    pack_sign_bits,
+)
+from app.search.store import EmbeddingStore, write_embedding_store
+
+
+@pytest.fixture
+def embeddings() -> np.ndarray:
+    rng = np.random.default_rng(42)
+    embeddings = rng.normal(size=(1000, 32)).astype(np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def recall(matches, exact_matches, num_neighbors: int) -> float:
+    return np.mean(
+        [
+            len({m.id for m in a} & {m.id for m in b}) / num_neighbors
+            for a, b in zip(matches, exact_matches)
+        ]
+    )
+
+
+def test_product_quantizer_approximates_dot_products(embeddings: np.ndarray):
+    quantizer = ProductQuantizer.train(embeddings, num_subspaces=8, iterations=5)
+
+    codes = quantizer.encode(embeddings)
+    scores = quantizer.score(quantizer.lookup_tables(embeddings[:5]), codes)
+
+    assert codes.shape == (1000, 8)
+    assert codes.dtype == np.uint8
+    np.testing.assert_allclose(
+        scores, embeddings[:5] @ quantizer.decode(codes).T, rtol=1e-4, atol=1e-4
+    )
+    assert np.abs(scores - embeddings[:5] @ embeddings.T).mean() < 0.1
+
+
+def test_product_quantizer_rejects_uneven_subspaces(embeddings: np.ndarray):
+    with pytest.raises(ValueError):
+        ProductQuantizer.train(embeddings, num_subspaces=5)
+
+
+def test_pq_index_rescore_improves_recall(tmp_path, embeddings: np.ndarray):
+    ids = [str(i + 1000) for i in range(len(embeddings))]
+    index_path = str(tmp_path / "pq.npz")
+    store_path = str(tmp_path / "embeddings.emb")
+    PqIndex.build(ids, embeddings, num_subspaces=8, iterations=5).save(index_path)
+    write_embedding_store(store_path, ids, embeddings, dtype="float32")
+
+    index = PqIndex.load(index_path, rescore_path=store_path, num_rescore=100)
+    queries = embeddings[:20].tolist()
+    exact = NumpyIndex(ids, embeddings).match(queries, 10)
+
+    rescored = index.match(queries, num_neighbors=10)
+    index.num_rescore = 0
+    approximate = index.match(queries, num_neighbors=10)
+
+    assert [len(query) for query in rescored] == [10] * 20
+    assert [query[0].id for query in rescored] == ids[:20]
+    assert recall(rescored, exact, 10) > 0.9
+    assert recall(rescored, exact, 10) >= recall(approximate, exact, 10)
+
+
+def test_hamming_distances_count_differing_sign_bits():
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(50, 384))
+    queries = rng.normal(size=(3, 384))
+
+    bits = pack_sign_bits(embeddings)
+    distances = hamming_distances(pack_sign_bits(queries), bits)
+
+    assert bits.shape == (50, 6)
+    assert bits.nbytes == 50 * 48
+    expected = ((queries[:, None] > 0) != (embeddings[None] > 0)).sum(axis=2)
+    np.testing.assert_array_equal(distances, expected)
+
+
+def test_binary_index_reranks_candidates(tmp_path, embeddings: np.ndarray):
+    ids = [str(i + 1000) for i in range(len(embeddings))]
+    path = str(tmp_path / "embeddings.emb")
+    write_embedding_store(path, ids, embeddings, dtype="float16")
+
+    # 32 sign bits are a coarse prefilter, keep a wide candidate list
+    index = BinaryIndex.open(path, num_rescore=400)
+    queries = embeddings[:20].tolist()
+    matches = index.match(queries, num_neighbors=10)
+
+    exact = NumpyIndex(ids, embeddings).match(queries, 10)
+    assert [query[0].id for query in matches] == ids[:20]
+    assert matches[0][0].distance == pytest.approx(1, abs=1e-2)
+    assert recall(matches, exact, 10) > 0.9
@@ -0,0 +1,55 @@
+import pytest
+
+from app.search.records import decode_post, encode_post, post_from_hash
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_post_record_roundtrip(compress: bool):
+    post = {
+        "title": "How to pipeline redis commands in python? " * 4,
+        "body": "<p>I am using redis-py and want fewer round trips ünïcode",
+        "tags": ["python", "redis", "redis-py"],
+    }
+
+    record = encode_post(post["title"], post["body"], post["tags"], compress=compress)
+
+    assert decode_post(record) == post
+    if compress:
+        assert len(record) < len(encode_post(post["title"], post["body"], post["tags"]))
+
+
+def test_post_record_matches_hash_layout():
+    post_hash = {"title": "title", "body": "body", "tags": "python|redis"}
+
+    record = encode_post("title", "body", ["python", "redis"])
+
+    assert decode_post(record) == post_from_hash(post_hash)
+
+
+def test_decode_post_rejects_unknown_version():
+    with pytest.raises(ValueError):
+        decode_post(b"\x02" + encode_post("title", "body", [])[1:])
+
+
+@pytest.mark.parametrize(
+    "title, body, tags",
+    [
+        ("t" * 65536, "body", []),
+        ("title", "ü" * 32768, []),
+        ("title", "body", ["tag"] * 256),
+        ("title", "body", ["t" * 256]),
+    ],
+)
+def test_encode_post_rejects_fields_too_long_for_the_header(
+    title: str, body: str, tags: list[str]
+):
+    with pytest.raises(ValueError, match="records hold"):
+        encode_post(title, body, tags)
+
+
+def test_encode_post_accepts_fields_at_the_header_limits():
+    post = {"title": "t" * 65535, "body": "b" * 65535, "tags": ["t" * 255] * 255}
+
+    record = encode_post(post["title"], post["body"], post["tags"])
+
+    assert decode_post(record) == post
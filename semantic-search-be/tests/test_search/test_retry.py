@@ -0,0 +1,68 @@
+import asyncio
+import pytest
+
+import redis.exceptions
+from app.search.retry import DeadlineExceeded, RetryPolicy, deadline, is_retryable
+
+
+def test_retry_policy_retries_transient_errors():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise redis.exceptions.ConnectionError("connection reset")
+        return "ok"
+
+    policy = RetryPolicy("fetch", max_attempts=3, base_delay=0)
+
+    assert policy.call(flaky) == "ok"
+    assert len(calls) == 3
+    assert policy.num_retries == 2
+
+
+def test_retry_policy_fails_fast_on_non_retryable_errors():
+    calls = []
+
+    async def missing_post():
+        calls.append(1)
+        raise ValueError("Cannot match empty text!")
+
+    policy = RetryPolicy("fetch", max_attempts=5, base_delay=0)
+
+    with pytest.raises(ValueError):
+        asyncio.run(policy.call_async(missing_post))
+    assert len(calls) == 1
+    assert not is_retryable(ValueError())
+    assert is_retryable(TimeoutError())
+
+
+def test_retry_policy_stops_at_request_deadline():
+    calls = []
+
+    async def hanging_endpoint():
+        calls.append(1)
+        await asyncio.sleep(1)
+
+    async def search():
+        with deadline(0.05):
+            return await RetryPolicy("embed", max_attempts=5).call_async(
+                hanging_endpoint
+            )
+
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(search())
+    assert len(calls) == 1
+
+
+def test_nested_deadline_keeps_earlier_expiry():
+    calls = []
+
+    def endpoint():
+        calls.append(1)
+
+    with deadline(-1):
+        with deadline(60):
+            with pytest.raises(DeadlineExceeded):
+                RetryPolicy("embed").call(endpoint)
+    assert not calls
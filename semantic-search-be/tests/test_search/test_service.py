@@ -1,3 +1,6 @@
+import asyncio
+import json
+import numpy as np
 import pytest
 
 from google.cloud import aiplatform
@@ -5,9 +8,29 @@ from google.cloud.aiplatform.matching_engine.matching_engine_index_endpoint impo
     MatchNeighbor,
 )
 from google.cloud.aiplatform import models
-from app.search.schema import Post, PostMatch
+from app.search.batching import MicroBatcher
+from app.search.cache import EmbeddingCache, ResultCache
+from app.search.encoder import VertexEndpointEncoder
+from app.search.index import NumpyIndex, VertexMatchingEngineIndex
+from app.search.precompute import PrecomputedResults
+from app.search.records import encode_post
+from app.search.schema import Post, PostMatch, Result
+from app.search.serialization import serialize_matches
+from app.search.retry import RetryPolicy, remaining_time
 from app.search.service import PostVectorSearch
 import redis
+import redis.asyncio
+
+
+def set_stage_policies(search_service: PostVectorSearch):
+    # Setting up what the mocked constructor skips
+    search_service._request_timeout = 5.0
+    search_service._batch_request_timeout = 30.0
+    search_service._embed_retry = RetryPolicy("embed", base_delay=0)
+    search_service._match_retry = RetryPolicy("match", base_delay=0)
+    search_service._fetch_retry = RetryPolicy("fetch", base_delay=0)
+    search_service._embed_hedger = None
+    search_service._match_hedger = None
 
 
 def test_find_match(monkeypatch: pytest.MonkeyPatch):
@@ -18,9 +41,13 @@ def test_find_match(monkeypatch: pytest.MonkeyPatch):
     monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
 
     search_service = PostVectorSearch()
-    search_service._model_endpoint = aiplatform.Endpoint
-    search_service._index_endpoint = aiplatform.MatchingEngineIndexEndpoint
-    search_service._deployed_index_id = "test_index_id"
+    set_stage_policies(search_service)
+    search_service._encoder = VertexEndpointEncoder(aiplatform.Endpoint)
+    search_service._index = VertexMatchingEngineIndex(
+        aiplatform.MatchingEngineIndexEndpoint, "test_index_id"
+    )
+    search_service._embedding_cache = EmbeddingCache(max_size=1, ttl=60)
+    search_service._projection = None
 
     # Mocking the predict method of model endpoint
     def mock_model_endpoint_predict(text: str):
@@ -47,6 +74,42 @@ def test_find_match(monkeypatch: pytest.MonkeyPatch):
     matches = search_service.find_match(text="test", num_neighbors=1)
 
     assert matches == expected_matches
+    assert len(search_service._embedding_cache.get(" TEST ")) == 10
+
+
+def test_find_match_projects_query_embedding(monkeypatch: pytest.MonkeyPatch):
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    # unit embeddings inside the projected subspace keep their dot products
+    rng = np.random.default_rng(0)
+    projection = np.linalg.qr(rng.normal(size=(8, 4)))[0].astype(np.float32)
+    reduced = rng.normal(size=(20, 4)).astype(np.float32)
+    reduced /= np.linalg.norm(reduced, axis=1, keepdims=True)
+    embeddings = reduced @ projection.T
+
+    search_service = PostVectorSearch()
+    set_stage_policies(search_service)
+    search_service._embedding_cache = EmbeddingCache(max_size=1, ttl=60)
+    search_service._projection = projection
+    search_service._index = NumpyIndex(
+        [str(i) for i in range(20)], embeddings @ projection
+    )
+
+    class MockEncoder:
+        def encode(self, texts: list[str]) -> list[list[float]]:
+            return embeddings[:1].tolist()
+
+    search_service._encoder = MockEncoder()
+
+    matches = search_service.find_match(text="test", num_neighbors=1)
+
+    assert matches[0].id == "0"
+    # the cache keeps the full dimension embedding
+    assert len(search_service._embedding_cache.get("test")) == 8
 
 
 def test_get_posts_from_matches(monkeypatch: pytest.MonkeyPatch):
@@ -74,8 +137,16 @@ def test_get_posts_from_matches(monkeypatch: pytest.MonkeyPatch):
 
     monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
 
+    # Mocking MGET of a post still stored as a hash
+    def mock_mget(keys: list[str]):
+        return [None] * len(keys)
+
+    monkeypatch.setattr(redis.Redis, "mget", mock_mget)
+
     search_service = PostVectorSearch()
+    set_stage_policies(search_service)
     search_service._redis_client = redis.Redis
+    search_service._binary_redis_client = redis.Redis
 
     # Testing the get_posts_from_matches method
     result = search_service.get_posts_from_matches(
@@ -91,3 +162,716 @@ def test_get_posts_from_matches(monkeypatch: pytest.MonkeyPatch):
     ]
 
     assert result == expected
+
+
+def test_find_match_async(monkeypatch: pytest.MonkeyPatch):
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    search_service = PostVectorSearch()
+    set_stage_policies(search_service)
+    search_service._embedding_cache = EmbeddingCache(max_size=1, ttl=60)
+
+    expected_matches = [MatchNeighbor(id="1", distance=0.8)]
+
+    # Mocking the non-blocking embedding and vector search calls
+    async def mock_encode_async(texts: list[str]):
+        return [[1, 2, 3, 4, 5, 6, 7, 8, 9, 10]]
+
+    async def mock_match_async(queries: list[list[float]], num_neighbors: int):
+        return [expected_matches]
+
+    search_service._encode_async = mock_encode_async
+    search_service._match_async = mock_match_async
+    search_service._embed_batcher = MicroBatcher(
+        search_service._encode_async, max_batch_size=1, max_wait=0
+    )
+    search_service._match_batcher = MicroBatcher(
+        search_service._match_batch_async, max_batch_size=1, max_wait=0
+    )
+
+    # Testing the find_match_async method
+    matches = asyncio.run(search_service.find_match_async(text="test", num_neighbors=1))
+
+    assert matches == expected_matches
+
+    # Unbatched queries go straight to the vector search
+    search_service._match_batcher = None
+    matches = asyncio.run(
+        search_service.find_match_async(text="test", num_neighbors=1, batched=False)
+    )
+
+    assert matches == expected_matches
+
+
+def test_get_posts_from_matches_async(monkeypatch: pytest.MonkeyPatch):
+    # Mocking the asyncio Redis pipeline
+    class MockAsyncRedisPipeline:
+        async def __aenter__(self):
+            return MockAsyncRedisPipeline()
+
+        async def __aexit__(self, type, value, traceback):
+            pass
+
+        def hgetall(self, name: str):
+            return None
+
+        async def execute(self):
+            return [
+                {"title": "test_title", "body": "test_body", "tags": "redis|python"}
+            ]
+
+    monkeypatch.setattr(redis.asyncio.Redis, "pipeline", MockAsyncRedisPipeline)
+
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    # Mocking MGET of a post still stored as a hash
+    async def mock_mget(keys: list[str]):
+        return [None] * len(keys)
+
+    monkeypatch.setattr(redis.asyncio.Redis, "mget", mock_mget)
+
+    search_service = PostVectorSearch()
+    set_stage_policies(search_service)
+    search_service._async_redis_client = redis.asyncio.Redis
+    search_service._async_binary_redis_client = redis.asyncio.Redis
+
+    # Testing the get_posts_from_matches_async method
+    result = asyncio.run(
+        search_service.get_posts_from_matches_async(
+            [MatchNeighbor(id="1", distance=0.8)]
+        )
+    )
+
+    expected = [
+        PostMatch(
+            id="1",
+            distance=0.8,
+            post=Post(title="test_title", body="test_body", tags=["redis", "python"]),
+        )
+    ]
+
+    assert result == expected
+
+
+def test_get_posts_from_matches_async_reads_both_layouts(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    # Mocking a migrated post stored as a record and a post still stored as a hash
+    hash_requests = []
+
+    async def mock_mget(keys: list[str]):
+        return [encode_post("record_title", "record_body", ["redis"]), None]
+
+    class MockAsyncRedisPipeline:
+        async def __aenter__(self):
+            return MockAsyncRedisPipeline()
+
+        async def __aexit__(self, type, value, traceback):
+            pass
+
+        def hgetall(self, name: str):
+            hash_requests.append(name)
+
+        async def execute(self):
+            return [{"title": "hash_title", "body": "hash_body", "tags": "a|b"}]
+
+    monkeypatch.setattr(redis.asyncio.Redis, "mget", mock_mget)
+    monkeypatch.setattr(redis.asyncio.Redis, "pipeline", MockAsyncRedisPipeline)
+
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    search_service = PostVectorSearch()
+    set_stage_policies(search_service)
+    search_service._async_redis_client = redis.asyncio.Redis
+    search_service._async_binary_redis_client = redis.asyncio.Redis
+
+    result = asyncio.run(
+        search_service.get_posts_from_matches_async(
+            [MatchNeighbor(id="1", distance=0.8), MatchNeighbor(id="2", distance=0.5)]
+        )
+    )
+
+    assert hash_requests == ["2"]
+    assert [match.post for match in result] == [
+        Post(title="record_title", body="record_body", tags=["redis"]),
+        Post(title="hash_title", body="hash_body", tags=["a", "b"]),
+    ]
+
+
+def test_search_result_async_uses_index_versioned_cache(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    search_service = PostVectorSearch()
+    set_stage_policies(search_service)
+    search_service._index = NumpyIndex([], np.empty((0, 1)))
+    search_service._result_cache = ResultCache(max_size=8, ttl=60)
+    search_service._precomputed_results = PrecomputedResults()
+    search_service._index_version = "v1"
+
+    # Requests never look up the index version themselves
+    def mock_get_version():
+        raise AssertionError("index version looked up on the request path")
+
+    search_service._index.get_version = mock_get_version
+
+    # Mocking the uncached search
+    searches = []
+
+    async def mock_search_json_async(text: str, num_neighbors: int):
+        searches.append(text)
+        return serialize_matches(
+            [MatchNeighbor(id="1", distance=0.8)],
+            [{"title": "test_title", "body": "test_body", "tags": ["redis"]}],
+        )
+
+    search_service.search_json_async = mock_search_json_async
+
+    # Testing the search_result_async method
+    result = asyncio.run(search_service.search_result_async("Test", 1))
+    cached = asyncio.run(search_service.search_result_async(" test ", 1))
+
+    assert cached == result
+    assert json.loads(result) == {
+        "num_matches": 1,
+        "matches": [
+            {
+                "id": "1",
+                "distance": 0.8,
+                "post": {"title": "test_title", "body": "test_body", "tags": ["redis"]},
+            }
+        ],
+    }
+    assert searches == ["Test"]
+
+    # A new index version stops serving entries of the previous one
+    search_service._index_version = "v2"
+    asyncio.run(search_service.search_result_async("test", 1))
+
+    assert searches == ["Test", "test"]
+
+
+def test_refresh_index_version_keeps_last_version(monkeypatch: pytest.MonkeyPatch):
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    search_service = PostVectorSearch()
+    search_service._index = NumpyIndex([], np.empty((0, 1)))
+    search_service._index_version = None
+    versions = iter(["v1", RuntimeError("admin API unavailable"), "v2"])
+
+    def mock_get_version():
+        version = next(versions)
+        if isinstance(version, Exception):
+            raise version
+        return version
+
+    search_service._index.get_version = mock_get_version
+
+    # Testing the refresh_index_version method
+    assert search_service.refresh_index_version() == "v1"
+    assert search_service.refresh_index_version() == "v1"
+    assert search_service.refresh_index_version() == "v2"
+    assert search_service._index_version == "v2"
+
+
+def test_serialize_matches_matches_result_schema():
+    match_neighbors = [
+        MatchNeighbor(id="1", distance=0.8123),
+        MatchNeighbor(id="2", distance=np.float32(0.5)),
+    ]
+    posts = [
+        {"title": "title_1", "body": "body_1", "tags": ["redis", "python"]},
+        {"title": "tïtle_2", "body": "body_2", "tags": ["python"]},
+    ]
+
+    result = json.loads(
+        b'{"latency":1.5,' + serialize_matches(match_neighbors, posts)[1:]
+    )
+
+    expected = Result(
+        latency=1.5,
+        num_matches=2,
+        matches=PostVectorSearch._to_post_matches(match_neighbors, posts),
+    )
+    assert result == expected.model_dump(exclude_none=True)
+
+
+def test_find_match_async_coalesces_concurrent_queries(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    search_service = PostVectorSearch()
+    set_stage_policies(search_service)
+    search_service._embedding_cache = EmbeddingCache(max_size=0, ttl=60)
+
+    # Mocking the non-blocking embedding and vector search calls
+    predict_batches = []
+    match_batches = []
+
+    async def mock_encode_async(texts: list[str]):
+        predict_batches.append(texts)
+        return [[float(len(text))] for text in texts]
+
+    async def mock_match_async(queries: list[list[float]], num_neighbors: int):
+        match_batches.append((queries, num_neighbors))
+        return [
+            [
+                MatchNeighbor(id=f"{query[0]}-{i}", distance=0.5)
+                for i in range(num_neighbors)
+            ]
+            for query in queries
+        ]
+
+    search_service._encode_async = mock_encode_async
+    search_service._match_async = mock_match_async
+    search_service._embed_batcher = MicroBatcher(
+        search_service._encode_async, max_batch_size=8, max_wait=0.01
+    )
+    search_service._match_batcher = MicroBatcher(
+        search_service._match_batch_async, max_batch_size=8, max_wait=0.01
+    )
+
+    async def search_concurrently():
+        return await asyncio.gather(
+            search_service.find_match_async(text="a", num_neighbors=1),
+            search_service.find_match_async(text="bb", num_neighbors=3),
+            search_service.find_match_async(text="ccc", num_neighbors=2),
+        )
+
+    # Testing the find_match_async method with concurrent queries
+    results = asyncio.run(search_concurrently())
+
+    assert predict_batches == [["a", "bb", "ccc"]]
+    assert [num_neighbors for _, num_neighbors in match_batches] == [3]
+    assert [[match.id for match in matches] for matches in results] == [
+        ["1.0-0"],
+        ["2.0-0", "2.0-1", "2.0-2"],
+        ["3.0-0", "3.0-1"],
+    ]
+
+
+def test_search_batch_async(monkeypatch: pytest.MonkeyPatch):
+    # Mocking the asyncio Redis pipeline and recording requested keys
+    requested_ids = []
+
+    class MockAsyncRedisPipeline:
+        async def __aenter__(self):
+            return MockAsyncRedisPipeline()
+
+        async def __aexit__(self, type, value, traceback):
+            pass
+
+        def hgetall(self, name: str):
+            requested_ids.append(name)
+
+        async def execute(self):
+            return [
+                {"title": f"title_{id}", "body": "test_body", "tags": "redis"}
+                for id in requested_ids
+            ]
+
+    monkeypatch.setattr(redis.asyncio.Redis, "pipeline", MockAsyncRedisPipeline)
+
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    # Mocking MGET of posts still stored as hashes
+    async def mock_mget(keys: list[str]):
+        return [None] * len(keys)
+
+    monkeypatch.setattr(redis.asyncio.Redis, "mget", mock_mget)
+
+    search_service = PostVectorSearch()
+    set_stage_policies(search_service)
+    search_service._async_redis_client = redis.asyncio.Redis
+    search_service._async_binary_redis_client = redis.asyncio.Redis
+    search_service._embedding_cache = EmbeddingCache(max_size=8, ttl=60)
+    search_service._embedding_cache.set("cached", [9.0])
+    search_service._batch_max_size = 32
+
+    # Mocking the non-blocking embedding and vector search calls
+    predicted_texts = []
+
+    async def mock_encode_async(texts: list[str]):
+        predicted_texts.extend(texts)
+        return [[float(i)] for i, _ in enumerate(texts)]
+
+    async def mock_match_async(queries: list[list[float]], num_neighbors: int):
+        return [
+            [MatchNeighbor(id=str(int(query[0]) + i), distance=0.5) for i in range(3)]
+            for query in queries
+        ]
+
+    search_service._encode_async = mock_encode_async
+    search_service._match_async = mock_match_async
+
+    # Testing the search_batch_async method
+    results, stage_latency = asyncio.run(
+        search_service.search_batch_async(
+            texts=["first", "cached", "second"], num_neighbors=[2, 1, 3]
+        )
+    )
+
+    assert predicted_texts == ["first", "second"]
+    assert requested_ids == ["0", "1", "9", "2", "3"]
+    assert [[match.id for match in matches] for matches in results] == [
+        ["0", "1"],
+        ["9"],
+        ["1", "2", "3"],
+    ]
+    assert results[2][0].post.title == "title_1"
+    assert set(stage_latency) == {"embed", "match", "fetch"}
+
+
+def test_search_batch_json_async_uses_batch_deadline(monkeypatch: pytest.MonkeyPatch):
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    search_service = PostVectorSearch()
+    set_stage_policies(search_service)
+
+    # Mocking the batched search, recording the time left to its stages
+    remaining = []
+
+    async def mock_search_batch_posts_async(texts: list[str], num_neighbors: list[int]):
+        remaining.append(remaining_time())
+        return [[] for _ in texts], {}, {"embed": 0.0, "match": 0.0, "fetch": 0.0}
+
+    search_service._search_batch_posts_async = mock_search_batch_posts_async
+
+    asyncio.run(search_service.search_batch_json_async(["a", "b"], [1, 1]))
+
+    # a batch gets the batch deadline, not the deadline of a single search
+    assert search_service._request_timeout < remaining[0] <= 30.0
+
+
+def test_stream_posts_async_fetches_in_chunks(monkeypatch: pytest.MonkeyPatch):
+    # Mocking MGET and recording the keys of each round trip
+    requested_chunks = []
+
+    async def mock_mget(keys: list[str]):
+        requested_chunks.append(keys)
+        return [encode_post(f"title_{key}", "body", ["redis"]) for key in keys]
+
+    monkeypatch.setattr(redis.asyncio.Redis, "mget", mock_mget)
+
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    search_service = PostVectorSearch()
+    set_stage_policies(search_service)
+    search_service._async_binary_redis_client = redis.asyncio.Redis
+
+    match_neighbors = [MatchNeighbor(id=str(i), distance=0.5) for i in range(5)]
+
+    async def collect():
+        return [
+            chunk
+            async for chunk in search_service.stream_posts_async(
+                match_neighbors, chunk_size=2
+            )
+        ]
+
+    chunks = asyncio.run(collect())
+
+    assert requested_chunks == [["0", "1"], ["2", "3"], ["4"]]
+    assert [[match["id"] for match in chunk] for chunk in chunks] == [
+        ["0", "1"],
+        ["2", "3"],
+        ["4"],
+    ]
+    assert chunks[2][0]["post"] == {
+        "title": "title_4",
+        "body": "body",
+        "tags": ["redis"],
+    }
+
+
+class FakeAsyncBinaryRedis:
+    """In memory stand in for the string commands used by paginated search."""
+
+    def __init__(self):
+        self.values = {}
+        self.commands = []
+
+    async def set(self, key, value, ex=None):
+        self.commands.append("set")
+        self.values[key] = value
+
+    async def mget(self, keys):
+        self.commands.append("mget")
+        return [self.values.get(key) for key in keys]
+
+    def pipeline(self, transaction=True):
+        return FakeAsyncPipeline(self)
+
+
+class FakeAsyncPipeline:
+    def __init__(self, client: FakeAsyncBinaryRedis):
+        self._client = client
+        self._results = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return None
+
+    def getrange(self, key, start, end):
+        self._results.append(self._client.values.get(key, b"")[start : end + 1])
+
+    def strlen(self, key):
+        self._results.append(len(self._client.values.get(key, b"")))
+
+    async def execute(self):
+        self._client.commands.append("pipeline")
+        return self._results
+
+
+def test_search_pages_reuse_stored_neighbors(monkeypatch: pytest.MonkeyPatch):
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    search_service = PostVectorSearch()
+    set_stage_policies(search_service)
+    search_service._page_num_neighbors = 5
+    search_service._page_cursor_ttl = 60
+    search_service._async_binary_redis_client = FakeAsyncBinaryRedis()
+    for i in range(5):
+        search_service._async_binary_redis_client.values[str(i)] = encode_post(
+            f"title_{i}", "body", ["redis"]
+        )
+
+    find_match_calls = []
+
+    async def mock_find_match_async(text: str, num_neighbors: int, batched: bool):
+        find_match_calls.append((num_neighbors, batched))
+        return [MatchNeighbor(id=str(i), distance=i / 4) for i in range(5)]
+
+    search_service.find_match_async = mock_find_match_async
+
+    first_page = json.loads(asyncio.run(search_service.search_page_async("query", 2)))
+    second_page = json.loads(
+        asyncio.run(search_service.next_page_async(first_page["next_cursor"], 2))
+    )
+    last_page = json.loads(
+        asyncio.run(search_service.next_page_async(second_page["next_cursor"], 2))
+    )
+
+    # the neighbor list is searched outside the micro-batches
+    assert find_match_calls == [(5, False)]
+    assert [match["id"] for match in first_page["matches"]] == ["0", "1"]
+    assert [match["id"] for match in second_page["matches"]] == ["2", "3"]
+    assert [match["id"] for match in last_page["matches"]] == ["4"]
+    assert last_page["matches"][0]["post"]["title"] == "title_4"
+    assert last_page["matches"][0]["distance"] == 1.0
+    assert last_page["next_cursor"] is None
+
+    # Expired neighbor list
+    search_service._async_binary_redis_client.values.clear()
+    assert (
+        asyncio.run(search_service.next_page_async(first_page["next_cursor"], 2))
+        is None
+    )
+
+
+def test_search_async_retries_only_the_failed_stage(monkeypatch: pytest.MonkeyPatch):
+    # Mocking MGET failing once with a transient redis error
+    mget_calls = []
+
+    async def mock_mget(keys: list[str]):
+        mget_calls.append(keys)
+        if len(mget_calls) == 1:
+            raise redis.exceptions.ConnectionError("connection reset")
+        return [encode_post(f"title_{key}", "body", ["redis"]) for key in keys]
+
+    monkeypatch.setattr(redis.asyncio.Redis, "mget", mock_mget)
+
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    search_service = PostVectorSearch()
+    set_stage_policies(search_service)
+    search_service._async_binary_redis_client = redis.asyncio.Redis
+
+    find_match_calls = []
+
+    async def mock_find_match_async(text: str, num_neighbors: int):
+        find_match_calls.append(text)
+        return [MatchNeighbor(id="1", distance=0.5)]
+
+    search_service.find_match_async = mock_find_match_async
+
+    result = json.loads(asyncio.run(search_service.search_json_async("query", 1)))
+
+    assert find_match_calls == ["query"]
+    assert len(mget_calls) == 2
+    assert result["matches"][0]["post"]["title"] == "title_1"
+
+
+def test_warm_up_async_skips_failed_searches(monkeypatch: pytest.MonkeyPatch):
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    search_service = PostVectorSearch()
+    searches = []
+
+    async def mock_search_result_async(text: str, num_neighbors: int):
+        searches.append((text, num_neighbors))
+        if text == "bad":
+            raise redis.exceptions.ConnectionError("connection refused")
+        return b"{}"
+
+    search_service.search_result_async = mock_search_result_async
+
+    num_searched = asyncio.run(
+        search_service.warm_up_async(["first", "bad", "last"], num_neighbors=40)
+    )
+
+    assert num_searched == 2
+    assert searches == [("first", 40), ("bad", 40), ("last", 40)]
+
+
+def test_search_result_async_answers_precomputed_results(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    search_service = PostVectorSearch()
+    set_stage_policies(search_service)
+    search_service._index = NumpyIndex([], np.empty((0, 1)))
+    search_service._result_cache = ResultCache(max_size=8, ttl=60)
+    search_service._precomputed_results = PrecomputedResults()
+    search_service._index_version = "v1"
+
+    # Mocking the batched search of the suggestions, failing the second batch
+    batches = []
+
+    async def mock_search_batch_posts_async(texts: list[str], num_neighbors: list[int]):
+        batches.append(texts)
+        if "bad" in texts:
+            raise redis.exceptions.ResponseError("unknown command")
+        match_neighbors = [[MatchNeighbor(id=text, distance=0.8)] for text in texts]
+        posts = {text: {"title": text, "body": "body", "tags": []} for text in texts}
+        return match_neighbors, posts, {}
+
+    search_service._search_batch_posts_async = mock_search_batch_posts_async
+
+    searches = []
+
+    async def mock_search_json_async(text: str, num_neighbors: int):
+        searches.append(text)
+        return b"{}"
+
+    search_service.search_json_async = mock_search_json_async
+
+    # Testing the precompute_results_async method
+    num_results = asyncio.run(
+        search_service.precompute_results_async(
+            ["What is Redis?", "first", "bad", "last"], num_neighbors=40, batch_size=2
+        )
+    )
+
+    assert num_results == 2
+    assert batches == [["What is Redis?", "first"], ["bad", "last"]]
+    assert search_service.precomputed_results.version == "v1"
+
+    # Testing the search_result_async method
+    result = asyncio.run(search_service.search_result_async("what is redis? ", 40))
+
+    assert json.loads(result)["matches"][0]["id"] == "What is Redis?"
+    assert searches == []
+
+    # Other numbers of neighbors, other questions and new index versions are searched
+    asyncio.run(search_service.search_result_async("What is Redis?", 10))
+    asyncio.run(search_service.search_result_async("last", 40))
+    search_service._index_version = "v2"
+    asyncio.run(search_service.search_result_async("What is Redis?", 40))
+
+    assert searches == ["What is Redis?", "last", "What is Redis?"]
+    assert search_service.precomputed_results.stats() == {
+        "size": 2,
+        "hits": 1,
+        "misses": 3,
+    }
+
+
+def test_get_batch_embeddings_async_encodes_misses_in_chunks(
+    monkeypatch: pytest.MonkeyPatch,
+):
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    search_service = PostVectorSearch()
+    set_stage_policies(search_service)
+    search_service._embedding_cache = EmbeddingCache(max_size=8, ttl=60)
+    search_service._embedding_cache.set("cached", [9.0])
+    search_service._batch_max_size = 2
+
+    # Mocking the embedding call
+    encoded = []
+
+    async def mock_encode_async(texts: list[str]):
+        encoded.append(texts)
+        return [[float(len(text))] for text in texts]
+
+    search_service._encode_async = mock_encode_async
+
+    # Testing the _get_batch_embeddings_async method
+    texts = ["a", "cached", "bb", "ccc", "dddd", "eeeee"]
+    embeddings = asyncio.run(search_service._get_batch_embeddings_async(texts))
+
+    assert embeddings == [[1.0], [9.0], [2.0], [3.0], [4.0], [5.0]]
+    assert encoded == [["a", "bb"], ["ccc", "dddd"], ["eeeee"]]
+    assert search_service.embedding_cache.get("dddd") == [4.0]
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from app.search.index import NumpyIndex
+from app.search.store import EmbeddingStore, StoreIndex, write_embedding_store
+
+
+@pytest.fixture
+def embeddings() -> np.ndarray:
+    rng = np.random.default_rng(42)
+    embeddings = rng.normal(size=(300, 16)).astype(np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8", "float32"])
+def test_store_roundtrip(tmp_path, embeddings: np.ndarray, dtype: str):
+    ids = [str(i + 1000) for i in range(len(embeddings))]
+    path = str(tmp_path / "embeddings.emb")
+    write_embedding_store(path, ids, embeddings, dtype=dtype)
+
+    store = EmbeddingStore(path)
+
+    assert len(store) == 300
+    assert store.dimensions == 16
+    assert store.matrix.dtype == np.dtype(dtype)
+    assert store.ids[:2].tolist() == [1000, 1001]
+    np.testing.assert_allclose(store.get(np.arange(300)), embeddings, atol=1e-2)
+    np.testing.assert_allclose(
+        store.dot(embeddings[:2]), embeddings[:2] @ embeddings.T, atol=2e-2
+    )
+
+
+def test_store_index_matches_exact_search(
+    tmp_path, monkeypatch: pytest.MonkeyPatch, embeddings: np.ndarray
+):
+    ids = [str(i + 1000) for i in range(len(embeddings))]
+    path = str(tmp_path / "embeddings.emb")
+    write_embedding_store(path, ids, embeddings, dtype="float16")
+
+    # score in several chunks to exercise merging chunk winners
+    monkeypatch.setattr("app.search.store._SCORE_CHUNK_SIZE", 64)
+    matches = StoreIndex.open(path).match(embeddings[:5].tolist(), num_neighbors=10)
+
+    exact = NumpyIndex(ids, embeddings).match(embeddings[:5].tolist(), 10)
+    assert [query[0].id for query in matches] == ids[:5]
+    assert [len(query) for query in matches] == [10] * 5
+    recall = np.mean(
+        [
+            len({m.id for m in a} & {m.id for m in b}) / 10
+            for a, b in zip(matches, exact)
+        ]
+    )
+    assert recall > 0.9
+
+
+def test_store_rejects_other_files(tmp_path):
+    path = tmp_path / "embeddings.json"
+    path.write_bytes(b"{}" * 64)
+
+    with pytest.raises(ValueError):
+        EmbeddingStore(str(path))
@@ -0,0 +1,47 @@
+import asyncio
+
+from prometheus_client import REGISTRY
+from app.search.timing import rounded, server_timing, stage_timings, timed
+
+
+def test_stage_timings_accumulate_across_tasks():
+    async def fetch_chunk():
+        with timed("fetch"):
+            await asyncio.sleep(0.01)
+
+    async def search():
+        with stage_timings() as timings:
+            with timed("embed"):
+                await asyncio.sleep(0.01)
+            # nested recorders and tasks share the request's timings
+            with stage_timings():
+                await asyncio.gather(fetch_chunk(), fetch_chunk())
+        return timings
+
+    timings = asyncio.run(search())
+
+    assert list(timings) == ["embed", "fetch"]
+    assert timings["embed"] >= 10
+    assert timings["fetch"] >= 20
+
+
+def test_timed_without_recorder_observes_stage_metric():
+    def num_observations():
+        return REGISTRY.get_sample_value(
+            "search_stage_duration_seconds_count", {"stage": "serialize"}
+        )
+
+    before = num_observations() or 0
+
+    with timed("serialize"):
+        pass
+
+    assert num_observations() == before + 1
+
+
+def test_server_timing_header():
+    timings = {"embed": 1.234, "match": 5.0}
+
+    assert rounded(timings) == {"embed": 1.23, "match": 5.0}
+    assert server_timing(timings) == "embed;dur=1.23, match;dur=5.00"
+    assert server_timing(timings, total=7.5).endswith(", total;dur=7.50")
@@ -0,0 +1,78 @@
+import asyncio
+import pytest
+
+from google.cloud.aiplatform.matching_engine.matching_engine_index_endpoint import (
+    MatchNeighbor,
+)
+from opentelemetry import trace
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import (
+    InMemorySpanExporter,
+)
+from app.search.batching import MicroBatcher
+from app.search.cache import EmbeddingCache
+from app.search.records import encode_post
+from app.search.retry import RetryPolicy
+from app.search.service import PostVectorSearch
+import redis.asyncio
+
+
+@pytest.fixture(scope="module")
+def span_exporter() -> InMemorySpanExporter:
+    # The tracer provider can only be set once per process
+    exporter = InMemorySpanExporter()
+    provider = TracerProvider()
+    provider.add_span_processor(SimpleSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+    return exporter
+
+
+def test_search_spans_split_embed_match_and_fetch(
+    monkeypatch: pytest.MonkeyPatch, span_exporter: InMemorySpanExporter
+):
+    async def mock_mget(keys: list[str]):
+        return [encode_post(f"title_{key}", "body", ["redis"]) for key in keys]
+
+    monkeypatch.setattr(redis.asyncio.Redis, "mget", mock_mget)
+
+    # Mocking the constructor and setting up mock objects
+    def mock_constructor(*args, **kwargs):
+        return None
+
+    monkeypatch.setattr(PostVectorSearch, "__init__", mock_constructor)
+
+    search_service = PostVectorSearch()
+    search_service._request_timeout = 5.0
+    search_service._embed_retry = RetryPolicy("embed")
+    search_service._match_retry = RetryPolicy("match")
+    search_service._fetch_retry = RetryPolicy("fetch")
+    search_service._embedding_cache = EmbeddingCache(max_size=1, ttl=60)
+    search_service._async_binary_redis_client = redis.asyncio.Redis
+
+    async def mock_encode_async(texts: list[str]):
+        return [[0.1] * 8]
+
+    async def mock_match_async(queries: list[list[float]], num_neighbors: int):
+        return [[MatchNeighbor(id=str(i), distance=0.5) for i in range(3)]]
+
+    search_service._match_async = mock_match_async
+    search_service._embed_batcher = MicroBatcher(
+        mock_encode_async, max_batch_size=1, max_wait=0
+    )
+    search_service._match_batcher = MicroBatcher(
+        search_service._match_batch_async, max_batch_size=1, max_wait=0
+    )
+
+    span_exporter.clear()
+    asyncio.run(search_service.search_json_async("query", 3))
+
+    spans = {span.name: span for span in span_exporter.get_finished_spans()}
+    assert set(spans) == {"find_match", "embed", "match", "get_posts_from_matches"}
+    assert spans["embed"].parent.span_id == spans["find_match"].context.span_id
+    assert spans["match"].parent.span_id == spans["find_match"].context.span_id
+    assert spans["find_match"].attributes["num_neighbors"] == 3
+    assert spans["embed"].attributes["embedding.dimension"] == 8
+    assert spans["match"].attributes["num_matches"] == 3
+    assert spans["get_posts_from_matches"].attributes["num_posts"] == 3
+    assert spans["get_posts_from_matches"].attributes["redis.commands"] == 1
@@ -3,3 +3,7 @@ from tfx.types.artifact import Artifact
 
 class FeatureVector(Artifact):
     TYPE_NAME = "artifacts.FeatureVector"
+
+
+class EmbeddingProjection(Artifact):
+    TYPE_NAME = "artifacts.EmbeddingProjection"
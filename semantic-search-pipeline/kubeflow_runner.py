@@ -38,6 +38,9 @@ def run() -> str:
             model_uri=config.INFERRER_MODEL_GCS_DIR,
             update_index=RuntimeParameter(name="update_index", ptype=str, default=""),
             schema_path=config.SCHEMA_PATH,
+            embedding_store_dtype=config.EMBEDDING_STORE_DTYPE,
+            projection_dimensions=config.PROJECTION_DIMENSIONS,
+            projection_method=config.PROJECTION_METHOD,
             example_gen_beam_args=config.EXAMPLE_GEN_BEAM_ARGS,
             bulk_inferrer_beam_args=config.BULK_INFERRER_BEAM_ARGS,
             matching_engine_indexer_beam_args=config.MATCHING_ENGINE_INDEXER_BEAM_ARGS,
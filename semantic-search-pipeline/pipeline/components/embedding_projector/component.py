@@ -0,0 +1,56 @@
+"""EmbeddingProjector component."""
+
+from typing import Optional
+
+from tfx import types
+from tfx.dsl.components.base import base_component
+from tfx.dsl.components.base import executor_spec
+
+from pipeline.components.embedding_projector import executor, component_spec
+
+
+class EmbeddingProjector(base_component.BaseComponent):
+    """A component fitting a projection reducing the dimension of embeddings.
+
+    Component fits PCA or a random orthogonal projection on a sample of the
+    embeddings of the inference results PredictionLog proto from BulkInferrer.
+    MatchingEngineIndexer applies the projection before writing feature vectors,
+    and the serving backend applies it to query embeddings.
+
+    Component `outputs` contains:
+    - `projection`: Channel of type `EmbeddingProjection` holding `projection.npy`,
+                    the (dimensions, reduced dimensions) float32 projection matrix,
+                    and `report.json`, the recall lost to the reduction.
+    """
+
+    SPEC_CLASS = component_spec.EmbeddingProjectorComponentSpec
+    EXECUTOR_SPEC = executor_spec.ExecutorClassSpec(executor.Executor)
+
+    def __init__(
+        self,
+        inference_result: types.Channel,
+        dimensions: int,
+        method: Optional[str] = None,
+        sample_size: Optional[int] = None,
+    ):
+        """Construct an EmbeddingProjector component.
+
+        Args:
+        inference_result: A Channel of type `standard_artifacts.InferenceResult`, usually
+            produced by an BulkInferrer component. _required_
+        dimensions: Dimension of the projected embeddings, e.g. 128 or 192.
+        method: "pca" projects on the top principal directions, "random" on a random
+            orthogonal basis. Defaults to "pca".
+        sample_size: Number of embeddings the projection is fitted and evaluated on.
+            Defaults to 100000.
+        """
+        projection = types.Channel(type=component_spec.EmbeddingProjection)
+
+        spec = component_spec.EmbeddingProjectorComponentSpec(
+            inference_result=inference_result,
+            dimensions=dimensions,
+            method=method,
+            sample_size=sample_size,
+            projection=projection,
+        )
+        super().__init__(spec=spec)
@@ -0,0 +1,27 @@
+from tfx.types.component_spec import ChannelParameter
+from tfx.types.component_spec import ExecutionParameter
+from tfx.types import standard_artifacts
+from tfx import types
+
+from artifacts import EmbeddingProjection
+
+
+INFERENCE_RESULT_KEY = "inference_result"
+PROJECTION_KEY = "projection"
+DIMENSIONS_KEY = "dimensions"
+METHOD_KEY = "method"
+SAMPLE_SIZE_KEY = "sample_size"
+
+
+class EmbeddingProjectorComponentSpec(types.ComponentSpec):
+    """ComponentSpec for EmbeddingProjector."""
+
+    PARAMETERS = {
+        DIMENSIONS_KEY: ExecutionParameter(type=int),
+        METHOD_KEY: ExecutionParameter(type=str, optional=True),
+        SAMPLE_SIZE_KEY: ExecutionParameter(type=int, optional=True),
+    }
+    INPUTS = {
+        INFERENCE_RESULT_KEY: ChannelParameter(type=standard_artifacts.InferenceResult)
+    }
+    OUTPUTS = {PROJECTION_KEY: ChannelParameter(type=EmbeddingProjection)}
@@ -0,0 +1,28 @@
+"""Tests for pipeline.components.EmbeddingProjector.component."""
+
+import tensorflow as tf
+
+from pipeline.components.embedding_projector import component, component_spec
+from tfx.types import channel_utils
+from tfx.types import standard_artifacts
+
+
+class ComponentTest(tf.test.TestCase):
+    def setUp(self):
+        super().setUp()
+        self._inference_result = channel_utils.as_channel(
+            [standard_artifacts.InferenceResult()]
+        )
+
+    def testConstruct(self):
+        projector = component.EmbeddingProjector(
+            inference_result=self._inference_result, dimensions=128
+        )
+        self.assertEqual(
+            component_spec.EmbeddingProjection.TYPE_NAME,
+            projector.outputs[component_spec.PROJECTION_KEY].type_name,
+        )
+
+
+if __name__ == "__main__":
+    tf.test.main()
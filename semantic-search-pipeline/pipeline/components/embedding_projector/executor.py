@@ -0,0 +1,206 @@
+"""EmbeddingProjector executor."""
+
+import json
+import os
+from typing import Any, Dict, List, Tuple
+
+from absl import logging
+import numpy as np
+import tensorflow as tf
+from tfx import types
+from tfx.dsl.components.base import base_executor
+from tfx.types import artifact_utils
+from tensorflow_serving.apis import prediction_log_pb2
+
+from pipeline.components.embedding_projector import component_spec
+
+
+PROJECTION_FILE_NAME = "projection.npy"
+REPORT_FILE_NAME = "report.json"
+
+_DEFAULT_METHOD = "pca"
+_DEFAULT_SAMPLE_SIZE = 100000
+_NUM_EVALUATION_QUERIES = 1000
+_NUM_NEIGHBORS = 40
+_SEED = 0
+
+
+def read_embedding_sample(inference_result_uri: str, sample_size: int) -> np.ndarray:
+    """Read up to sample_size embeddings from PredictionLog files.
+
+    Files are read in a shuffled order so the sample is not biased to the
+    first shards written by BulkInferrer.
+
+    Args:
+        inference_result_uri: Directory of the gzipped PredictionLog TFRecords.
+        sample_size: Max number of embeddings read.
+
+    Returns:
+        float32 embedding matrix with one embedding per row.
+    """
+    paths = tf.io.gfile.glob(os.path.join(inference_result_uri, "*.gz"))
+    np.random.default_rng(_SEED).shuffle(paths)
+
+    embeddings = []
+    num_embeddings = 0
+    for record in tf.data.TFRecordDataset(paths, compression_type="GZIP"):
+        prediction_log = prediction_log_pb2.PredictionLog.FromString(record.numpy())
+        batch = tf.make_ndarray(
+            prediction_log.predict_log.response.outputs["embedding"]
+        )
+        embeddings.append(batch)
+        num_embeddings += len(batch)
+        if num_embeddings >= sample_size:
+            break
+
+    return np.concatenate(embeddings).astype(np.float32)[:sample_size]
+
+
+def fit_projection(embeddings: np.ndarray, dimensions: int, method: str) -> np.ndarray:
+    """Fit a projection from the embedding dimension to dimensions.
+
+    PCA is uncentered, the principal directions of the second moment matrix, so
+    dot products of projected embeddings approximate the original dot products.
+
+    Args:
+        embeddings: Sample embedding matrix with one embedding per row.
+        dimensions: Dimension of the projected embeddings.
+        method: "pca" or "random".
+
+    Returns:
+        float32 projection matrix of shape (embedding dimension, dimensions)
+        with orthonormal columns.
+    """
+    if dimensions >= embeddings.shape[1]:
+        raise ValueError(
+            f"Cannot reduce {embeddings.shape[1]} dimensions to {dimensions}"
+        )
+
+    if method == "pca":
+        second_moment = embeddings.T.astype(np.float64) @ embeddings / len(embeddings)
+        _, eigenvectors = np.linalg.eigh(second_moment)
+        # eigh sorts eigenvalues ascending
+        projection = eigenvectors[:, ::-1][:, :dimensions]
+    elif method == "random":
+        rng = np.random.default_rng(_SEED)
+        projection, _ = np.linalg.qr(rng.normal(size=(embeddings.shape[1], dimensions)))
+    else:
+        raise ValueError(f"Unknown projection method {method}, expected pca or random")
+
+    return projection.astype(np.float32)
+
+
+def split_sample(embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Hold out evaluation queries from the sample before fitting.
+
+    Args:
+        embeddings: Sample embedding matrix with one embedding per row.
+
+    Returns:
+        Held out query rows, and the corpus rows the projection is fitted on.
+    """
+    num_queries = min(_NUM_EVALUATION_QUERIES, len(embeddings) // 2)
+    return embeddings[:num_queries], embeddings[num_queries:]
+
+
+def evaluate_projection(
+    queries: np.ndarray, corpus: np.ndarray, projection: np.ndarray
+) -> Dict[str, float]:
+    """Measure the exact search recall lost by searching projected embeddings.
+
+    Queries must be held out of the rows the projection was fitted on, so the
+    report is not flattered by rows the projection has already seen.
+
+    Args:
+        queries: Held out query embeddings, one per row.
+        corpus: Searched embeddings, one per row.
+        projection: Projection matrix fitted on corpus.
+
+    Returns:
+        Recall@40 of projected search against full dimension search, and the
+        fraction of the held out queries' energy kept by the projection.
+    """
+    num_neighbors = min(_NUM_NEIGHBORS, len(corpus))
+
+    def top_neighbors(queries: np.ndarray, corpus: np.ndarray) -> np.ndarray:
+        scores = queries @ corpus.T
+        return np.argpartition(-scores, num_neighbors - 1, axis=1)[:, :num_neighbors]
+
+    exact = top_neighbors(queries, corpus)
+    projected = top_neighbors(queries @ projection, corpus @ projection)
+    recall = np.mean(
+        [len(set(a) & set(b)) / num_neighbors for a, b in zip(exact, projected)]
+    )
+
+    return {
+        f"recall@{num_neighbors}": float(recall),
+        "energy_kept": float(
+            np.square(queries @ projection).sum() / np.square(queries).sum()
+        ),
+        "input_dimensions": int(projection.shape[0]),
+        "dimensions": int(projection.shape[1]),
+        "sample_size": int(len(queries) + len(corpus)),
+        "num_queries": int(len(queries)),
+    }
+
+
+class Executor(base_executor.BaseExecutor):
+    """EmbeddingProjector executor fitting a dimension reducing projection."""
+
+    def Do(
+        self,
+        input_dict: Dict[str, List[types.Artifact]],
+        output_dict: Dict[str, List[types.Artifact]],
+        exec_properties: Dict[str, Any],
+    ) -> None:
+        """Fits the projection on a sample of the inference results.
+
+        Args:
+          input_dict: Input dict from input key to a list of Artifacts.
+            - inference_result: bulk inference results.
+          output_dict: Output dict from output key to a list of Artifacts.
+            - projection: fitted projection matrix and its recall report.
+          exec_properties: A dict of execution properties.
+            - dimensions: dimension of the projected embeddings.
+            - method: "pca" or "random".
+            - sample_size: number of embeddings read, split into held out
+              evaluation queries and the corpus the projection is fitted on.
+
+        Returns:
+          None
+        """
+        self._log_startup(input_dict, output_dict, exec_properties)
+
+        inference_result_uri = artifact_utils.get_single_uri(
+            input_dict[component_spec.INFERENCE_RESULT_KEY]
+        )
+        projection_artifact = artifact_utils.get_single_instance(
+            output_dict[component_spec.PROJECTION_KEY]
+        )
+
+        dimensions = exec_properties[component_spec.DIMENSIONS_KEY]
+        method = exec_properties.get(component_spec.METHOD_KEY) or _DEFAULT_METHOD
+        sample_size = (
+            exec_properties.get(component_spec.SAMPLE_SIZE_KEY) or _DEFAULT_SAMPLE_SIZE
+        )
+
+        embeddings = read_embedding_sample(inference_result_uri, sample_size)
+        queries, corpus = split_sample(embeddings)
+        logging.info(
+            f"Fitting {method} projection on {len(corpus)} embeddings, "
+            f"evaluating on {len(queries)} held out queries"
+        )
+        projection = fit_projection(corpus, dimensions, method)
+        report = evaluate_projection(queries, corpus, projection)
+        report["method"] = method
+        logging.info(f"Projection report {report}")
+
+        tf.io.gfile.makedirs(projection_artifact.uri)
+        with tf.io.gfile.GFile(
+            os.path.join(projection_artifact.uri, PROJECTION_FILE_NAME), "wb"
+        ) as f:
+            np.save(f, projection)
+        with tf.io.gfile.GFile(
+            os.path.join(projection_artifact.uri, REPORT_FILE_NAME), "w"
+        ) as f:
+            f.write(json.dumps(report, indent=2))
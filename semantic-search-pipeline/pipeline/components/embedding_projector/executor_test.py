@@ -0,0 +1,179 @@
+"""Tests for pipeline.components.EmbeddingProjector.executor"""
+import json
+import os
+
+import numpy as np
+import tensorflow as tf
+from tfx.types import standard_artifacts
+from tfx.dsl.io import fileio
+from tensorflow_serving.apis import prediction_log_pb2
+
+from pipeline.components.embedding_projector import executor, component_spec
+
+_TEST_COMPONENT_ID = "test_component"
+_TEST_INFERENCE_RESULT_FOLDER = "inference_result"
+_TEST_PROJECTION_FOLDER = "projection"
+_NUM_EMBEDDINGS = 300
+_NUM_DIMENSIONS = 16
+_NUM_COMPONENTS = 4
+_NUM_SHARDS = 2
+_BATCH_SIZE = 50
+
+
+def synthetic_embeddings() -> np.ndarray:
+    """Embeddings close to a subspace of _NUM_COMPONENTS dimensions."""
+    rng = np.random.default_rng(0)
+    basis = rng.normal(size=(_NUM_COMPONENTS, _NUM_DIMENSIONS))
+    embeddings = rng.normal(size=(_NUM_EMBEDDINGS, _NUM_COMPONENTS)) @ basis
+    embeddings += 0.01 * rng.normal(size=embeddings.shape)
+    return embeddings.astype(np.float32)
+
+
+def write_inference_result(uri: str, embeddings: np.ndarray) -> None:
+    """Write embeddings as gzipped PredictionLog shards, like BulkInferrer."""
+    fileio.makedirs(uri)
+    ids = np.arange(len(embeddings), dtype=np.int64)
+    options = tf.io.TFRecordOptions(compression_type="GZIP")
+    for shard, (shard_ids, shard_embeddings) in enumerate(
+        zip(
+            np.array_split(ids, _NUM_SHARDS),
+            np.array_split(embeddings, _NUM_SHARDS),
+        )
+    ):
+        path = os.path.join(uri, f"prediction_logs-{shard:05d}-of-{_NUM_SHARDS:05d}.gz")
+        with tf.io.TFRecordWriter(path, options) as writer:
+            for start in range(0, len(shard_ids), _BATCH_SIZE):
+                prediction_log = prediction_log_pb2.PredictionLog()
+                outputs = prediction_log.predict_log.response.outputs
+                outputs["id"].CopyFrom(
+                    tf.make_tensor_proto(shard_ids[start : start + _BATCH_SIZE])
+                )
+                outputs["embedding"].CopyFrom(
+                    tf.make_tensor_proto(shard_embeddings[start : start + _BATCH_SIZE])
+                )
+                writer.write(prediction_log.SerializeToString())
+
+
+class ExecutorTest(tf.test.TestCase):
+    def setUp(self):
+        super().setUp()
+        self._output_data_dir = self.get_temp_dir()
+        self.component_id = _TEST_COMPONENT_ID
+        self._embeddings = synthetic_embeddings()
+
+        # Create input dict.
+        self._inference_result = standard_artifacts.InferenceResult()
+        self._inference_result.uri = os.path.join(
+            self._output_data_dir, _TEST_INFERENCE_RESULT_FOLDER
+        )
+        write_inference_result(self._inference_result.uri, self._embeddings)
+
+        self._input_dict = {
+            component_spec.INFERENCE_RESULT_KEY: [self._inference_result]
+        }
+
+        # Create output dict.
+        self._projection = component_spec.EmbeddingProjection()
+        self._projection.uri = os.path.join(
+            self._output_data_dir, _TEST_PROJECTION_FOLDER
+        )
+
+        self._output_dict = {component_spec.PROJECTION_KEY: [self._projection]}
+
+        # Create exe properties.
+        self._exec_properties = {
+            "component_id": self.component_id,
+            component_spec.DIMENSIONS_KEY: _NUM_COMPONENTS,
+        }
+
+        # Create context
+        self._tmp_dir = os.path.join(self._output_data_dir, ".temp")
+        self._context = executor.Executor.Context(tmp_dir=self._tmp_dir, unique_id="2")
+
+    def testReadEmbeddingSample(self):
+        sample = executor.read_embedding_sample(self._inference_result.uri, 120)
+
+        self.assertEqual(sample.shape, (120, _NUM_DIMENSIONS))
+        self.assertEqual(sample.dtype, np.float32)
+
+        sample = executor.read_embedding_sample(self._inference_result.uri, 1000)
+
+        self.assertEqual(sample.shape, (_NUM_EMBEDDINGS, _NUM_DIMENSIONS))
+
+    def testFitProjection(self):
+        for method in ("pca", "random"):
+            projection = executor.fit_projection(
+                self._embeddings, _NUM_COMPONENTS, method
+            )
+
+            self.assertEqual(projection.shape, (_NUM_DIMENSIONS, _NUM_COMPONENTS))
+            self.assertEqual(projection.dtype, np.float32)
+            # orthonormal columns
+            self.assertAllClose(
+                projection.T @ projection, np.eye(_NUM_COMPONENTS), atol=1e-5
+            )
+
+    def testFitProjectionRejectsInvalidArguments(self):
+        with self.assertRaises(ValueError):
+            executor.fit_projection(self._embeddings, _NUM_DIMENSIONS, "pca")
+        with self.assertRaises(ValueError):
+            executor.fit_projection(self._embeddings, _NUM_COMPONENTS, "svd")
+
+    def testSplitSample(self):
+        queries, corpus = executor.split_sample(self._embeddings)
+
+        self.assertEqual(len(queries), _NUM_EMBEDDINGS // 2)
+        self.assertEqual(len(queries) + len(corpus), _NUM_EMBEDDINGS)
+
+    def testEvaluateProjection(self):
+        queries, corpus = executor.split_sample(self._embeddings)
+
+        # the identity projection keeps every neighbor
+        identity_report = executor.evaluate_projection(
+            queries, corpus, np.eye(_NUM_DIMENSIONS, dtype=np.float32)
+        )
+
+        self.assertAllClose(identity_report["recall@40"], 1.0)
+        self.assertAllClose(identity_report["energy_kept"], 1.0)
+
+        # PCA fitted on the corpus recovers the subspace of the held out queries,
+        # a random projection does not
+        pca_report = executor.evaluate_projection(
+            queries,
+            corpus,
+            executor.fit_projection(corpus, _NUM_COMPONENTS, "pca"),
+        )
+        random_report = executor.evaluate_projection(
+            queries,
+            corpus,
+            executor.fit_projection(corpus, _NUM_COMPONENTS, "random"),
+        )
+
+        self.assertGreater(pca_report["recall@40"], 0.95)
+        self.assertGreater(pca_report["energy_kept"], 0.99)
+        self.assertGreater(pca_report["recall@40"], random_report["recall@40"])
+        self.assertEqual(pca_report["dimensions"], _NUM_COMPONENTS)
+        self.assertEqual(pca_report["sample_size"], _NUM_EMBEDDINGS)
+        self.assertEqual(pca_report["num_queries"], len(queries))
+
+    def testRun(self):
+        projector = executor.Executor(self._context)
+        projector.Do(self._input_dict, self._output_dict, self._exec_properties)
+
+        # Check outputs.
+        with fileio.open(
+            os.path.join(self._projection.uri, executor.PROJECTION_FILE_NAME), "rb"
+        ) as f:
+            projection = np.load(f)
+        with fileio.open(
+            os.path.join(self._projection.uri, executor.REPORT_FILE_NAME)
+        ) as f:
+            report = json.loads(f.read())
+
+        self.assertEqual(projection.shape, (_NUM_DIMENSIONS, _NUM_COMPONENTS))
+        self.assertEqual(report["method"], "pca")
+        self.assertGreater(report["recall@40"], 0.95)
+
+
+if __name__ == "__main__":
+    tf.test.main()
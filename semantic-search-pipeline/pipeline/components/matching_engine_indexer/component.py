@@ -29,6 +29,8 @@ class MatchingEngineIndexerComponent(base_beam_component.BaseBeamComponent):
         self,
         inference_result: types.Channel,
         update_index: Optional[Union[str, RuntimeParameter]],
+        embedding_store_dtype: Optional[str] = None,
+        projection: Optional[types.Channel] = None,
     ):
         """Construct an BulkInferrer component.
 
@@ -36,6 +38,12 @@ class MatchingEngineIndexerComponent(base_beam_component.BaseBeamComponent):
         inference_results: A Channel of type `standard_artifacts.InferenceResult`, usually
             produced by an BulkInferrer component. _required_
         update_index: Resource name for matching engine index (Ex: projects/106169385731/locations/asia-southeast1/indexes/38931507716292608)
+        embedding_store_dtype: Dtype of the binary embedding store written next to
+            the JSONL embeddings for in-process serving, "float16" or "int8".
+            No store is written when empty.
+        projection: An optional Channel of type `EmbeddingProjection` produced by an
+            EmbeddingProjector component. Embeddings are projected to its reduced
+            dimension before being written.
         custom_config: A dict which contains the deployment job parameters to be
             passed to Google Cloud Vertex AI.
             custom_config.ai_platform_serving_args need to contain the serving job
@@ -47,6 +55,8 @@ class MatchingEngineIndexerComponent(base_beam_component.BaseBeamComponent):
         spec = component_spec.MatchingEngineIndexerComponentSpec(
             inference_result=inference_result,
             update_index=update_index,
+            embedding_store_dtype=embedding_store_dtype,
+            projection=projection,
             feature_vector=feature_vector,
         )
         super().__init__(spec=spec)
@@ -3,21 +3,25 @@ from tfx.types.component_spec import ExecutionParameter
 from tfx.types import standard_artifacts
 from tfx import types
 
-from artifacts import FeatureVector
+from artifacts import EmbeddingProjection, FeatureVector
 
 
 INFERENCE_RESULT_KEY = "inference_result"
+PROJECTION_KEY = "projection"
 FEATURE_VECTOR_KEY = "feature_vector"
 MATCHING_ENGINE_INDEX_KEY = "update_index"
+EMBEDDING_STORE_DTYPE_KEY = "embedding_store_dtype"
 
 
 class MatchingEngineIndexerComponentSpec(types.ComponentSpec):
     """ComponentSpec for MatchingEngineIndexer."""
 
     PARAMETERS = {
-        MATCHING_ENGINE_INDEX_KEY: ExecutionParameter(type=str, optional=True)
+        MATCHING_ENGINE_INDEX_KEY: ExecutionParameter(type=str, optional=True),
+        EMBEDDING_STORE_DTYPE_KEY: ExecutionParameter(type=str, optional=True),
     }
     INPUTS = {
-        INFERENCE_RESULT_KEY: ChannelParameter(type=standard_artifacts.InferenceResult)
+        INFERENCE_RESULT_KEY: ChannelParameter(type=standard_artifacts.InferenceResult),
+        PROJECTION_KEY: ChannelParameter(type=EmbeddingProjection, optional=True),
     }
     OUTPUTS = {FEATURE_VECTOR_KEY: ChannelParameter(type=FeatureVector, optional=True)}
@@ -1,7 +1,8 @@
 """MatchingEngineIndexer executor for Vertex AI."""
 
 import os
-from typing import Any, Dict, List
+import struct
+from typing import Any, Dict, List, Optional
 
 from absl import logging
 import tensorflow as tf
@@ -14,26 +15,49 @@ import apache_beam as beam
 from tfx.dsl.components.base import base_beam_executor
 from tensorflow_serving.apis import prediction_log_pb2
 import json
+import numpy as np
 
 from google.cloud import aiplatform
 
+from pipeline.components.embedding_projector.executor import PROJECTION_FILE_NAME
 from pipeline.components.matching_engine_indexer import component_spec
 
 
 _EMBEDDINGS_FILE_NAME = "embeddings"
+_EMBEDDING_STORE_DIR = "embedding_store"
+_EMBEDDING_STORE_FILE_NAME = "embeddings.emb"
+
+# Binary embedding store layout read by the serving backend (semantic-search-be
+# app/search/store.py), every section starts on a 64 byte boundary:
+#   header: magic, format version, dtype code, row count, dimensions
+#   ids:    uint64[count] post ids
+#   scales: float32[count] per-vector scales, int8 stores only
+#   matrix: dtype[count, dimensions] row-major embeddings
+_STORE_MAGIC = b"SEMB"
+_STORE_FORMAT_VERSION = 1
+_STORE_HEADER = struct.Struct("<4sHHQI")
+_STORE_ALIGNMENT = 64
+_STORE_DTYPE_CODES = {"float16": 1, "int8": 2, "float32": 3}
+_INT8_MAX = 127
 
 
 @beam.typehints.with_input_types(str)
 @beam.typehints.with_output_types(beam.typehints.Iterable[str])
 class PredictionLogToJsonlFn(beam.DoFn):
     """Create serialized json containing id and embedding
-    from PredictionLog outputs"""
+    from PredictionLog outputs, optionally projected to a reduced dimension"""
+
+    def __init__(self, projection: Optional[np.ndarray] = None):
+        super().__init__()
+        self._projection = projection
 
     def process(self, element, *args, **kwargs):
         del args, kwargs
 
         ids = tf.make_ndarray(element.predict_log.response.outputs["id"])
         embeddings = tf.make_ndarray(element.predict_log.response.outputs["embedding"])
+        if self._projection is not None:
+            embeddings = embeddings @ self._projection
 
         for id, embedding in zip(ids, embeddings):
             feature_vector_json = json.dumps(
@@ -42,6 +66,84 @@ class PredictionLogToJsonlFn(beam.DoFn):
             yield feature_vector_json
 
 
+def _write_padded(file, data: bytes, position: int) -> int:
+    """Write data to a sequential file and pad it to the next store section."""
+    file.write(data)
+    position += len(data)
+    padding = -position % _STORE_ALIGNMENT
+    file.write(b"\0" * padding)
+    return position + padding
+
+
+def write_embedding_store(embeddings_uri: str, dtype: str) -> str:
+    """Convert the JSONL embedding shards to a binary embedding store.
+
+    Shards are read twice, once to count rows and once to fill the compact
+    matrix, so the full float32 matrix is never held in memory.
+
+    Args:
+        embeddings_uri: Directory holding the JSONL embedding shards.
+        dtype: Stored dtype, "float16", "int8" or "float32".
+
+    Returns:
+        Path of the written store.
+    """
+    if dtype not in _STORE_DTYPE_CODES:
+        raise ValueError(f"Unsupported embedding store dtype {dtype}")
+
+    paths = sorted(
+        tf.io.gfile.glob(os.path.join(embeddings_uri, _EMBEDDINGS_FILE_NAME + "*.json"))
+    )
+
+    def read_feature_vectors():
+        for path in paths:
+            with tf.io.gfile.GFile(path) as shard:
+                for line in shard:
+                    yield json.loads(line)
+
+    count = 0
+    dimensions = 0
+    for feature_vector in read_feature_vectors():
+        count += 1
+        dimensions = len(feature_vector["embedding"])
+
+    ids = np.empty(count, dtype="<u8")
+    scales = np.ones(count, dtype="<f4")
+    matrix = np.empty((count, dimensions), dtype=dtype)
+    for row, feature_vector in enumerate(read_feature_vectors()):
+        ids[row] = int(feature_vector["id"])
+        embedding = np.asarray(feature_vector["embedding"], dtype=np.float32)
+        if dtype == "int8":
+            scale = np.abs(embedding).max() / _INT8_MAX or 1.0
+            scales[row] = scale
+            embedding = np.rint(embedding / scale)
+        matrix[row] = embedding
+
+    store_path = os.path.join(
+        embeddings_uri, _EMBEDDING_STORE_DIR, _EMBEDDING_STORE_FILE_NAME
+    )
+    tf.io.gfile.makedirs(os.path.dirname(store_path))
+    with tf.io.gfile.GFile(store_path, "wb") as store:
+        position = _write_padded(
+            store,
+            _STORE_HEADER.pack(
+                _STORE_MAGIC,
+                _STORE_FORMAT_VERSION,
+                _STORE_DTYPE_CODES[dtype],
+                count,
+                dimensions,
+            ),
+            0,
+        )
+        position = _write_padded(store, ids.tobytes(), position)
+        if dtype == "int8":
+            position = _write_padded(store, scales.tobytes(), position)
+        store.write(np.ascontiguousarray(matrix).tobytes())
+
+    logging.info(f"Wrote {count} {dtype} embeddings to store {store_path}")
+    return store_path
+
+
 class Executor(base_beam_executor.BaseBeamExecutor):
     """MatchingEngineIndexer executor to create or update
     Matching Engine Index on Vertex AI."""
@@ -109,6 +211,17 @@ class Executor(base_beam_executor.BaseBeamExecutor):
             output_dict[component_spec.FEATURE_VECTOR_KEY]
         )
 
+        projection = None
+        if input_dict.get(component_spec.PROJECTION_KEY):
+            projection_uri = artifact_utils.get_single_uri(
+                input_dict[component_spec.PROJECTION_KEY]
+            )
+            with tf.io.gfile.GFile(
+                os.path.join(projection_uri, PROJECTION_FILE_NAME), "rb"
+            ) as f:
+                projection = np.load(f)
+            logging.info(f"Projecting embeddings to {projection.shape[1]} dimensions")
+
         logging.info("Executing beam pipeline")
 
         with self._make_beam_pipeline() as pipeline:
@@ -119,7 +232,7 @@ class Executor(base_beam_executor.BaseBeamExecutor):
                     prediction_log_path, coder=prediction_log_decoder
                 )
                 | "Create Serialized JSON id, embedding"
-                >> beam.ParDo(PredictionLogToJsonlFn())
+                >> beam.ParDo(PredictionLogToJsonlFn(projection))
                 | "Write JSON file to GCS"
                 >> beam.io.WriteToText(
                     file_path_prefix=os.path.join(
@@ -131,6 +244,14 @@ class Executor(base_beam_executor.BaseBeamExecutor):
 
         logging.info("Finished executing pipeline")
 
+        # the store goes in a subdirectory, matching engine only ingests files
+        # at the root of contents_delta_uri
+        embedding_store_dtype = exec_properties.get(
+            component_spec.EMBEDDING_STORE_DTYPE_KEY
+        )
+        if embedding_store_dtype:
+            write_embedding_store(feature_vector.uri, embedding_store_dtype)
+
         resource_name = exec_properties.get(component_spec.MATCHING_ENGINE_INDEX_KEY)
 
         if not resource_name:
@@ -1,11 +1,23 @@
 """Tests for for pipeline.components.MatchingEngineIndexer.executor"""
+import json
 import os
+import struct
 
+import numpy as np
 import tensorflow as tf
 from tfx.types import standard_artifacts
 from tfx.utils import io_utils
 from tfx.dsl.io import fileio
+from tensorflow_serving.apis import prediction_log_pb2
 
+from pipeline.components.embedding_projector.executor import (
+    PROJECTION_FILE_NAME,
+    fit_projection,
+)
+from pipeline.components.embedding_projector.executor_test import (
+    synthetic_embeddings,
+    write_inference_result,
+)
 from pipeline.components.matching_engine_indexer import executor, component_spec
 
 _TEST_SOURCE_FOLDER = "testdata"
@@ -13,6 +25,51 @@ _TEST_OUTPUT_FOLDER = "testoutput"
 _TEST_COMPONENT_ID = "test_component"
 _TEST_INFERENCE_RESULT_FOLDER = "inference_result"
 _TEST_FEATURE_VECTOR_FOLDER = "feature_vector"
+_TEST_PROJECTION_FOLDER = "projection"
+_PROJECTED_DIMENSIONS = 4
+
+# Embedding store layout read by the serving backend (app/search/store.py),
+# spelled out here rather than taken from the executor so a change to either
+# side fails the test
+_STORE_HEADER = struct.Struct("<4sHHQI")
+_STORE_ALIGNMENT = 64
+_STORE_DTYPES = {1: np.float16, 2: np.int8, 3: np.float32}
+
+
+def read_embedding_store(path: str):
+    """Read a binary embedding store the way the serving backend does.
+
+    Args:
+      path: Path of the store file.
+
+    Returns:
+      The post ids, the stored matrix and the dequantized embeddings.
+    """
+
+    def align(offset):
+        return -(-offset // _STORE_ALIGNMENT) * _STORE_ALIGNMENT
+
+    with fileio.open(path, "rb") as f:
+        data = f.read()
+    magic, version, dtype_code, count, dimensions = _STORE_HEADER.unpack_from(data)
+    if magic != b"SEMB" or version != 1:
+        raise ValueError(f"{path} is not a version 1 embedding store")
+    dtype = np.dtype(_STORE_DTYPES[dtype_code])
+
+    ids_offset = align(_STORE_HEADER.size)
+    ids = np.frombuffer(data, dtype="<u8", count=count, offset=ids_offset)
+    matrix_offset = align(ids_offset + count * 8)
+    scales = np.ones(count, dtype=np.float32)
+    if dtype == np.int8:
+        scales = np.frombuffer(data, dtype="<f4", count=count, offset=matrix_offset)
+        matrix_offset = align(matrix_offset + count * 4)
+    matrix = np.frombuffer(
+        data, dtype=dtype, count=count * dimensions, offset=matrix_offset
+    ).reshape(count, dimensions)
+    if matrix_offset + matrix.nbytes != len(data):
+        raise ValueError(f"{path} has an unexpected size")
+
+    return ids, matrix, matrix.astype(np.float32) * scales[:, None]
 
 
 class ExecutorTest(tf.test.TestCase):
@@ -70,6 +127,155 @@ class ExecutorTest(tf.test.TestCase):
             )
         )
 
+    def testRunWritesEmbeddingStore(self):
+        self._exec_properties[component_spec.EMBEDDING_STORE_DTYPE_KEY] = "int8"
+        indexer = executor.Executor(self._context)
+        indexer.Do(self._input_dict, self._output_dict_ir, self._exec_properties)
+
+        # Check outputs.
+        self.assertTrue(
+            fileio.exists(
+                os.path.join(
+                    self._feature_vector.uri, "embedding_store", "embeddings.emb"
+                )
+            )
+        )
+
+
+class ProjectionTest(tf.test.TestCase):
+    def setUp(self):
+        super().setUp()
+        self._output_data_dir = self.get_temp_dir()
+        self._embeddings = synthetic_embeddings()
+        self._projection_matrix = fit_projection(
+            self._embeddings, _PROJECTED_DIMENSIONS, "pca"
+        )
+
+        # Create input dict from synthetic inference result shards.
+        self._inference_result = standard_artifacts.InferenceResult()
+        self._inference_result.uri = os.path.join(
+            self._output_data_dir, _TEST_INFERENCE_RESULT_FOLDER
+        )
+        write_inference_result(self._inference_result.uri, self._embeddings)
+
+        self._projection = component_spec.EmbeddingProjection()
+        self._projection.uri = os.path.join(
+            self._output_data_dir, _TEST_PROJECTION_FOLDER
+        )
+        fileio.makedirs(self._projection.uri)
+        with fileio.open(
+            os.path.join(self._projection.uri, PROJECTION_FILE_NAME), "wb"
+        ) as f:
+            np.save(f, self._projection_matrix)
+
+        self._input_dict = {
+            component_spec.INFERENCE_RESULT_KEY: [self._inference_result],
+            component_spec.PROJECTION_KEY: [self._projection],
+        }
+
+        # Create output dict.
+        self._feature_vector = component_spec.FeatureVector()
+        self._feature_vector.uri = os.path.join(
+            self._output_data_dir, _TEST_FEATURE_VECTOR_FOLDER
+        )
+
+        self._output_dict = {component_spec.FEATURE_VECTOR_KEY: [self._feature_vector]}
+
+        # Create exe properties, without an index to update.
+        self._exec_properties = {
+            "component_id": _TEST_COMPONENT_ID,
+            component_spec.MATCHING_ENGINE_INDEX_KEY: "",
+        }
+
+        # Create context
+        self._tmp_dir = os.path.join(self._output_data_dir, ".temp")
+        self._context = executor.Executor.Context(tmp_dir=self._tmp_dir, unique_id="2")
+
+    def testPredictionLogToJsonlFnProjects(self):
+        prediction_log = prediction_log_pb2.PredictionLog()
+        outputs = prediction_log.predict_log.response.outputs
+        outputs["id"].CopyFrom(tf.make_tensor_proto(np.array([7, 8], dtype=np.int64)))
+        outputs["embedding"].CopyFrom(tf.make_tensor_proto(self._embeddings[:2]))
+
+        feature_vectors = [
+            json.loads(line)
+            for line in executor.PredictionLogToJsonlFn(
+                self._projection_matrix
+            ).process(prediction_log)
+        ]
+
+        self.assertEqual([vector["id"] for vector in feature_vectors], ["7", "8"])
+        self.assertAllClose(
+            [
+                [float(value) for value in vector["embedding"]]
+                for vector in feature_vectors
+            ],
+            self._embeddings[:2] @ self._projection_matrix,
+            rtol=1e-5,
+        )
+
+    def testRunWritesProjectedEmbeddings(self):
+        indexer = executor.Executor(self._context)
+        indexer.Do(self._input_dict, self._output_dict, self._exec_properties)
+
+        # Check outputs.
+        feature_vectors = {}
+        for path in fileio.glob(os.path.join(self._feature_vector.uri, "*.json")):
+            with fileio.open(path) as f:
+                for line in f:
+                    feature_vector = json.loads(line)
+                    feature_vectors[int(feature_vector["id"])] = [
+                        float(value) for value in feature_vector["embedding"]
+                    ]
+
+        self.assertEqual(len(feature_vectors), len(self._embeddings))
+        self.assertAllClose(
+            feature_vectors[0], self._embeddings[0] @ self._projection_matrix, rtol=1e-5
+        )
+
+
+class EmbeddingStoreTest(tf.test.TestCase):
+    def setUp(self):
+        super().setUp()
+        self._embeddings_uri = self.get_temp_dir()
+        self._embeddings = synthetic_embeddings()
+        self._ids = np.arange(len(self._embeddings)) * 7 + 1
+
+        # Write the JSONL shards of the feature vector output
+        for shard, rows in enumerate(np.array_split(np.arange(len(self._ids)), 2)):
+            with fileio.open(
+                os.path.join(
+                    self._embeddings_uri, f"embeddings-{shard:05d}-of-00002.json"
+                ),
+                "w",
+            ) as f:
+                for row in rows:
+                    f.write(
+                        json.dumps(
+                            {
+                                "id": str(self._ids[row]),
+                                "embedding": [
+                                    str(value) for value in self._embeddings[row]
+                                ],
+                            }
+                        )
+                        + "\n"
+                    )
+
+    def testWriteEmbeddingStore(self):
+        for dtype, tolerance in (("float32", 1e-6), ("float16", 1e-2), ("int8", 5e-2)):
+            store_path = executor.write_embedding_store(self._embeddings_uri, dtype)
+            ids, matrix, embeddings = read_embedding_store(store_path)
+
+            self.assertEqual(matrix.shape, self._embeddings.shape)
+            self.assertEqual(matrix.dtype, np.dtype(dtype))
+            self.assertAllEqual(ids, self._ids)
+            self.assertAllClose(
+                embeddings,
+                self._embeddings,
+                atol=tolerance * np.abs(self._embeddings).max(),
+            )
+
 
 if __name__ == "__main__":
     tf.test.main()
@@ -126,3 +126,14 @@ MATCHING_ENGINE_INDEXER_BEAM_ARGS = [
     "--sdk_container_image=" + str(PIPELINE_IMAGE),
     "--sdk_location=container",
 ]
+
+# Binary embedding store written next to the index embeddings for in-process
+# serving (VECTOR_INDEX=store in semantic-search-be), e.g. "float16" or "int8".
+# None skips it, the store is only needed when serving with VECTOR_INDEX=store.
+EMBEDDING_STORE_DTYPE = None
+
+# Reduce indexed embeddings to PROJECTION_DIMENSIONS (e.g. 128 or 192) with a
+# "pca" or "random" projection, set None to index full 384-d embeddings.
+# The matching engine index dimensions and the backend PROJECTION_PATH must match.
+PROJECTION_DIMENSIONS = None
+PROJECTION_METHOD = "pca"
@@ -15,6 +15,7 @@ from pipeline.components.vertex_ai_bulk_inferrer.component import (
 from pipeline.components.matching_engine_indexer.component import (
     MatchingEngineIndexerComponent,
 )
+from pipeline.components.embedding_projector.component import EmbeddingProjector
 
 from typing import Dict, Text
 
@@ -25,6 +26,9 @@ def create_pipeline(
     bigquery_input_config: RuntimeParameter,
     model_uri: str,
     update_index: Optional[RuntimeParameter] = None,
+    embedding_store_dtype: Optional[str] = None,
+    projection_dimensions: Optional[int] = None,
+    projection_method: Optional[str] = None,
     metadata_connection_config: Optional[metadata_store_pb2.ConnectionConfig] = None,
     example_gen_beam_args: Optional[List] = None,
     bulk_inferrer_beam_args: Optional[List] = None,
@@ -40,6 +44,9 @@ def create_pipeline(
         bigquery_input_config (RuntimeParameter): Runtime parameter for BigQuery input configuration.
         model_uri (str): URI to the pre-trained model for import.
         update_index (Optional[RuntimeParameter]): Runtime parameter for updating the index.
+        embedding_store_dtype (Optional[str]): Dtype of the binary embedding store written for in-process serving, "float16", "int8" or "float32". No store is written when unset.
+        projection_dimensions (Optional[int]): Reduced dimension of the indexed embeddings. No projection is fitted when unset.
+        projection_method (Optional[str]): Projection reducing the embeddings, "pca" or "random".
         metadata_connection_config (Optional[metadata_store_pb2.ConnectionConfig]): Metadata connection configuration.
         example_gen_beam_args (Optional[List]): Additional Beam arguments for the ExampleGen component.
         bulk_inferrer_beam_args (Optional[List]): Additional Beam arguments for the Bulk Inferrer component.
@@ -75,10 +82,23 @@ def create_pipeline(
         bulk_inferrer.with_beam_pipeline_args(bulk_inferrer_beam_args)
     components.append(bulk_inferrer)
 
+    # Embedding Projector component for reducing the dimension of inference results
+    projection = None
+    if projection_dimensions:
+        projector = EmbeddingProjector(
+            inference_result=bulk_inferrer.outputs["inference_result"],
+            dimensions=projection_dimensions,
+            method=projection_method,
+        )
+        projection = projector.outputs["projection"]
+        components.append(projector)
+
     # Matching Engine Indexer component for indexing inference results
     indexer = MatchingEngineIndexerComponent(
         inference_result=bulk_inferrer.outputs["inference_result"],
         update_index=update_index,
+        embedding_store_dtype=embedding_store_dtype,
+        projection=projection,
     )
     if matching_engine_indexer_beam_args is not None:
         indexer.with_beam_pipeline_args(matching_engine_indexer_beam_args)